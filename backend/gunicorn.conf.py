@@ -0,0 +1,12 @@
+"""gunicorn settings for serving movie_review_project.wsgi.
+
+Only hooks live here; bind address, worker count etc. come from the command
+line or GUNICORN_CMD_ARGS.
+"""
+
+
+def post_fork(server, worker):
+    # With --preload the WARMUP_ON_STARTUP warm-up ran in the master, whose threads the fork didn't copy
+    from movie_review.warmup import post_fork
+
+    post_fork(server, worker)
@@ -1,5 +1,60 @@
 from django.contrib import admin
-from .models import Movie,Review
-# Register your models here.
-admin.site.register(Movie)
-admin.site.register(Review)
\ No newline at end of file
+from django.db import transaction
+
+from movie_review_project.admin_tools import LargeTableAdminMixin
+
+from . import ratings
+from .models import Comment, ImageUpload, Movie, Review, Wishlist
+
+
+@admin.register(Movie)
+class MovieAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'title', 'release_date', 'rating_count', 'bayesian_rating', 'created_at')
+    exact_search_fields = ('title',)
+    date_hierarchy = 'created_at'
+    readonly_fields = ('rating_sum', 'rating_count', 'bayesian_rating', 'trending_score')
+
+
+@admin.register(Review)
+class ReviewAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', '__str__', 'rating', 'created_at')
+    list_select_related = ('user', 'movie')
+    raw_id_fields = ('user', 'movie')
+    exact_search_fields = ('user__username', 'movie__title')
+    date_hierarchy = 'created_at'
+
+    def save_model(self, request, obj, form, change):
+        # Deletes are accounted for by ratings.review_post_delete
+        old_movie_id = old_rating = None
+        if change:
+            old_movie_id, old_rating = Review.objects.values_list('movie_id', 'rating').get(pk=obj.pk)
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            ratings.review_saved(obj, old_movie_id=old_movie_id, old_rating=old_rating)
+
+
+@admin.register(Wishlist)
+class WishlistAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', '__str__')
+    list_select_related = ('user', 'movie')
+    raw_id_fields = ('user', 'movie')
+    exact_search_fields = ('user__username', 'movie__title')
+
+
+@admin.register(Comment)
+class CommentAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'user', 'movie', 'created_at')
+    list_select_related = ('user', 'movie')
+    raw_id_fields = ('user', 'movie')
+    exact_search_fields = ('user__username', 'movie__title')
+    date_hierarchy = 'created_at'
+
+
+@admin.register(ImageUpload)
+class ImageUploadAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'filename', 'status', 'received', 'size', 'movie', 'created_at')
+    list_filter = ('status',)
+    list_select_related = ('movie',)
+    raw_id_fields = ('user', 'movie')
+    exact_search_fields = ('sha256',)
+    date_hierarchy = 'created_at'
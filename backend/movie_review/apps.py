@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class MovieReviewConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'movie_review'
+
+    def ready(self):
+        from . import fuzzy_search, ratings, snapshots
+
+        Movie = self.get_model('Movie')
+        Wishlist = self.get_model('Wishlist')
+        post_delete.connect(ratings.review_post_delete, sender=self.get_model('Review'),
+                            dispatch_uid='ratings_review_post_delete')
+        post_save.connect(fuzzy_search.movie_saved, sender=Movie, dispatch_uid='fuzzy_search_movie_saved')
+        post_delete.connect(fuzzy_search.movie_deleted, sender=Movie, dispatch_uid='fuzzy_search_movie_deleted')
+        post_save.connect(snapshots.wishlist_changed, sender=Wishlist, dispatch_uid='snapshots_wishlist_saved')
+        post_delete.connect(snapshots.wishlist_changed, sender=Wishlist, dispatch_uid='snapshots_wishlist_deleted')
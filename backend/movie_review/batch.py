@@ -0,0 +1,355 @@
+"""Composite read endpoint: several API reads in one round trip.
+
+``POST /batch/`` takes ``{"requests": [{"id": ..., "op": ..., "args": {...}}]}``
+and answers ``{"responses": {id: {"status": ..., "data" | "errors": ...}}}``.
+Authentication runs once for the whole batch.
+
+Operations are generator functions that ``yield`` loads from per-request,
+DataLoader-style loaders instead of querying directly. The executor runs
+every operation up to its next load, lets each loader fetch all keys
+queued in that round with one query, and resumes the operations with the
+results. Loaded objects are cached per request, so a movie needed by the
+``movie``, ``reviews`` and ``wishlist`` operations is fetched once, and a
+movie detail page resolves in a handful of queries however many rows it
+shows.
+
+A failing sub-request only fails its own entry: API errors keep their
+status, anything else (including a loader query that failed) becomes a
+500 for the sub-requests waiting on it and is logged.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound, ValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from movie_review_project.db_routers import start_replica_reads, stop_replica_reads
+
+from .models import Comment, Movie, Review, Wishlist
+from .pagination import CommentFeedPagination
+from .serializers import CommentSerializer, MovieSerializer, ReviewSerializer, WishlistSerializer
+from .views import (
+    USER_DEFERRED_FIELDS, WATCH_OPTIONS_NOTE, movie_queryset_for_fields, normalize_region, parse_id,
+)
+from .watch_providers import get_watch_options
+
+logger = logging.getLogger(__name__)
+
+
+class Deferred:
+    """A pending load; the executor sends its value back to the operation."""
+
+    def __init__(self, loader, keys, many):
+        self.loader = loader
+        self.keys = keys
+        self.many = many
+
+    @property
+    def loaders(self):
+        return (self.loader,)
+
+    def value(self):
+        values = [self.loader.cache[key] for key in self.keys]
+        return values if self.many else values[0]
+
+
+class Gathered:
+    """Several loads resolved in the same round; the operation gets a tuple of their values."""
+
+    def __init__(self, *deferreds):
+        self.deferreds = deferreds
+
+    @property
+    def loaders(self):
+        return tuple(deferred.loader for deferred in self.deferreds)
+
+    def value(self):
+        return tuple(deferred.value() for deferred in self.deferreds)
+
+
+class Loader:
+    """Batches and caches loads of one kind for the duration of a request."""
+    default = None
+
+    def __init__(self, context, *args):
+        self.context = context
+        self.args = args
+        self.cache = {}
+        self.queue = set()
+
+    def load(self, key):
+        if key not in self.cache:
+            self.queue.add(key)
+        return Deferred(self, [key], many=False)
+
+    def load_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        self.queue.update(key for key in keys if key not in self.cache)
+        return Deferred(self, keys, many=True)
+
+    def dispatch(self):
+        keys, self.queue = self.queue, set()
+        if not keys:
+            return
+        found = self.fetch(keys)
+        for key in keys:
+            self.cache[key] = found.get(key, self.default)
+
+    def fetch(self, keys):
+        """Return ``{key: value}`` for ``keys`` with as few queries as possible."""
+        raise NotImplementedError
+
+
+class MovieLoader(Loader):
+    def fetch(self, keys):
+        queryset = movie_queryset_for_fields(Movie.objects.all(), MovieSerializer.Meta.fields)
+        return queryset.in_bulk(keys)
+
+
+def _group(objects, attribute):
+    grouped = {}
+    for obj in objects:
+        grouped.setdefault(getattr(obj, attribute), []).append(obj)
+    return grouped
+
+
+class ReviewsByMovieLoader(Loader):
+    """The newest ``limit`` reviews of each movie, in one windowed query."""
+    default = ()
+    ordering = ('-created_at', '-id')
+
+    def fetch(self, keys):
+        (limit,) = self.args
+        ordering = [F(name[1:]).desc() for name in self.ordering]
+        reviews = (
+            Review.objects.filter(movie_id__in=keys)
+            .select_related('user').defer(*USER_DEFERRED_FIELDS)
+            .annotate(position=Window(RowNumber(), partition_by=F('movie_id'), order_by=ordering))
+            .filter(position__lte=limit)
+            .order_by('movie_id', *self.ordering)
+        )
+        return _group(reviews, 'movie_id')
+
+
+class CommentsByMovieLoader(Loader):
+    """The newest ``limit`` comments of each movie, in one windowed query."""
+    default = ()
+
+    def fetch(self, keys):
+        (limit,) = self.args
+        ordering = [F(name[1:]).desc() if name.startswith('-') else F(name)
+                    for name in CommentFeedPagination.ordering]
+        comments = (
+            Comment.objects.filter(movie_id__in=keys)
+            .select_related('user').defer(*USER_DEFERRED_FIELDS)
+            .annotate(position=Window(RowNumber(), partition_by=F('movie_id'), order_by=ordering))
+            .filter(position__lte=limit)
+            .order_by('movie_id', *CommentFeedPagination.ordering)
+        )
+        return _group(comments, 'movie_id')
+
+
+class WishlistByUserLoader(Loader):
+    default = ()
+
+    def fetch(self, keys):
+        return _group(Wishlist.objects.filter(user_id__in=keys).order_by('id'), 'user_id')
+
+
+class WatchOptionsLoader(Loader):
+    """Keyed by movie id; the movies must already be in the ``MovieLoader`` cache."""
+
+    def fetch(self, keys):
+        (region,) = self.args
+        movies = self.context.loader(MovieLoader).cache
+        options, unavailable = get_watch_options(
+            [{'id': key, 'title': movies[key].title} for key in keys], region,
+        )
+        return {key: (options[key], unavailable) for key in keys}
+
+
+class BatchContext:
+    def __init__(self, request):
+        self.request = request
+        self.serializer_context = {'request': request}
+        self._loaders = {}
+
+    def loader(self, loader_class, *args):
+        key = (loader_class, args)
+        if key not in self._loaders:
+            self._loaders[key] = loader_class(self, *args)
+        return self._loaders[key]
+
+    @property
+    def loaders(self):
+        return self._loaders.values()
+
+
+def _int_arg(args, name):
+    if name not in args:
+        raise ValidationError({name: 'This argument is required.'})
+    return parse_id(args[name], name)
+
+
+def _limit_arg(args, default, maximum):
+    limit = _int_arg(args, 'limit') if 'limit' in args else default
+    return min(limit, maximum)
+
+
+def _attach_movies(ctx, objects):
+    movies = ctx.loader(MovieLoader).cache
+    for obj in objects:
+        obj.movie = movies[obj.movie_id]
+
+
+def op_movie(ctx, args):
+    movie = yield ctx.loader(MovieLoader).load(_int_arg(args, 'id'))
+    if movie is None:
+        raise NotFound('Movie not found.')
+    return MovieSerializer(movie, context=ctx.serializer_context).data
+
+
+def op_reviews(ctx, args):
+    limit = _limit_arg(
+        args, getattr(settings, 'BATCH_REVIEWS_LIMIT', 20), getattr(settings, 'BATCH_REVIEWS_MAX_LIMIT', 100),
+    )
+    movie_id = _int_arg(args, 'movie_id')
+    movie, reviews = yield Gathered(
+        ctx.loader(MovieLoader).load(movie_id), ctx.loader(ReviewsByMovieLoader, limit).load(movie_id),
+    )
+    if movie is None:
+        raise NotFound('Movie not found.')
+    for review in reviews:
+        review.movie = movie
+    return ReviewSerializer(reviews, many=True, context=ctx.serializer_context).data
+
+
+def op_comments(ctx, args):
+    limit = _limit_arg(args, CommentFeedPagination.page_size, CommentFeedPagination.max_page_size)
+    movie_id = _int_arg(args, 'movie_id')
+    movie, comments = yield Gathered(
+        ctx.loader(MovieLoader).load(movie_id), ctx.loader(CommentsByMovieLoader, limit).load(movie_id),
+    )
+    if movie is None:
+        raise NotFound('Movie not found.')
+    return CommentSerializer(comments, many=True, context=ctx.serializer_context).data
+
+
+def op_watch_options(ctx, args):
+    region = normalize_region(args.get('region'))
+    movie = yield ctx.loader(MovieLoader).load(_int_arg(args, 'movie_id'))
+    if movie is None:
+        raise NotFound('Movie not found.')
+    options, unavailable = yield ctx.loader(WatchOptionsLoader, region).load(movie.id)
+    return {
+        'movie_id': movie.id,
+        'movie_title': movie.title,
+        'region': region,
+        'watch_options': options,
+        'unavailable_providers': unavailable,
+        'note': WATCH_OPTIONS_NOTE,
+    }
+
+
+def op_wishlist(ctx, args):
+    user = ctx.request.user
+    if not user.is_authenticated:
+        raise NotAuthenticated()
+    entries = yield ctx.loader(WishlistByUserLoader).load(user.id)
+    yield ctx.loader(MovieLoader).load_many(entry.movie_id for entry in entries)
+    _attach_movies(ctx, entries)
+    return WishlistSerializer(entries, many=True, context=ctx.serializer_context).data
+
+
+OPERATIONS = {
+    'movie': op_movie,
+    'reviews': op_reviews,
+    'comments': op_comments,
+    'watch_options': op_watch_options,
+    'wishlist': op_wishlist,
+}
+
+
+def _error(exc):
+    return {'status': exc.status_code, 'errors': exc.detail}
+
+
+def _server_error():
+    return {'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'errors': {'detail': 'A server error occurred.'}}
+
+
+def execute(ctx, requests):
+    """Run ``[(id, op name, args)]`` together; returns ``{id: response}``."""
+    responses = {}
+    waiting = {}
+
+    def advance(request_id, generator, value):
+        try:
+            waiting[request_id] = (generator, generator.send(value))
+        except StopIteration as stop:
+            responses[request_id] = {'status': status.HTTP_200_OK, 'data': stop.value}
+        except APIException as exc:
+            responses[request_id] = _error(exc)
+        except Exception:
+            logger.exception('Batch sub-request %s failed', request_id)
+            responses[request_id] = _server_error()
+
+    for request_id, op, args in requests:
+        advance(request_id, OPERATIONS[op](ctx, args), None)
+
+    while waiting:
+        # One query per loader per round, covering every operation's keys
+        failed = set()
+        for loader in list(ctx.loaders):
+            try:
+                loader.dispatch()
+            except Exception:
+                logger.exception('Batch loader %s failed', type(loader).__name__)
+                failed.add(loader)
+        current, waiting = waiting, {}
+        for request_id, (generator, deferred) in current.items():
+            if failed.intersection(deferred.loaders):
+                generator.close()
+                responses[request_id] = _server_error()
+            else:
+                advance(request_id, generator, deferred.value())
+    return {request_id: responses[request_id] for request_id, _, _ in requests}
+
+
+class BatchView(APIView):
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        requests = request.data.get('requests') if isinstance(request.data, dict) else None
+        if not isinstance(requests, list) or not requests:
+            raise ValidationError({'requests': 'Expected a non-empty list of sub-requests.'})
+        max_requests = getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+        if len(requests) > max_requests:
+            raise ValidationError({'requests': f'At most {max_requests} sub-requests per batch.'})
+
+        parsed = []
+        for position, item in enumerate(requests):
+            if not isinstance(item, dict) or item.get('op') not in OPERATIONS:
+                raise ValidationError({'requests': f"Sub-request {position}: 'op' must be one of "
+                                                   f"{', '.join(OPERATIONS)}."})
+            args = item.get('args') or {}
+            if not isinstance(args, dict):
+                raise ValidationError({'requests': f"Sub-request {position}: 'args' must be an object."})
+            parsed.append((str(item.get('id', position)), item['op'], args))
+
+        if len({request_id for request_id, _, _ in parsed}) != len(parsed):
+            raise ValidationError({'requests': 'Sub-request ids must be unique.'})
+
+        # Everything here is a read, so the replica can serve it
+        token = start_replica_reads()
+        try:
+            responses = execute(BatchContext(request), parsed)
+        finally:
+            stop_replica_reads(token)
+        return Response({'responses': responses})
@@ -0,0 +1,119 @@
+"""Publish/subscribe for per-movie activity (new reviews and comments).
+
+Views publish from their create hooks; the SSE endpoint in ``streams.py``
+subscribes. The default ``InProcessBroker`` only reaches subscribers in the
+same process, which is enough for a single ASGI worker. Multi-worker
+deployments can point ``MOVIE_EVENTS_BROKER`` at another implementation of
+``Broker`` (e.g. one backed by Redis pub/sub).
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Broker:
+    """Interface for event brokers."""
+
+    def publish(self, channel, event):
+        """Deliver ``event`` (a JSON-serializable dict) to ``channel``. Called from sync code."""
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Return a ``Subscription`` for ``channel``. Called from the event loop."""
+        raise NotImplementedError
+
+
+class Subscription:
+    def __init__(self, broker, channel, queue, loop):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue
+        self.loop = loop
+
+    async def get(self, timeout=None):
+        """Wait for the next event, or return None after ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker(Broker):
+    """Fan events out to asyncio queues of subscribers in this process.
+
+    Each subscriber costs one small queue, so thousands of idle SSE
+    connections fit in a single worker. A subscriber that stops reading has
+    its oldest events dropped rather than growing without bound.
+    """
+
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(self._put, subscription.queue, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscription)
+
+    def _put(self, queue, event):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    def subscribe(self, channel):
+        subscription = Subscription(
+            self, channel, asyncio.Queue(self.max_queue_size), asyncio.get_running_loop()
+        )
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.channel]
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._subscribers.get(channel, ()))
+            return sum(len(subs) for subs in self._subscribers.values())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'MOVIE_EVENTS_BROKER', 'movie_review.events.InProcessBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def movie_channel(movie_id):
+    return f'movie:{movie_id}'
+
+
+def publish_movie_event(movie_id, event_type, data):
+    get_broker().publish(movie_channel(movie_id), {'type': event_type, 'data': data})
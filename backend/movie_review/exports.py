@@ -0,0 +1,68 @@
+"""Streaming NDJSON/CSV exports of the catalogue and reviews.
+
+Rows are read with ``values()`` projections through ``.iterator()``, so
+neither model instances nor the full result set are ever held in memory;
+each row is encoded and handed to the response (or file) as it arrives.
+"""
+
+import csv
+from datetime import date, datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+MOVIE_EXPORT_FIELDS = [
+    'id', 'title', 'description', 'release_date', 'image', 'created_at',
+    'rating_count', 'rating_sum', 'bayesian_rating',
+]
+
+REVIEW_EXPORT_FIELDS = [
+    'id', 'movie_id', 'movie__title', 'user_id', 'user__username',
+    'review_text', 'rating', 'created_at',
+]
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, fields, chunk_size=2000):
+    return queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def iter_ndjson(rows, fields):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+def iter_csv(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        # Match the ISO 8601 dates of the NDJSON output
+        yield writer.writerow([v.isoformat() if isinstance(v, (date, datetime)) else v for v in row])
+
+
+def iter_export(queryset, fields, export_format, chunk_size=2000):
+    rows = iter_rows(queryset, fields, chunk_size)
+    if export_format == 'csv':
+        return iter_csv(rows, fields)
+    return iter_ndjson(rows, fields)
+
+
+def streaming_export(queryset, fields, export_format, filename, chunk_size=2000):
+    response = StreamingHttpResponse(
+        iter_export(queryset, fields, export_format, chunk_size),
+        content_type=EXPORT_FORMATS[export_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
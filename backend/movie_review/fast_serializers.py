@@ -0,0 +1,158 @@
+"""Read-only "compiled" serializers for hot list endpoints.
+
+These build response dicts straight from ``values()`` rows with one
+accessor function per field, chosen once per request, instead of running
+DRF's per-field ``get_attribute`` / ``to_representation`` machinery for
+every row. The output must stay identical to ``MovieSerializer`` and
+``ReviewSerializer``; ``benchmark_serializers`` checks that before timing.
+"""
+
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework import ISO_8601
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from .models import Movie, Wishlist
+from .serializers import MovieSerializer, ReviewSerializer, sparse_fieldset
+
+
+def _datetime_formatter():
+    if api_settings.DATETIME_FORMAT != ISO_8601:
+        return serializers.DateTimeField().to_representation
+
+    tz = timezone.get_current_timezone()
+
+    def format_datetime(value):
+        if not value:
+            return None
+        value = value.astimezone(tz).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return format_datetime
+
+
+def _date_formatter():
+    if api_settings.DATE_FORMAT != ISO_8601:
+        return serializers.DateField().to_representation
+    return lambda value: value.isoformat() if value else None
+
+
+def _image_formatter(request):
+    storage = Movie._meta.get_field('image').storage
+    build_absolute_uri = request.build_absolute_uri if request is not None else (lambda url: url)
+
+    def format_image(name):
+        if not name:
+            return None
+        return build_absolute_uri(storage.url(name))
+
+    return format_image
+
+
+def _average(rating_sum, rating_count):
+    if not rating_count:
+        return 0
+    return round(rating_sum / rating_count, 1)
+
+
+class CompiledMovieSerializer:
+    """Same output as ``MovieSerializer`` (honouring ?fields= / ?omit=)."""
+
+    def __init__(self, request=None, prefix='', fields=None):
+        self.request = request
+        self.prefix = prefix
+        selected = sparse_fieldset(request, MovieSerializer.Meta.fields) if fields is None else set(fields)
+        self.fields = [name for name in MovieSerializer.Meta.fields if name in selected]
+        self._compile()
+
+    def _compile(self):
+        p = self.prefix
+        format_datetime = _datetime_formatter()
+        format_date = _date_formatter()
+        format_image = _image_formatter(self.request)
+
+        # field name -> (columns it needs, function of the row)
+        available = {
+            'id': ([p + 'id'], lambda row: row[p + 'id']),
+            'title': ([p + 'title'], lambda row: row[p + 'title']),
+            'description': ([p + 'description'], lambda row: row[p + 'description']),
+            'release_date': ([p + 'release_date'], lambda row: format_date(row[p + 'release_date'])),
+            'image': ([p + 'image'], lambda row: format_image(row[p + 'image'])),
+            'created_at': ([p + 'created_at'], lambda row: format_datetime(row[p + 'created_at'])),
+            'average_rating': (
+                [p + 'rating_sum', p + 'rating_count'],
+                lambda row: _average(row[p + 'rating_sum'], row[p + 'rating_count']),
+            ),
+            'review_count': ([p + 'rating_count'], lambda row: row[p + 'rating_count']),
+            'wishlist_count': ([], lambda row: row['wishlist_total']),
+        }
+        self.accessors = [(name, available[name][1]) for name in self.fields]
+        self.columns = list(dict.fromkeys(
+            column for name in self.fields for column in available[name][0]
+        ))
+
+    @property
+    def needs_wishlist_count(self):
+        return 'wishlist_count' in self.fields
+
+    def to_representation(self, row):
+        return {name: accessor(row) for name, accessor in self.accessors}
+
+    def serialize(self, queryset):
+        if self.needs_wishlist_count:
+            queryset = queryset.annotate(wishlist_total=Count('wishlist'))
+            columns = self.columns + ['wishlist_total']
+        else:
+            columns = self.columns
+        return [self.to_representation(row) for row in queryset.values(*columns)]
+
+
+class CompiledReviewSerializer:
+    """Same output as ``ReviewSerializer`` (honouring ?fields= / ?omit=)."""
+
+    def __init__(self, request=None):
+        self.request = request
+        selected = sparse_fieldset(request, ReviewSerializer.Meta.fields)
+        # movie_id is write-only, it never appears in the output
+        self.fields = [name for name in ReviewSerializer.Meta.fields if name in selected and name != 'movie_id']
+        self.movie = None
+        if 'movie' in self.fields:
+            # The nested movie is always rendered in full, like the nested MovieSerializer
+            self.movie = CompiledMovieSerializer(request, prefix='movie__', fields=MovieSerializer.Meta.fields)
+        self._compile()
+
+    def _compile(self):
+        format_datetime = _datetime_formatter()
+        available = {
+            'id': (['id'], lambda row: row['id']),
+            'user': (['user_id'], lambda row: row['user_id']),
+            'username': (['user__username'], lambda row: row['user__username']),
+            'review_text': (['review_text'], lambda row: row['review_text']),
+            'rating': (['rating'], lambda row: row['rating']),
+            'created_at': (['created_at'], lambda row: format_datetime(row['created_at'])),
+        }
+        if self.movie is not None:
+            movie = self.movie
+            available['movie'] = (movie.columns, movie.to_representation)
+
+        self.accessors = [(name, available[name][1]) for name in self.fields]
+        self.columns = list(dict.fromkeys(
+            column for name in self.fields for column in available[name][0]
+        ))
+
+    def serialize(self, queryset):
+        rows = list(queryset.values(*self.columns, 'movie_id'))
+        if self.movie is not None and self.movie.needs_wishlist_count:
+            # One grouped query for the nested counts instead of one per review
+            movie_ids = {row['movie_id'] for row in rows}
+            counts = dict(
+                Wishlist.objects.filter(movie_id__in=movie_ids)
+                .values_list('movie_id')
+                .annotate(total=Count('id'))
+            )
+            for row in rows:
+                row['wishlist_total'] = counts.get(row['movie_id'], 0)
+        return [{name: accessor(row) for name, accessor in self.accessors} for row in rows]
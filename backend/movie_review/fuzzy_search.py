@@ -0,0 +1,294 @@
+"""Typo-tolerant title search over character trigrams.
+
+Titles are split into trigrams the way PostgreSQL's ``pg_trgm`` does
+(lowercased words padded with two spaces in front and one behind), and
+candidates are ranked by trigram similarity: shared / (query + title -
+shared). "intersteller" still shares most trigrams with "Interstellar".
+
+On PostgreSQL the search runs in the database against the GIN index from
+migration 0021. Elsewhere each process keeps a ``TrigramIndex`` in memory,
+built on the first fuzzy query (or by ``warmup``), and kept current by the
+``Movie`` save/delete signals connected in ``MovieReviewConfig.ready`` once
+the write commits. Changes made by other processes bump a generation
+counter in the cache; a process that sees a newer generation rebuilds its
+index in the background, at most every ``FUZZY_SEARCH_REFRESH_SECONDS``,
+and keeps serving the old one meanwhile.
+
+The counter is only seen by other processes through a shared cache
+(``REDIS_URL``). With the default per-process ``LocMemCache`` each worker
+only sees its own writes, and changes made elsewhere (other workers, the
+admin in another process, management commands) stay invisible until it
+restarts; ``build_index`` logs a warning when that is the case outside
+``DEBUG``.
+"""
+
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections, router, transaction
+from django.db.models import F
+
+from .models import Movie
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'fuzzy-search:generation'
+_WORD_RE = re.compile(r'[^\W_]+')
+
+
+def trigrams(text):
+    grams = set()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a, b):
+    """Trigram similarity of two strings, between 0 and 1."""
+    a, b = trigrams(a), trigrams(b)
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+class TrigramIndex:
+    """Inverted index from trigram to the slots of titles containing it.
+
+    Each added title takes a new slot; removing a movie only marks its slot
+    dead, and the postings are compacted once dead slots pile up. Postings
+    are ``array('I')`` rather than sets, which keeps a million titles to a
+    few hundred MB.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.postings = defaultdict(lambda: array('I'))
+        self.slot_movie = array('q')  # movie id per slot, 0 when dead
+        self.slot_size = array('H')   # number of distinct trigrams per slot
+        self.movie_slot = {}
+        self.titles = {}
+        self.dead = 0
+        self.generation = None
+
+    def __len__(self):
+        return len(self.movie_slot)
+
+    def add(self, movie_id, title):
+        with self._lock:
+            if self.titles.get(movie_id) == title:
+                return
+            self._discard(movie_id)
+            grams = trigrams(title)
+            slot = len(self.slot_movie)
+            self.slot_movie.append(movie_id)
+            self.slot_size.append(min(len(grams), 65535))
+            for gram in grams:
+                self.postings[gram].append(slot)
+            self.movie_slot[movie_id] = slot
+            self.titles[movie_id] = title
+
+    def remove(self, movie_id):
+        with self._lock:
+            self._discard(movie_id)
+
+    def _discard(self, movie_id):
+        slot = self.movie_slot.pop(movie_id, None)
+        if slot is None:
+            return
+        self.slot_movie[slot] = 0
+        self.titles.pop(movie_id, None)
+        self.dead += 1
+        if self.dead > 1000 and self.dead * 4 > len(self.slot_movie):
+            self._compact()
+
+    def _compact(self):
+        titles = self.titles
+        self.postings = defaultdict(lambda: array('I'))
+        self.slot_movie = array('q')
+        self.slot_size = array('H')
+        self.movie_slot = {}
+        self.titles = {}
+        self.dead = 0
+        for movie_id, title in titles.items():
+            self.add(movie_id, title)
+
+    def search(self, query, limit=10, threshold=0.3):
+        """Return up to ``limit`` ``(movie_id, similarity)`` pairs, best first."""
+        grams = trigrams(query)
+        if not grams:
+            return []
+        # similarity >= threshold needs at least this many shared trigrams
+        min_shared = max(1, math.ceil(threshold * len(grams)))
+
+        with self._lock:
+            lists = [self.postings[gram] for gram in grams if gram in self.postings]
+            if not lists:
+                return []
+            try:
+                import numpy as np
+            except ImportError:
+                return self._search_python(lists, len(grams), min_shared, limit, threshold)
+            return self._search_numpy(np, lists, len(grams), min_shared, limit, threshold)
+
+    def _search_numpy(self, np, lists, query_size, min_shared, limit, threshold):
+        counts = np.bincount(np.concatenate([np.frombuffer(postings, dtype=np.uint32) for postings in lists]))
+        slots = np.flatnonzero(counts >= min_shared)
+        if not len(slots):
+            return []
+        movie_ids = np.frombuffer(self.slot_movie, dtype=np.int64)[slots]
+        shared = counts[slots]
+        sizes = np.frombuffer(self.slot_size, dtype=np.uint16)[slots].astype(np.int64)
+        scores = shared / (query_size + sizes - shared)
+
+        keep = (movie_ids != 0) & (scores >= threshold)
+        movie_ids, scores = movie_ids[keep], scores[keep]
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            movie_ids, scores = movie_ids[top], scores[top]
+        order = np.lexsort((movie_ids, -scores))
+        return [(int(movie_ids[i]), float(scores[i])) for i in order]
+
+    def _search_python(self, lists, query_size, min_shared, limit, threshold):
+        counts = Counter()
+        for postings in lists:
+            counts.update(postings)
+        results = []
+        for slot, shared in counts.items():
+            movie_id = self.slot_movie[slot]
+            if shared < min_shared or not movie_id:
+                continue
+            score = shared / (query_size + self.slot_size[slot] - shared)
+            if score >= threshold:
+                results.append((-score, movie_id))
+        return [(movie_id, -score) for score, movie_id in heapq.nsmallest(limit, results)]
+
+
+_index = None
+_index_lock = threading.Lock()
+_refreshing = threading.Event()
+_last_refresh = 0.0
+
+
+def uses_database(using=None):
+    using = using or router.db_for_read(Movie)
+    return connections[using].vendor == 'postgresql'
+
+
+def _current_generation():
+    cache.add(GENERATION_KEY, 0, None)
+    return cache.get(GENERATION_KEY)
+
+
+def build_index():
+    """Build a fresh index of every movie title."""
+    index = TrigramIndex()
+    index.generation = _current_generation()
+    for movie_id, title in Movie.objects.values_list('id', 'title').iterator(chunk_size=5000):
+        index.add(movie_id, title)
+    return index
+
+
+def _refresh_in_background():
+    global _last_refresh
+
+    def rebuild():
+        global _index
+        try:
+            _index = build_index()
+        finally:
+            _refreshing.clear()
+            connections.close_all()
+
+    _last_refresh = time.monotonic()
+    _refreshing.set()
+    threading.Thread(target=rebuild, name='fuzzy-search-refresh', daemon=True).start()
+
+
+def get_index():
+    """This process's index, building it on first use."""
+    global _index, _last_refresh
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if not settings.DEBUG and isinstance(caches['default'], (LocMemCache, DummyCache)):
+                    logger.warning('The default cache is per-process, so fuzzy search only sees title '
+                                   'changes made by this process; set REDIS_URL to share them.')
+                _index = build_index()
+                _last_refresh = time.monotonic()
+        return _index
+
+    interval = getattr(settings, 'FUZZY_SEARCH_REFRESH_SECONDS', 60)
+    if (not _refreshing.is_set() and time.monotonic() - _last_refresh >= interval
+            and cache.get(GENERATION_KEY) != _index.generation):
+        _refresh_in_background()
+    return _index
+
+
+def _bump_generation(index):
+    _current_generation()
+    try:
+        generation = cache.incr(GENERATION_KEY)
+    except ValueError:  # evicted between add and incr
+        return
+    # Only claim to be current if no other process changed anything since
+    if index is not None and index.generation == generation - 1:
+        index.generation = generation
+
+
+def movie_saved(sender, instance, using, **kwargs):
+    movie_id, title = instance.pk, instance.title
+
+    def update():
+        if _index is not None:
+            _index.add(movie_id, title)
+        _bump_generation(_index)
+
+    # A rolled-back save must not reach the index, and another process
+    # rebuilding on the new generation must be able to read the row
+    transaction.on_commit(update, using=using)
+
+
+def movie_deleted(sender, instance, using, **kwargs):
+    movie_id = instance.pk
+
+    def update():
+        if _index is not None:
+            _index.remove(movie_id)
+        _bump_generation(_index)
+
+    transaction.on_commit(update, using=using)
+
+
+def search(query, limit=None, threshold=None):
+    """Return ``[(movie_id, similarity), ...]`` for ``query``, best first."""
+    limit = limit or getattr(settings, 'FUZZY_SEARCH_LIMIT', 20)
+    threshold = threshold if threshold is not None else getattr(settings, 'FUZZY_SEARCH_THRESHOLD', 0.3)
+
+    if uses_database():
+        from django.contrib.postgres.lookups import TrigramSimilar
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        rows = (
+            Movie.objects
+            # `%` is the operator the GIN trigram index can serve
+            .filter(TrigramSimilar(F('title'), query))
+            .annotate(score=TrigramSimilarity('title', query))
+            .filter(score__gte=threshold)
+            .order_by('-score', 'id')
+            .values_list('id', 'score')[:limit]
+        )
+        return list(rows)
+
+    return get_index().search(query, limit, threshold)
@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+
+class Command(BaseCommand):
+    help = 'Render every admin changelist and fail if one runs more queries than the budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-queries', type=int, default=None,
+                            help='Queries allowed per changelist (default: ADMIN_CHANGELIST_MAX_QUERIES)')
+        parser.add_argument('--username', default=None,
+                            help='Superuser to render as (default: the first superuser)')
+
+    def handle(self, *args, **options):
+        max_queries = options['max_queries'] or getattr(settings, 'ADMIN_CHANGELIST_MAX_QUERIES', 10)
+        users = User.objects.filter(is_superuser=True)
+        if options['username']:
+            users = users.filter(username=options['username'])
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError('No superuser to render the admin as')
+
+        factory = RequestFactory()
+        over_budget = []
+        for model, model_admin in sorted(admin.site._registry.items(), key=lambda item: item[0]._meta.label):
+            opts = model._meta
+            request = factory.get(f'/admin/{opts.app_label}/{opts.model_name}/')
+            request.user = user
+
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                response = model_admin.changelist_view(request)
+                if hasattr(response, 'render'):
+                    response.render()
+            elapsed = (time.perf_counter() - started) * 1000
+
+            count = len(queries)
+            line = f'{opts.label:<32} {count:>3} queries {elapsed:8.1f} ms'
+            if count > max_queries:
+                over_budget.append(opts.label)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        if over_budget:
+            raise CommandError(f"Over the {max_queries}-query budget: {', '.join(over_budget)}")
+        self.stdout.write(self.style.SUCCESS(f'All changelists within {max_queries} queries'))
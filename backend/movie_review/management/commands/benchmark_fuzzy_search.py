@@ -0,0 +1,85 @@
+import random
+import resource
+import time
+
+from django.core.management.base import BaseCommand
+
+from movie_review.fuzzy_search import TrigramIndex
+
+WORDS = (
+    'the of a and in to dark night star wars lord rings return king man iron spider '
+    'black white red blue lost city love story last first great little big house road '
+    'interstellar inception memento tenet prestige dunkirk breaking bad matrix alien '
+    'godfather casablanca vertigo psycho jaws rocky titanic avatar frozen coco up '
+    'gladiator braveheart amadeus fargo heat seven zodiac prisoners arrival sicario '
+    'dune blade runner mad max fury toy shining goodfellas parasite whiplash joker'
+).split()
+
+
+def _title(rng):
+    words = rng.choices(WORDS, k=rng.randint(1, 4))
+    if rng.random() < 0.3:
+        words.append(str(rng.randint(2, 9)))
+    return ' '.join(words).title()
+
+
+def _misspell(rng, title):
+    chars = list(title.lower())
+    for _ in range(rng.randint(1, 2)):
+        i = rng.randrange(len(chars))
+        edit = rng.choice(('swap', 'drop', 'replace'))
+        if edit == 'swap' and i + 1 < len(chars):
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+        elif edit == 'drop' and len(chars) > 3:
+            del chars[i]
+        else:
+            chars[i] = rng.choice('aeiourstln')
+    return ''.join(chars)
+
+
+def _percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+class Command(BaseCommand):
+    help = 'Build the in-memory trigram title index over synthetic titles and time fuzzy queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=1_000_000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--threshold', type=float, default=0.3)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        titles = [_title(rng) for _ in range(options['titles'])]
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        index = TrigramIndex()
+        for movie_id, title in enumerate(titles, start=1):
+            index.add(movie_id, title)
+        build_seconds = time.perf_counter() - started
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self.stdout.write(
+            f'Indexed {len(titles):,} titles in {build_seconds:.1f}s '
+            f'({len(index.postings):,} trigrams, peak RSS +{(rss_after - rss_before) / 1024:.0f} MB)'
+        )
+
+        queries = [_misspell(rng, rng.choice(titles)) for _ in range(options['queries'])]
+        index.search(queries[0], options['limit'], options['threshold'])  # warm up the NumPy import
+
+        timings, hits = [], 0
+        for query in queries:
+            started = time.perf_counter()
+            results = index.search(query, options['limit'], options['threshold'])
+            timings.append((time.perf_counter() - started) * 1000)
+            hits += bool(results)
+
+        timings.sort()
+        self.stdout.write(
+            f'{len(queries)} misspelled queries: p50 {_percentile(timings, 50):.1f} ms, '
+            f'p95 {_percentile(timings, 95):.1f} ms, p99 {_percentile(timings, 99):.1f} ms, '
+            f'max {timings[-1]:.1f} ms; {hits} returned matches'
+        )
@@ -0,0 +1,88 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from movie_review_project.renderers import FastJSONRenderer, orjson
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DESCRIPTION = (
+    'A thief who steals corporate secrets through the use of dream-sharing technology '
+    'is given the inverse task of planting an idea into the mind of a C.E.O. '
+)
+
+
+def _movie(pk):
+    # Shaped like serializer output, where dates are already strings
+    return {
+        'id': pk,
+        'title': f'Movie {pk}',
+        'description': DESCRIPTION * 4,
+        'release_date': f'{1980 + pk % 45}-{1 + pk % 12:02d}-{1 + pk % 28:02d}',
+        'image': f'http://localhost:8000/media/movies/poster_{pk}.jpg',
+        'created_at': '2025-01-01T10:30:00+05:30',
+        'average_rating': round(1 + (pk * 7 % 90) / 10, 1),
+        'review_count': pk * 3 % 500,
+        'wishlist_count': pk * 5 % 300,
+    }
+
+
+def _review(pk):
+    return {
+        'id': pk,
+        'movie': _movie(pk % 1000),
+        'user': pk % 5000,
+        'username': f'user{pk % 5000}',
+        'review_text': 'Great pacing, stunning visuals and a soundtrack that stays with you.',
+        'rating': 1 + pk % 10,
+        'created_at': '2025-06-01T18:45:12.123456+05:30',
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare JSON renderers and compression on typical list payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def _time(self, renderer, data, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body = renderer.render(data)
+            best = min(best, time.perf_counter() - started)
+        return best, body
+
+    def handle(self, *args, **options):
+        payloads = {
+            '1k movies': [_movie(pk) for pk in range(1, 1001)],
+            '10k reviews': [_review(pk) for pk in range(1, 10001)],
+        }
+        renderers = {'stdlib': JSONRenderer()}
+        if orjson is not None:
+            renderers['orjson'] = FastJSONRenderer()
+        else:
+            self.stderr.write('orjson is not installed; FastJSONRenderer falls back to stdlib')
+
+        for name, data in payloads.items():
+            self.stdout.write(name)
+            for renderer_name, renderer in renderers.items():
+                seconds, body = self._time(renderer, data, options['repeat'])
+                self.stdout.write(f"  {renderer_name:<7} {seconds * 1000:8.1f} ms  {len(body):>10,} bytes raw")
+
+            started = time.perf_counter()
+            gzipped = gzip.compress(body, compresslevel=6)
+            self.stdout.write(
+                f"  gzip-6  {(time.perf_counter() - started) * 1000:8.1f} ms  {len(gzipped):>10,} bytes on the wire"
+            )
+            if brotli is not None:
+                started = time.perf_counter()
+                compressed = brotli.compress(body, quality=5)
+                self.stdout.write(
+                    f"  br-5    {(time.perf_counter() - started) * 1000:8.1f} ms  {len(compressed):>10,} bytes on the wire"
+                )
@@ -0,0 +1,75 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Prefetch
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from movie_review.fast_serializers import CompiledMovieSerializer, CompiledReviewSerializer
+from movie_review.models import Movie, Review
+from movie_review.serializers import MovieSerializer, ReviewSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare ModelSerializer and compiled serializers on the current database (rows/s)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10000, help='Rows per run')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def _best(self, func, repeat):
+        best, result = float('inf'), None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - started)
+        return best, result
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/'))
+        limit, repeat = options['limit'], options['repeat']
+        movie_ids = list(Movie.objects.order_by('pk').values_list('pk', flat=True)[:limit])
+        review_ids = list(Review.objects.order_by('pk').values_list('pk', flat=True)[:limit])
+
+        cases = [
+            (
+                'movies',
+                lambda: MovieSerializer(
+                    Movie.objects.filter(pk__in=movie_ids).order_by('pk')
+                    .annotate(wishlist_total=Count('wishlist')),
+                    many=True, context={'request': request},
+                ).data,
+                lambda: CompiledMovieSerializer(request).serialize(
+                    Movie.objects.filter(pk__in=movie_ids).order_by('pk')
+                ),
+                len(movie_ids),
+            ),
+            (
+                'reviews',
+                lambda: ReviewSerializer(
+                    Review.objects.filter(pk__in=review_ids).order_by('pk').select_related('user')
+                    .prefetch_related(Prefetch('movie', Movie.objects.annotate(wishlist_total=Count('wishlist')))),
+                    many=True, context={'request': request},
+                ).data,
+                lambda: CompiledReviewSerializer(request).serialize(
+                    Review.objects.filter(pk__in=review_ids).order_by('pk')
+                ),
+                len(review_ids),
+            ),
+        ]
+
+        for name, drf, compiled, rows in cases:
+            if not rows:
+                self.stdout.write(f"{name}: no rows, skipped")
+                continue
+            drf_seconds, drf_data = self._best(drf, repeat)
+            fast_seconds, fast_data = self._best(compiled, repeat)
+
+            if json.dumps(drf_data, default=str) != json.dumps(fast_data, default=str):
+                raise CommandError(f"{name}: compiled output differs from {name} ModelSerializer output")
+
+            self.stdout.write(
+                f"{name:<8} {rows:>7} rows  ModelSerializer {rows / drf_seconds:>10.0f} rows/s  "
+                f"compiled {rows / fast_seconds:>10.0f} rows/s  ({drf_seconds / fast_seconds:.1f}x)"
+            )
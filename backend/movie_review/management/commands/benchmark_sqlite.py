@@ -0,0 +1,129 @@
+import copy
+import random
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.db.models import Avg, Count
+from django.test.utils import override_settings
+
+from movie_review.models import Movie, Review
+from movie_review_project.database import SQLITE_PRAGMAS, database_from_url, serialized_writes
+
+
+def _register(alias, path, pragmas):
+    """Add a Django connection alias for an SQLite file, configured like settings.DATABASES would."""
+    config = copy.deepcopy(connections['default'].settings_dict)
+    config.update(database_from_url(f'sqlite:///{path}', settings.BASE_DIR, sqlite_pragmas=pragmas))
+    connections.settings[alias] = config
+
+
+def _unregister(alias):
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
+
+
+def _setup(alias, movies):
+    with connections[alias].schema_editor() as editor:
+        for model in (User, Movie, Review):
+            editor.create_model(model)
+    User.objects.using(alias).create(username='benchmark')
+    Movie.objects.using(alias).bulk_create(
+        [Movie(title=f'Movie {i}', description='', release_date='2000-01-01') for i in range(movies)],
+    )
+
+
+def _run(alias, readers, writers, seconds, locked):
+    """Reads and writes go through the ORM, as the API's do, on per-thread connections."""
+    counts = {'reads': 0, 'writes': 0, 'busy': 0}
+    counts_lock = threading.Lock()
+    user_id = User.objects.using(alias).values_list('id', flat=True).get()
+    movie_ids = list(Movie.objects.using(alias).values_list('id', flat=True))
+    connections[alias].close()
+    deadline = time.perf_counter() + seconds
+
+    def reader():
+        done = busy = 0
+        while time.perf_counter() < deadline:
+            try:
+                Review.objects.using(alias).filter(movie_id=random.choice(movie_ids)).aggregate(
+                    average=Avg('rating'), count=Count('id'),
+                )
+                done += 1
+            except OperationalError:
+                busy += 1
+        connections[alias].close()
+        with counts_lock:
+            counts['reads'] += done
+            counts['busy'] += busy
+
+    def writer():
+        done = busy = 0
+        while time.perf_counter() < deadline:
+            try:
+                with serialized_writes() if locked else nullcontext(), transaction.atomic(using=alias):
+                    Review.objects.using(alias).create(
+                        user_id=user_id, movie_id=random.choice(movie_ids),
+                        rating=random.randint(1, 10), review_text='benchmark review',
+                    )
+                done += 1
+            except OperationalError:
+                busy += 1
+        connections[alias].close()
+        with counts_lock:
+            counts['writes'] += done
+            counts['busy'] += busy
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+class Command(BaseCommand):
+    help = ('Compare concurrent read/write throughput through Django connections with the stock '
+            'SQLite settings, SQLITE_PRAGMAS, and SQLITE_PRAGMAS plus the serialized_writes() lock')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--movies', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            # serialized_writes() only locks when the default database is SQLite
+            raise CommandError('benchmark_sqlite needs the default database to be SQLite')
+
+        configs = [
+            ('default', None, False),
+            ('tuned', SQLITE_PRAGMAS, False),
+            ('tuned+lock', SQLITE_PRAGMAS, True),
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, pragmas, locked in configs:
+                alias = f'benchmark_{name}'
+                _register(alias, Path(tmp) / f'{name}.sqlite3', pragmas)
+                try:
+                    _setup(alias, options['movies'])
+                    with override_settings(SQLITE_SERIALIZE_WRITES=locked):
+                        counts = _run(alias, options['readers'], options['writers'], options['seconds'], locked)
+                finally:
+                    _unregister(alias)
+                seconds = options['seconds']
+                self.stdout.write(
+                    f"{name:<11} {counts['reads'] / seconds:10.0f} reads/s "
+                    f"{counts['writes'] / seconds:8.0f} writes/s "
+                    f"{counts['busy']:6d} busy errors"
+                )
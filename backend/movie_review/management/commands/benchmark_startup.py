@@ -0,0 +1,92 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter: this process has already paid for its imports
+STARTUP_SCRIPT = '''
+import json, resource, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+seconds = time.perf_counter() - started
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss_kb //= 1024
+print(json.dumps({'seconds': seconds, 'max_rss_kb': rss_kb, 'modules': sorted(sys.modules)}))
+'''
+
+
+def _parse_importtime(stderr):
+    """Cumulative import time in microseconds per top-level package."""
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented; only count the outermost to avoid double counting
+        if name.startswith('  '):
+            continue
+        totals[name.strip().split('.')[0]] += int(cumulative)
+    return totals
+
+
+class Command(BaseCommand):
+    help = 'Measure import time and peak RSS of django.setup() plus URL loading against a budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3,
+                            help='Fresh interpreters to start; the fastest run is reported')
+        parser.add_argument('--top', type=int, default=15,
+                            help='Slowest top-level imports to list')
+        parser.add_argument('--budget-ms', type=float, default=None,
+                            help='Fail above this startup time (default: STARTUP_BUDGET_MS)')
+        parser.add_argument('--rss-budget-mb', type=float, default=None,
+                            help='Fail above this peak RSS (default: STARTUP_RSS_BUDGET_MB)')
+
+    def _run_once(self):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'movie_review_project.settings'))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Startup failed:\n{result.stderr[-2000:]}')
+        return json.loads(result.stdout.splitlines()[-1]), _parse_importtime(result.stderr)
+
+    def handle(self, *args, **options):
+        budget_ms = options['budget_ms'] or getattr(settings, 'STARTUP_BUDGET_MS', 1500)
+        rss_budget_mb = options['rss_budget_mb'] or getattr(settings, 'STARTUP_RSS_BUDGET_MB', 150)
+        lazy_modules = getattr(settings, 'STARTUP_LAZY_MODULES', ())
+
+        runs = [self._run_once() for _ in range(max(1, options['runs']))]
+        stats, imports = min(runs, key=lambda run: run[0]['seconds'])
+        startup_ms = stats['seconds'] * 1000
+        rss_mb = max(run[0]['max_rss_kb'] for run in runs) / 1024
+
+        self.stdout.write(f'Slowest top-level imports (cumulative, best of {len(runs)} runs):')
+        for name, micros in sorted(imports.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {micros / 1000:8.1f} ms  {name}')
+        self.stdout.write(f'django.setup() + URLconf: {startup_ms:.0f} ms (budget {budget_ms:.0f} ms)')
+        self.stdout.write(f'Peak RSS: {rss_mb:.1f} MB (budget {rss_budget_mb:.0f} MB)')
+
+        problems = []
+        if startup_ms > budget_ms:
+            problems.append(f'startup took {startup_ms:.0f} ms, budget is {budget_ms:.0f} ms')
+        if rss_mb > rss_budget_mb:
+            problems.append(f'peak RSS is {rss_mb:.1f} MB, budget is {rss_budget_mb:.0f} MB')
+        loaded = set(stats['modules'])
+        for module in lazy_modules:
+            if module in loaded:
+                problems.append(f'{module} is imported at startup but should load lazily')
+
+        if problems:
+            raise CommandError('Startup budget exceeded: ' + '; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('Within startup budget'))
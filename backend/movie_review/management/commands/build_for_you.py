@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from movie_review.models import Review, Wishlist
+from movie_review.recommendations import build_for_you, for_you_cache_key
+
+
+class Command(BaseCommand):
+    help = 'Precompute and cache "for you" candidates for every user with history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl', type=int, default=None,
+                            help='Cache TTL in seconds (default: FOR_YOU_CACHE_TTL)')
+
+    def handle(self, *args, **options):
+        ttl = options['ttl'] or getattr(settings, 'FOR_YOU_CACHE_TTL', 3600)
+        limit = getattr(settings, 'FOR_YOU_LIMIT', 100)
+        started = time.perf_counter()
+
+        user_ids = set(Wishlist.objects.values_list('user_id', flat=True).distinct())
+        user_ids.update(Review.objects.values_list('user_id', flat=True).distinct())
+
+        batch = {}
+        for user_id in user_ids:
+            batch[for_you_cache_key(user_id)] = build_for_you(user_id, limit=limit)
+            if len(batch) >= 500:
+                cache.set_many(batch, ttl)
+                batch = {}
+        if batch:
+            cache.set_many(batch, ttl)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Cached candidates for {len(user_ids)} users in {time.perf_counter() - started:.1f}s"
+        ))
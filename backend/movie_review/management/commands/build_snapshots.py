@@ -0,0 +1,49 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movie_review.snapshots import SnapshotBuilder, brotli, changed_movie_ids
+
+
+class Command(BaseCommand):
+    help = 'Render compressed JSON snapshots of the public catalogue into SNAPSHOT_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Re-render every movie detail page')
+        parser.add_argument('--movies', help='Comma-separated ids of changed movies to re-render')
+        parser.add_argument('--changed-since',
+                            help='ISO timestamp; re-render movies changed since then '
+                                 '(default: time of the previous build)')
+        parser.add_argument('--page-size', type=int, default=None)
+        parser.add_argument('--max-pages', type=int, default=None,
+                            help='Listing pages rendered per filter')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        builder = SnapshotBuilder(page_size=options['page_size'], max_pages=options['max_pages'])
+
+        if options['full'] or not builder.previous.get('generated_at'):
+            movie_ids = None
+        elif options['movies']:
+            try:
+                movie_ids = {int(pk) for pk in options['movies'].split(',') if pk}
+            except ValueError:
+                raise CommandError('--movies expects comma-separated integer ids')
+        else:
+            since = datetime.fromisoformat(options['changed_since'] or builder.previous['generated_at'])
+            movie_ids = changed_movie_ids(since)
+
+        builder.build_listings()
+        builder.build_categories()
+        builder.build_details(movie_ids)
+        manifest = builder.commit()
+
+        if brotli is None:
+            self.stderr.write('brotli is not installed; only gzip variants were written')
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {manifest['version']}: {builder.written} of {len(manifest['files'])} "
+            f"files changed, {builder.removed} unreferenced objects removed in "
+            f"{time.perf_counter() - started:.1f}s"
+        ))
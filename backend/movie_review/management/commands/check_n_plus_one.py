@@ -0,0 +1,80 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from movie_review.urls import router
+from movie_review_project.nplusone import QueryRecorder
+
+# GET endpoints outside the movie_review router
+EXTRA_URLS = ('user_profile',)
+
+
+class Command(BaseCommand):
+    help = ('GET every list, detail and read-only action of the movie_review and users APIs '
+            'on the current database and fail on repeated (N+1) queries')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default=None,
+                            help='User to authenticate as (default: the first superuser)')
+        parser.add_argument('--threshold', type=int, default=None,
+                            help='Repeats of one statement that count as N+1 (default: NPLUSONE_THRESHOLD)')
+
+    def _urls(self, client):
+        for prefix, viewset, basename in router.registry:
+            list_url = reverse(f'{basename}-list')
+            yield list_url
+
+            pk = self._first_pk(client, list_url)
+            if pk is not None:
+                yield reverse(f'{basename}-detail', args=[pk])
+
+            for extra in viewset.get_extra_actions():
+                if 'get' not in extra.mapping:
+                    continue
+                if extra.detail:
+                    if pk is not None:
+                        yield reverse(f'{basename}-{extra.url_name}', args=[pk])
+                else:
+                    yield reverse(f'{basename}-{extra.url_name}')
+
+        for name in EXTRA_URLS:
+            yield reverse(name)
+
+    def _first_pk(self, client, list_url):
+        response = client.get(list_url)
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        rows = data.get('results', []) if isinstance(data, dict) else data
+        return rows[0].get('id') if rows else None
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(username=options['username']) if options['username'] \
+            else User.objects.filter(is_superuser=True).order_by('pk')
+        user = users.first()
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        else:
+            self.stderr.write('No user found; checking anonymous access only')
+
+        offenders = []
+        for url in self._urls(client):
+            with QueryRecorder() as recorder:
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            repeated = recorder.repeated(options['threshold'])
+            line = f'{response.status_code} {url:<48} {recorder.total:>4} queries'
+            if repeated:
+                offenders.append(url)
+                self.stdout.write(self.style.ERROR(line))
+                for group in repeated:
+                    self.stdout.write(f'      {group.describe()}')
+            else:
+                self.stdout.write(line)
+
+        if offenders:
+            raise CommandError(f'Repeated queries on {len(offenders)} endpoint(s)')
+        self.stdout.write(self.style.SUCCESS('No repeated queries'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from movie_review.exports import (
+    EXPORT_FORMATS, MOVIE_EXPORT_FIELDS, REVIEW_EXPORT_FIELDS, iter_export,
+)
+from movie_review.models import Movie, Review
+from movie_review.queries import filter_movies, filter_reviews
+
+
+class Command(BaseCommand):
+    help = 'Stream movies or reviews to NDJSON/CSV with flat memory use'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=['movies', 'reviews'])
+        parser.add_argument('--export-format', choices=list(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--output', '-o', default='-', help="Output file ('-' for stdout)")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        # Same filters as the list endpoints
+        parser.add_argument('--filter', dest='filter_type',
+                            help='Movie category: trending, top-rated or latest')
+        parser.add_argument('--search', help='Movie title/description search')
+        parser.add_argument('--movie-id', help='Only reviews of this movie')
+
+    def handle(self, *args, **options):
+        if options['dataset'] == 'movies':
+            params = {'filter': options['filter_type'], 'search': options['search']}
+            queryset = filter_movies(Movie.objects.all(), params)
+            fields = MOVIE_EXPORT_FIELDS
+        else:
+            queryset = filter_reviews(Review.objects.order_by('id'), {'movie_id': options['movie_id']})
+            fields = REVIEW_EXPORT_FIELDS
+
+        chunks = iter_export(queryset, fields, options['export_format'], options['chunk_size'])
+        if options['output'] == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        # newline='' so the csv module's \r\n line endings pass through untouched
+        with open(options['output'], 'w', newline='', encoding='utf-8') as f:
+            for chunk in chunks:
+                f.write(chunk)
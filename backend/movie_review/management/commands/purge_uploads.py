@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from movie_review.uploads import purge_stale
+
+
+class Command(BaseCommand):
+    help = 'Delete unfinished chunked image uploads and their staged bytes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=None,
+                            help='Idle time before an upload is purged (default: IMAGE_UPLOAD_EXPIRY_HOURS)')
+
+    def handle(self, *args, **options):
+        max_age = timedelta(hours=options['hours']) if options['hours'] is not None else None
+        count = purge_stale(max_age)
+        self.stdout.write(self.style.SUCCESS(f'Purged {count} stale upload(s)'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from movie_review import trending
+
+
+class Command(BaseCommand):
+    help = 'Move the trending epoch to now (run periodically), or rebuild all scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recompute scores from review, comment and wishlist history')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = trending.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt trending scores for {count} movies"))
+        else:
+            factor = trending.rebase()
+            self.stdout.write(self.style.SUCCESS(f"Rebased trending scores (scaled by {factor:.6g})"))
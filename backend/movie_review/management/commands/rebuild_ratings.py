@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from movie_review.models import Movie
+from movie_review.ratings import bayesian_expression, prior, rebuild_histograms
+
+
+class Command(BaseCommand):
+    help = 'Recompute rating totals, Bayesian scores and histograms for every movie from its reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        totals = Movie.objects.annotate(total=Sum('reviews__rating'), count=Count('reviews')).values_list(
+            'pk', 'total', 'count'
+        )
+
+        fixed = 0
+        with transaction.atomic():
+            for pk, total, count in totals.iterator(chunk_size=options['chunk_size']):
+                fixed += Movie.objects.filter(pk=pk).exclude(rating_sum=total or 0, rating_count=count).update(
+                    rating_sum=total or 0, rating_count=count
+                )
+            # Recompute every score in one statement, e.g. after the prior changed
+            Movie.objects.update(bayesian_rating=bayesian_expression('rating_sum', 'rating_count'))
+
+        histograms = rebuild_histograms(chunk_size=options['chunk_size'])
+
+        stats = Movie.objects.aggregate(total=Sum('rating_sum'), count=Sum('rating_count'))
+        observed = stats['total'] / stats['count'] if stats['count'] else 0
+        mean, weight = prior()
+        self.stdout.write(self.style.SUCCESS(
+            f"Corrected totals on {fixed} movies, rebuilt {histograms} histograms. Prior mean {mean} (weight {weight}); "
+            f"observed global mean {observed:.2f}"
+        ))
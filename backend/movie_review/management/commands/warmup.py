@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movie_review.warmup import COMPONENTS, STARTUP_COMPONENTS, run
+
+
+class Command(BaseCommand):
+    help = ('Pre-populate caches, listing pages and search indexes after a deploy. '
+            'Shared caches are filled for every worker; in-process ones only for this process, '
+            'so set WARMUP_ON_STARTUP for those.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('components', nargs='*',
+                            help=f"Components to warm, from {', '.join(COMPONENTS)} "
+                                 f"(default: {', '.join(STARTUP_COMPONENTS)})")
+        parser.add_argument('--snapshots', action='store_true',
+                            help='Also rebuild the static listing snapshots')
+        parser.add_argument('--sequential', action='store_true',
+                            help='Warm one component at a time, to see each cost in isolation')
+
+    def handle(self, *args, **options):
+        components = list(options['components'] or STARTUP_COMPONENTS)
+        unknown = set(components) - set(COMPONENTS)
+        if unknown:
+            raise CommandError(f"Unknown components: {', '.join(sorted(unknown))}")
+        if options['snapshots'] and 'snapshots' not in components:
+            components.append('snapshots')
+
+        started = time.perf_counter()
+        results = run(components, parallel=not options['sequential'])
+        elapsed = time.perf_counter() - started
+
+        failed = []
+        for name, (seconds, error) in results.items():
+            if error is None:
+                self.stdout.write(f'  {name:<16} {seconds * 1000:8.1f} ms')
+            else:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(f'  {name:<16} {seconds * 1000:8.1f} ms  failed: {error}'))
+
+        if failed:
+            raise CommandError(f"Warm-up failed for {', '.join(failed)} ({elapsed:.2f}s total)")
+        self.stdout.write(self.style.SUCCESS(f'Warmed {len(results)} components in {elapsed:.2f}s'))
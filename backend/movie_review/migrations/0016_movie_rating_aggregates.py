@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:00
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+import movie_review.models
+
+
+def backfill_ratings(apps, schema_editor):
+    Movie = apps.get_model('movie_review', 'Movie')
+    mean = float(getattr(settings, 'RATING_PRIOR_MEAN', 6.5))
+    weight = float(getattr(settings, 'RATING_PRIOR_WEIGHT', 10))
+
+    totals = Movie.objects.annotate(total=Sum('reviews__rating'), count=Count('reviews'))
+    for movie in totals.iterator(chunk_size=2000):
+        total = movie.total or 0
+        Movie.objects.filter(pk=movie.pk).update(
+            rating_sum=total,
+            rating_count=movie.count,
+            bayesian_rating=(mean * weight + total) / (weight + movie.count),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie_review', '0015_moviesimilarity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='bayesian_rating',
+            field=models.FloatField(db_index=True, default=movie_review.models.default_bayesian_rating),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:00
+
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_trending(apps, schema_editor):
+    # Same scoring as trending.rebuild(), so the trending listing isn't empty
+    # until someone runs `rebase_trending --rebuild`
+    Movie = apps.get_model('movie_review', 'Movie')
+    Review = apps.get_model('movie_review', 'Review')
+    Comment = apps.get_model('movie_review', 'Comment')
+    Wishlist = apps.get_model('movie_review', 'Wishlist')
+    TrendingEpoch = apps.get_model('movie_review', 'TrendingEpoch')
+
+    half_life_hours = getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 72)
+    tau = half_life_hours * 3600 / math.log(2)
+    weights = getattr(settings, 'TRENDING_WEIGHTS', {})
+    now = timezone.now()
+    horizon = now - timedelta(hours=half_life_hours * 20)
+
+    scores = {}
+    for model, kind in ((Review, 'review'), (Comment, 'comment')):
+        weight = weights.get(kind, 1.0)
+        rows = model.objects.filter(created_at__gte=horizon).values_list('movie_id', 'created_at')
+        for movie_id, created_at in rows.iterator(chunk_size=2000):
+            scores[movie_id] = scores.get(movie_id, 0.0) + weight * math.exp((created_at - now).total_seconds() / tau)
+
+    # Wishlist entries have no timestamp, so they count as of now
+    weight = weights.get('wishlist', 1.0)
+    for movie_id in Wishlist.objects.values_list('movie_id', flat=True).iterator(chunk_size=2000):
+        scores[movie_id] = scores.get(movie_id, 0.0) + weight
+
+    TrendingEpoch.objects.update_or_create(pk=1, defaults={'epoch': now})
+    Movie.objects.bulk_update(
+        [Movie(pk=movie_id, trending_score=score) for movie_id, score in scores.items()],
+        ['trending_score'], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie_review', '0016_movie_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='trending_score',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.CreateModel(
+            name='TrendingEpoch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('epoch', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(backfill_trending, migrations.RunPython.noop),
+    ]
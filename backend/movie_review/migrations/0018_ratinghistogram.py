@@ -0,0 +1,59 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:00
+
+import math
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_histograms(apps, schema_editor):
+    Review = apps.get_model('movie_review', 'Review')
+    RatingHistogram = apps.get_model('movie_review', 'RatingHistogram')
+    TrendingEpoch = apps.get_model('movie_review', 'TrendingEpoch')
+
+    epoch = TrendingEpoch.objects.get(pk=1).epoch
+    tau = getattr(settings, 'RATING_RECENT_HALF_LIFE_DAYS', 30) * 86400 / math.log(2)
+
+    histograms = {}
+    rows = Review.objects.values_list('movie_id', 'rating', 'created_at')
+    for movie_id, rating, created_at in rows.iterator(chunk_size=5000):
+        histogram = histograms.get(movie_id)
+        if histogram is None:
+            histogram = histograms[movie_id] = RatingHistogram(movie_id=movie_id)
+        field = f'rating_{rating}'
+        setattr(histogram, field, getattr(histogram, field) + 1)
+        weight = math.exp((created_at - epoch).total_seconds() / tau)
+        histogram.recent_sum += rating * weight
+        histogram.recent_weight += weight
+
+    RatingHistogram.objects.bulk_create(histograms.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie_review', '0017_trending_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingHistogram',
+            fields=[
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='histogram', serialize=False, to='movie_review.movie')),
+                ('rating_1', models.PositiveIntegerField(default=0)),
+                ('rating_2', models.PositiveIntegerField(default=0)),
+                ('rating_3', models.PositiveIntegerField(default=0)),
+                ('rating_4', models.PositiveIntegerField(default=0)),
+                ('rating_5', models.PositiveIntegerField(default=0)),
+                ('rating_6', models.PositiveIntegerField(default=0)),
+                ('rating_7', models.PositiveIntegerField(default=0)),
+                ('rating_8', models.PositiveIntegerField(default=0)),
+                ('rating_9', models.PositiveIntegerField(default=0)),
+                ('rating_10', models.PositiveIntegerField(default=0)),
+                ('recent_sum', models.FloatField(default=0)),
+                ('recent_weight', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_histograms, migrations.RunPython.noop),
+    ]
@@ -1,33 +1,89 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models import Q, Avg
+from django.db.models import Q
+
+def default_bayesian_rating():
+    """A movie without reviews sits at the prior mean, see movie_review.ratings."""
+    return float(getattr(settings, 'RATING_PRIOR_MEAN', 6.5))
+
 
 class Movie(models.Model):
-    title = models.CharField(max_length=255)
+    title = models.CharField(max_length=255, db_index=True)
     description = models.TextField()
     release_date = models.DateField()
     image = models.ImageField(upload_to='movies/', blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Last change to anything a snapshot of the movie renders: bumped on save,
+    # by movie_review.ratings and on wishlist changes
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Maintained by movie_review.ratings on every review write
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    bayesian_rating = models.FloatField(default=default_bayesian_rating, db_index=True)
+    # Exponentially time-decayed activity, see movie_review.trending
+    trending_score = models.FloatField(default=0, db_index=True)
     
     def __str__(self):
         return self.title
     
     @property
     def average_rating(self):
-        """Calculate average rating from reviews"""
-        avg = self.reviews.aggregate(Avg('rating'))['rating__avg']
-        return round(avg, 1) if avg else 0
+        """Average rating from the maintained review totals"""
+        if not self.rating_count:
+            return 0
+        return round(self.rating_sum / self.rating_count, 1)
     
     @property
     def review_count(self):
         """Get total number of reviews"""
-        return self.reviews.count()
+        return self.rating_count
     
     @property
     def wishlist_count(self):
         """Get total number of users who wishlisted this movie"""
+        # List views annotate the count up front instead of a query per movie
+        if hasattr(self, 'wishlist_total'):
+            return self.wishlist_total
         return self.wishlist_set.count()
     
+class RatingHistogram(models.Model):
+    """Per-movie count of reviews at each rating, maintained by movie_review.ratings.
+
+    ``recent_sum`` / ``recent_weight`` hold a time-decayed weighted sum of
+    ratings, so their ratio is the recent average without scanning reviews.
+    """
+    movie = models.OneToOneField(Movie, on_delete=models.CASCADE, primary_key=True, related_name='histogram')
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+    rating_6 = models.PositiveIntegerField(default=0)
+    rating_7 = models.PositiveIntegerField(default=0)
+    rating_8 = models.PositiveIntegerField(default=0)
+    rating_9 = models.PositiveIntegerField(default=0)
+    rating_10 = models.PositiveIntegerField(default=0)
+    recent_sum = models.FloatField(default=0)
+    recent_weight = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"Histogram for {self.movie_id}"
+
+    @property
+    def counts(self):
+        return [getattr(self, f'rating_{n}') for n in range(1, 11)]
+
+class TrendingEpoch(models.Model):
+    """Single row holding the reference time that trending scores are scaled to."""
+    epoch = models.DateTimeField()
+
+    def __str__(self):
+        return f"Trending epoch {self.epoch:%Y-%m-%d %H:%M}"
+
 class Wishlist(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='wishlist')
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
@@ -38,12 +94,33 @@ class Wishlist(models.Model):
     class Meta:
         unique_together = ('user', 'movie')
 
+class MovieSimilarity(models.Model):
+    """Precomputed top-k neighbours of a movie, see the build_similarities command."""
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='similarities')
+    similar_movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    def __str__(self):
+        return f"{self.movie_id} ~ {self.similar_movie_id} ({self.score:.3f})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'rank'], name='unique_similarity_rank'),
+        ]
+
 class Comment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='comments')
     comment_text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['movie', '-created_at', '-id'], name='comment_movie_feed_idx'),
+            models.Index(fields=['created_at'], name='comment_created_idx'),
+        ]
+
 class Review(models.Model):
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='reviews')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -57,6 +134,9 @@ class Review(models.Model):
         return f"{self.user.username} - {self.movie.title}"
 
     class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='review_created_idx'),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=Q(rating__gte=1, rating__lte=10),
@@ -65,4 +145,31 @@ class Review(models.Model):
             ),
         ]
 
-    
\ No newline at end of file
+    
+
+class ImageUpload(models.Model):
+    """A resumable, chunked poster upload, see movie_review.uploads."""
+    UPLOADING = 'uploading'
+    COMPLETE = 'complete'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (UPLOADING, 'Uploading'),
+        (COMPLETE, 'Complete'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='image_uploads')
+    movie = models.ForeignKey(Movie, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64, db_index=True)
+    received = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=UPLOADING)
+    # Storage name of the finished, content-addressed image
+    image = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
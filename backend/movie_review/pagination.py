@@ -0,0 +1,21 @@
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination
+
+
+class CommentFeedPagination(CursorPagination):
+    """Newest-first keyset pagination for comment feeds.
+
+    Pages are fetched with ``WHERE created_at < cursor`` on an indexed column
+    instead of an OFFSET, so deep pages cost the same as the first one.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+    def decode_cursor(self, request):
+        # DRF answers a malformed cursor with 404; it's a bad parameter, not a missing page
+        try:
+            return super().decode_cursor(request)
+        except NotFound:
+            raise ValidationError({self.cursor_query_param: self.invalid_cursor_message})
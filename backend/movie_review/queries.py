@@ -0,0 +1,99 @@
+"""Listing queries shared by the API views, exports, warm-up and snapshots."""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Q, When
+
+from . import fuzzy_search, trending
+from .models import Movie
+from .recommendations import get_for_you
+
+
+def filter_movies(queryset, params, user=None):
+    """Apply the movie list's ``search`` and ``filter`` query parameters.
+
+    With ``search_mode=fuzzy`` the search tolerates typos in the title and
+    results come back ranked by similarity instead of by ``filter``.
+    """
+    filter_type = params.get('filter', None)
+    search = params.get('search', None)
+
+    if search and params.get('search_mode') == 'fuzzy':
+        movie_ids = [movie_id for movie_id, _ in fuzzy_search.search(search)]
+        if not movie_ids:
+            return queryset.none()
+        return queryset.filter(pk__in=movie_ids).order_by(
+            Case(*[When(pk=pk, then=position) for position, pk in enumerate(movie_ids)])
+        )
+
+    # Apply search filter
+    if search:
+        queryset = queryset.filter(
+            Q(title__icontains=search) | Q(description__icontains=search)
+        )
+
+    # Apply category filters
+    if filter_type == 'for-you':
+        # For you: precomputed per-user candidates, trending for cold-start users
+        movie_ids = get_for_you(user.id) if user is not None and user.is_authenticated else []
+        if movie_ids:
+            queryset = queryset.filter(pk__in=movie_ids).order_by(
+                Case(*[When(pk=pk, then=position) for position, pk in enumerate(movie_ids)])
+            )
+        else:
+            queryset = trending.trending_queryset(queryset)
+
+    elif filter_type == 'trending':
+        # Trending: time-decayed review/comment/wishlist activity, updated per event
+        queryset = trending.trending_queryset(queryset)
+        
+    elif filter_type == 'top-rated':
+        # Top-rated: Bayesian-weighted average, maintained on each review write
+        queryset = queryset.filter(
+            rating_count__gte=settings.TOP_RATED_MIN_REVIEWS
+        ).order_by('-bayesian_rating', '-rating_count')
+        
+    elif filter_type == 'latest':
+        # Latest: Most recently added movies
+        queryset = queryset.order_by('-created_at')
+    else:
+        # Default: Order by release date (newest first)
+        queryset = queryset.order_by('-release_date')
+
+    return queryset
+
+
+CATEGORY_COUNTS_CACHE_KEY = 'movie-categories'
+
+
+def category_counts(refresh=False):
+    """Number of movies in each listing category, cached for CATEGORY_COUNTS_CACHE_TTL seconds."""
+    if not refresh:
+        counts = cache.get(CATEGORY_COUNTS_CACHE_KEY)
+        if counts is not None:
+            return counts
+
+    trending_count = trending.trending_queryset(Movie.objects.all()).count()
+    
+    top_rated_count = Movie.objects.filter(
+        rating_count__gte=settings.TOP_RATED_MIN_REVIEWS
+    ).count()
+    
+    latest_count = Movie.objects.count()
+    
+    counts = {
+        'trending': trending_count,
+        'top-rated': top_rated_count,
+        'latest': latest_count,
+        'all': latest_count
+    }
+    cache.set(CATEGORY_COUNTS_CACHE_KEY, counts, getattr(settings, 'CATEGORY_COUNTS_CACHE_TTL', 60))
+    return counts
+
+
+def filter_reviews(queryset, params):
+    """Apply the review list's ``movie_id`` query parameter."""
+    movie_id = params.get("movie_id")
+    if movie_id:
+        return queryset.filter(movie_id=movie_id)
+    return queryset
@@ -0,0 +1,176 @@
+"""Incrementally maintained rating aggregates on ``Movie``.
+
+Every review write adjusts ``rating_sum`` and ``rating_count`` with a single
+UPDATE and recomputes ``bayesian_rating`` in the same statement:
+
+    bayesian = (C * m + sum) / (C + count)
+
+where ``m`` is RATING_PRIOR_MEAN and ``C`` is RATING_PRIOR_WEIGHT. A movie
+with few reviews is pulled towards the prior, so three 10s no longer beat
+five hundred 9s. ``rebuild_ratings`` recomputes everything from scratch.
+
+The same writes keep the movie's ``RatingHistogram`` current: one counter
+per rating value plus a time-decayed sum (scaled to the trending epoch, see
+``trending.py``) for the recent average. ``rating_stats`` derives the mean,
+median and percentiles from those ten counters alone.
+"""
+
+import math
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import Movie, RatingHistogram, Review
+from .trending import get_epoch, locked_epoch, recent_scale
+
+
+def prior():
+    return (
+        float(getattr(settings, 'RATING_PRIOR_MEAN', 6.5)),
+        float(getattr(settings, 'RATING_PRIOR_WEIGHT', 10)),
+    )
+
+
+def bayesian_expression(rating_sum, rating_count):
+    mean, weight = prior()
+    return (Value(mean * weight) + Cast(rating_sum, FloatField())) / (Value(weight) + Cast(rating_count, FloatField()))
+
+
+def apply_rating_change(movie_id, added=None, removed=None):
+    """Account for a review rating being added and/or removed on a movie."""
+    count_delta = (added is not None) - (removed is not None)
+    sum_delta = (added or 0) - (removed or 0)
+    if not count_delta and not sum_delta:
+        return
+
+    # Both SET expressions read the pre-update column values
+    new_sum = F('rating_sum') + sum_delta
+    new_count = F('rating_count') + count_delta
+    Movie.objects.filter(pk=movie_id).update(
+        rating_sum=new_sum,
+        rating_count=new_count,
+        bayesian_rating=bayesian_expression(new_sum, new_count),
+        updated_at=timezone.now(),
+    )
+
+
+def apply_histogram_change(movie_id, rating, created_at, sign):
+    """Add (``sign=1``) or remove (``sign=-1``) one rating from a movie's histogram."""
+    with transaction.atomic():
+        weight = recent_scale(created_at, locked_epoch())
+        field = f'rating_{rating}'
+        updated = RatingHistogram.objects.filter(movie_id=movie_id).update(**{
+            field: F(field) + sign,
+            'recent_sum': F('recent_sum') + sign * rating * weight,
+            'recent_weight': F('recent_weight') + sign * weight,
+        })
+        if updated or sign < 0:
+            return
+
+        try:
+            with transaction.atomic():
+                RatingHistogram.objects.create(
+                    movie_id=movie_id, recent_sum=rating * weight, recent_weight=weight, **{field: 1}
+                )
+        except IntegrityError:
+            # Another request created the row first
+            pass
+        else:
+            return
+    apply_histogram_change(movie_id, rating, created_at, sign)
+
+
+def review_saved(review, old_movie_id=None, old_rating=None):
+    """Update aggregates after a review is created (no old values) or edited."""
+    if old_movie_id is None or old_movie_id == review.movie_id:
+        apply_rating_change(review.movie_id, added=review.rating, removed=old_rating)
+    else:
+        apply_rating_change(old_movie_id, removed=old_rating)
+        apply_rating_change(review.movie_id, added=review.rating)
+
+    if old_rating is not None:
+        apply_histogram_change(old_movie_id, old_rating, review.created_at, -1)
+    apply_histogram_change(review.movie_id, review.rating, review.created_at, 1)
+
+
+def review_deleted(review):
+    apply_rating_change(review.movie_id, removed=review.rating)
+    apply_histogram_change(review.movie_id, review.rating, review.created_at, -1)
+
+
+def review_post_delete(sender, instance, origin=None, **kwargs):
+    """Connected to ``post_delete``, so API, admin and cascading deletes are all counted.
+
+    Reviews deleted along with their movie are skipped; the movie's totals
+    and histogram go with it.
+    """
+    if isinstance(origin, Movie) or getattr(origin, 'model', None) is Movie:
+        return
+    review_deleted(instance)
+
+
+def _rating_at_rank(counts, rank):
+    """The ``rank``-th smallest rating (1-based) given counts for ratings 1..10."""
+    seen = 0
+    for rating, count in enumerate(counts, start=1):
+        seen += count
+        if seen >= rank:
+            return rating
+    return len(counts)
+
+
+def _percentile(counts, total, percent):
+    """Nearest-rank percentile, in integer arithmetic to avoid rounding surprises."""
+    return _rating_at_rank(counts, max(1, -(-percent * total // 100)))
+
+
+def rating_stats(histogram):
+    """Distribution, mean, median, percentiles and recent average from a histogram."""
+    counts = histogram.counts if histogram is not None else [0] * 10
+    total = sum(counts)
+    stats = {
+        'count': total,
+        'distribution': {str(rating): count for rating, count in enumerate(counts, start=1)},
+        'mean': None,
+        'median': None,
+        'percentiles': None,
+        'recent_mean': None,
+    }
+    if not total:
+        return stats
+
+    stats['mean'] = round(sum(r * c for r, c in enumerate(counts, start=1)) / total, 2)
+    # A float either way, so clients don't see 8 for an odd count and 7.5 for an even one
+    if total % 2:
+        stats['median'] = float(_rating_at_rank(counts, total // 2 + 1))
+    else:
+        # Average of the two middle ratings
+        stats['median'] = (_rating_at_rank(counts, total // 2) + _rating_at_rank(counts, total // 2 + 1)) / 2
+    stats['percentiles'] = {str(p): _percentile(counts, total, p) for p in (10, 25, 75, 90)}
+    if histogram.recent_weight > 0:
+        stats['recent_mean'] = round(histogram.recent_sum / histogram.recent_weight, 2)
+    return stats
+
+
+def rebuild_histograms(chunk_size=5000):
+    """Recreate every movie's histogram from its reviews. Returns the row count."""
+    epoch = get_epoch()
+    histograms = {}
+    rows = Review.objects.values_list('movie_id', 'rating', 'created_at')
+    for movie_id, rating, created_at in rows.iterator(chunk_size=chunk_size):
+        histogram = histograms.get(movie_id)
+        if histogram is None:
+            histogram = histograms[movie_id] = RatingHistogram(movie_id=movie_id)
+        field = f'rating_{rating}'
+        setattr(histogram, field, getattr(histogram, field) + 1)
+        weight = recent_scale(created_at, epoch)
+        histogram.recent_sum += rating * weight
+        histogram.recent_weight += weight
+
+    with transaction.atomic():
+        RatingHistogram.objects.all().delete()
+        RatingHistogram.objects.bulk_create(histograms.values(), batch_size=1000)
+    return len(histograms)
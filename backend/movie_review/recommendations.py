@@ -0,0 +1,128 @@
+"""Item-to-item recommendations.
+
+``compute_item_similarities`` does the heavy lifting for the
+``build_similarities`` command. It needs NumPy and SciPy, which are only
+imported when the build runs so the web workers don't pay for them.
+
+The "for you" feed (``get_for_you``) ranks unseen movies per user from those
+neighbours and caches the result.
+"""
+
+import heapq
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import MovieSimilarity, Review, Wishlist
+
+
+def compute_item_similarities(user_ids, movie_ids, weights, k=20, block_size=1024):
+    """Return the top-``k`` cosine neighbours of every movie.
+
+    ``user_ids``, ``movie_ids`` and ``weights`` are parallel 1-D arrays of
+    interactions; duplicates of the same (user, movie) pair are summed.
+    Yields ``(movie_id, [(neighbour_id, score), ...])`` with neighbours
+    sorted by descending score.
+
+    The similarity matrix is computed a block of movies at a time, so peak
+    memory is bounded by ``block_size`` rows of the (sparse) product rather
+    than the full movies x movies matrix.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    user_ids = np.asarray(user_ids)
+    movie_ids = np.asarray(movie_ids)
+    weights = np.asarray(weights, dtype=np.float32)
+    if not len(weights):
+        return
+
+    users, user_index = np.unique(user_ids, return_inverse=True)
+    movies, movie_index = np.unique(movie_ids, return_inverse=True)
+
+    # movies x users, so each row is a movie's interaction vector
+    matrix = sparse.csr_matrix(
+        (weights, (movie_index, user_index)), shape=(len(movies), len(users)), dtype=np.float32
+    )
+    matrix.sum_duplicates()
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    normalized = sparse.diags(1.0 / norms).dot(matrix).tocsr()
+    transposed = normalized.T.tocsc()
+
+    for start in range(0, len(movies), block_size):
+        stop = min(start + block_size, len(movies))
+        block = normalized[start:stop].dot(transposed).tocsr()
+
+        for row in range(stop - start):
+            begin, end = block.indptr[row], block.indptr[row + 1]
+            columns = block.indices[begin:end]
+            scores = block.data[begin:end]
+
+            # Drop the movie itself
+            keep = columns != start + row
+            columns, scores = columns[keep], scores[keep]
+            if not len(scores):
+                continue
+
+            if len(scores) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                columns, scores = columns[top], scores[top]
+            order = np.argsort(-scores, kind='stable')
+
+            yield int(movies[start + row]), [
+                (int(movies[columns[i]]), float(scores[i])) for i in order
+            ]
+
+
+def for_you_cache_key(user_id):
+    return f'for-you:{user_id}'
+
+
+def build_for_you(user_id, limit=100):
+    """Rank unseen movies for a user from the neighbours of what they liked.
+
+    Seeds are the user's wishlist (weight 1) and reviews (rating / 10);
+    each seed's neighbours add ``seed weight * similarity`` to their score.
+    Returns movie ids, best first; empty for users with no history.
+    """
+    wishlist_weight = getattr(settings, 'SIMILARITY_WISHLIST_WEIGHT', 1.0)
+    seeds = {
+        movie_id: wishlist_weight
+        for movie_id in Wishlist.objects.filter(user_id=user_id).values_list('movie_id', flat=True)
+    }
+    for movie_id, rating in Review.objects.filter(user_id=user_id).values_list('movie_id', 'rating'):
+        seeds[movie_id] = max(seeds.get(movie_id, 0), rating / 10.0)
+    if not seeds:
+        return []
+
+    # Everything the user already wishlisted or reviewed is excluded
+    seen = set(seeds)
+    scores = {}
+    neighbours = MovieSimilarity.objects.filter(movie_id__in=seen).values_list(
+        'movie_id', 'similar_movie_id', 'score'
+    )
+    for movie_id, similar_id, score in neighbours:
+        if similar_id in seen:
+            continue
+        scores[similar_id] = scores.get(similar_id, 0.0) + seeds[movie_id] * score
+
+    ranked = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+    return [movie_id for movie_id, _ in ranked]
+
+
+def get_for_you(user_id):
+    """Cached ``build_for_you``; entries expire after FOR_YOU_CACHE_TTL seconds."""
+    key = for_you_cache_key(user_id)
+    movie_ids = cache.get(key)
+    if movie_ids is None:
+        movie_ids = build_for_you(user_id, limit=getattr(settings, 'FOR_YOU_LIMIT', 100))
+        cache.set(key, movie_ids, getattr(settings, 'FOR_YOU_CACHE_TTL', 3600))
+    return movie_ids
+
+
+def invalidate_for_you(user_id):
+    """Drop a user's cached candidates after their wishlist or reviews change."""
+    cache.delete(for_you_cache_key(user_id))
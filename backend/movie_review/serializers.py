@@ -1,8 +1,48 @@
 from rest_framework import serializers
-from .models import Movie, Wishlist, Comment, Review
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from .models import ImageUpload, Movie, Wishlist, Comment, Review
 from django.contrib.auth.models import User
 
-class MovieSerializer(serializers.ModelSerializer):
+
+def sparse_fieldset(request, field_names):
+    """Names from ``field_names`` kept by the request's ``?fields=`` and ``?omit=``.
+
+    Both take comma-separated field names; names the serializer doesn't have
+    are a 400. Only read requests are pruned, so write-only inputs are never
+    dropped.
+    """
+    selected = set(field_names)
+    if request is None or request.method not in SAFE_METHODS:
+        return selected
+
+    for param in ('fields', 'omit'):
+        value = request.query_params.get(param)
+        if not value:
+            continue
+        names = {name.strip() for name in value.split(',') if name.strip()}
+        unknown = names - set(field_names)
+        if unknown:
+            raise ValidationError({param: f"Unknown fields: {', '.join(sorted(unknown))}."})
+        if param == 'fields':
+            selected &= names
+        else:
+            selected -= names
+    return selected
+
+
+class SparseFieldsetMixin:
+    """Drop top-level fields not selected by ``?fields=`` / ``?omit=``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        keep = sparse_fieldset(self.context.get('request'), self.fields)
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
+
+
+class MovieSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     average_rating = serializers.ReadOnlyField()
     review_count = serializers.ReadOnlyField()
     wishlist_count = serializers.ReadOnlyField()
@@ -11,7 +51,7 @@ class MovieSerializer(serializers.ModelSerializer):
         model = Movie
         fields = ['id', 'title', 'description', 'release_date', 'image', 'created_at', 'average_rating', 'review_count', 'wishlist_count']
 
-class WishlistSerializer(serializers.ModelSerializer):
+class WishlistSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     movie_id = serializers.PrimaryKeyRelatedField(source='movie', queryset=Movie.objects.all(),
     write_only=True)
     movie = MovieSerializer(read_only=True)
@@ -20,7 +60,7 @@ class WishlistSerializer(serializers.ModelSerializer):
         model = Wishlist
         fields = ['id', 'user', 'movie_id', 'movie']
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
     username = serializers.CharField(source='user.username', read_only=True)
     
@@ -28,7 +68,7 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ['id', 'user', 'username', 'movie', 'comment_text', 'created_at']
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     movie_id = serializers.PrimaryKeyRelatedField(source='movie', queryset=Movie.objects.all(),
     write_only=True)
     movie = MovieSerializer(read_only=True)
@@ -38,3 +78,21 @@ class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = ['id', 'movie_id','movie', 'user', 'username', 'review_text', 'rating', 'created_at']
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    movie_id = serializers.PrimaryKeyRelatedField(source='movie', queryset=Movie.objects.all(),
+    required=False, allow_null=True)
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$')
+    image = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImageUpload
+        fields = ['id', 'movie_id', 'filename', 'size', 'sha256', 'received', 'status', 'image', 'created_at']
+        read_only_fields = ['received', 'status', 'created_at']
+
+    def get_image(self, obj):
+        if not obj.image:
+            return None
+        url = Movie._meta.get_field('image').storage.url(obj.image)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
@@ -0,0 +1,245 @@
+"""Precompressed JSON snapshots of the public catalogue for static serving.
+
+``build_snapshots`` renders each listing page (per ``filter=`` mode), the
+category counts and each movie's detail, and writes them under
+``SNAPSHOT_ROOT``:
+
+    objects/<sha256>.json[.gz|.br]   immutable, content-addressed
+    movies/<name>.json[.gz|.br]      stable alias of the current object
+    manifests/<version>.json         every file of one build
+    manifest.json                    the current build
+
+New objects are written first, then ``manifest.json`` is swapped in, then
+the aliases, each with ``os.replace`` so a static server never sees a
+half-written file. Only the newest ``SNAPSHOT_KEEP_MANIFESTS`` manifests are
+kept, and objects none of them reference are deleted after each build. ``aliases-pending.json`` lists the aliases still to be
+written while that happens, so a build that dies after the manifest swap is
+finished by the next one. Unchanged content keeps its object and isn't
+recompressed, and only the detail pages of movies whose ``updated_at``
+moved are re-rendered on incremental builds.
+
+Movies are rendered by ``CompiledMovieSerializer``, the same output as the
+live API in one query per page, with image URLs made absolute against
+``SNAPSHOT_BASE_URL`` where the API uses the request's host.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .fast_serializers import CompiledMovieSerializer
+from .models import Movie
+from .queries import category_counts, filter_movies
+from .serializers import MovieSerializer
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always written
+    brotli = None
+
+LISTING_FILTERS = ('all', 'trending', 'top-rated', 'latest')
+SUFFIXES = ('', '.gz', '.br')
+
+
+def _root():
+    return Path(getattr(settings, 'SNAPSHOT_ROOT', settings.BASE_DIR / 'snapshots'))
+
+
+def _atomic_write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _encode(payload):
+    return json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+
+
+def _variants(body):
+    variants = {'': body, '.gz': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(body, quality=11)
+    return variants
+
+
+def _load_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def load_manifest():
+    return _load_json(_root() / 'manifest.json')
+
+
+class _BaseURL:
+    """Stands in for the request when serializers build absolute URLs."""
+
+    def __init__(self, base):
+        self.base = base
+
+    def build_absolute_uri(self, location):
+        return urljoin(self.base, location)
+
+
+class SnapshotBuilder:
+    def __init__(self, page_size=None, max_pages=None):
+        self.root = _root()
+        self.page_size = page_size or getattr(settings, 'SNAPSHOT_PAGE_SIZE', 50)
+        self.max_pages = max_pages or getattr(settings, 'SNAPSHOT_MAX_PAGES', 20)
+        self.previous = load_manifest() or {'files': {}}
+        self.files = dict(self.previous['files'])
+        self.written = 0
+        # Changes made while this build runs are picked up by the next one
+        self.started_at = timezone.now()
+        # Left over when the previous build died between its manifest and its aliases
+        self.pending = set(_load_json(self.root / 'aliases-pending.json') or ())
+        self.serializer = CompiledMovieSerializer(
+            _BaseURL(getattr(settings, 'SNAPSHOT_BASE_URL', 'http://localhost:8000')),
+            fields=MovieSerializer.Meta.fields,
+        )
+        self.removed = 0
+
+    def _publish(self, name, payload):
+        """Store ``payload`` under logical ``name``; a no-op if the content is unchanged."""
+        body = _encode(payload)
+        digest = hashlib.sha256(body).hexdigest()
+        if self.files.get(name, {}).get('hash') == digest:
+            return
+
+        for suffix, data in _variants(body).items():
+            object_path = self.root / 'objects' / f'{digest}.json{suffix}'
+            if not object_path.exists():
+                _atomic_write(object_path, data)
+
+        # The alias is repointed by commit(), once the manifest lists the object
+        self.files[name] = {'hash': digest, 'object': f'objects/{digest}.json', 'size': len(body)}
+        self.pending.add(name)
+        self.written += 1
+
+    def _write_alias(self, name):
+        entry = self.files.get(name)
+        for suffix in SUFFIXES:
+            alias_path = self.root / f'{name}.json{suffix}'
+            object_path = self.root / f"{entry['object']}{suffix}" if entry else None
+            if object_path is not None and object_path.exists():
+                _atomic_write(alias_path, object_path.read_bytes())
+            else:
+                # Dropped pages and movies, and .br variants once brotli is gone
+                alias_path.unlink(missing_ok=True)
+
+    def build_listings(self):
+        for filter_type in LISTING_FILTERS:
+            queryset = filter_movies(Movie.objects.all(), {'filter': filter_type})
+            total = queryset.count()
+            pages = min(self.max_pages, max(1, -(-total // self.page_size)))
+
+            for page in range(1, pages + 1):
+                start = (page - 1) * self.page_size
+                movies = queryset[start:start + self.page_size]
+                self._publish(f'movies/{filter_type}/page-{page}', {
+                    'filter': filter_type,
+                    'page': page,
+                    'pages': pages,
+                    'count': total,
+                    'results': self.serializer.serialize(movies),
+                })
+
+            # Drop pages past the new end of the listing
+            prefix = f'movies/{filter_type}/page-'
+            for name in [n for n in self.files if n.startswith(prefix)]:
+                if int(name[len(prefix):]) > pages:
+                    del self.files[name]
+
+    def build_categories(self):
+        self._publish('movies/categories', category_counts(refresh=True))
+
+    def build_details(self, movie_ids=None):
+        """Render detail pages for ``movie_ids`` (all movies when None)."""
+        existing = set(Movie.objects.values_list('id', flat=True))
+        for name in [n for n in self.files if n.startswith('movies/detail/')]:
+            if int(name.rsplit('/', 1)[1]) not in existing:
+                del self.files[name]
+
+        if movie_ids is None:
+            movie_ids = existing
+        else:
+            # Movies without a snapshot yet are always rendered
+            missing = {pk for pk in existing if f'movies/detail/{pk}' not in self.files}
+            movie_ids = (set(movie_ids) & existing) | missing
+
+        movie_ids = sorted(movie_ids)
+        for start in range(0, len(movie_ids), 500):
+            chunk = Movie.objects.filter(pk__in=movie_ids[start:start + 500]).order_by('pk')
+            for movie in self.serializer.serialize(chunk):
+                self._publish(f"movies/detail/{movie['id']}", movie)
+
+    def commit(self):
+        """Write the versioned manifest, atomically make it current, then repoint the aliases."""
+        self.pending.update(set(self.previous['files']) - set(self.files))
+        pending_path = self.root / 'aliases-pending.json'
+        _atomic_write(pending_path, json.dumps(sorted(self.pending)).encode())
+
+        manifest = {
+            'version': timezone.now().strftime('%Y%m%d%H%M%S%f'),
+            'generated_at': self.started_at.isoformat(),
+            'files': self.files,
+        }
+        body = json.dumps(manifest, indent=1).encode()
+        _atomic_write(self.root / 'manifests' / f"{manifest['version']}.json", body)
+        _atomic_write(self.root / 'manifest.json', body)
+
+        for name in sorted(self.pending):
+            self._write_alias(name)
+        pending_path.unlink()
+        self.pending.clear()
+        self._collect_garbage()
+        return manifest
+
+    def _collect_garbage(self):
+        """Delete all but the newest manifests, and the objects none of those reference."""
+        keep = max(1, getattr(settings, 'SNAPSHOT_KEEP_MANIFESTS', 5))
+        # Versions are timestamps, so names sort oldest first
+        manifests = sorted((self.root / 'manifests').glob('*.json'))
+        for path in manifests[:-keep]:
+            path.unlink()
+
+        referenced = set()
+        for path in manifests[-keep:]:
+            files = (_load_json(path) or {}).get('files', {})
+            referenced.update(Path(entry['object']).name for entry in files.values())
+        for path in (self.root / 'objects').glob('*.json*'):
+            if path.name.startswith('.tmp-'):
+                continue
+            if f"{path.name.split('.', 1)[0]}.json" not in referenced:
+                path.unlink()
+                self.removed += 1
+
+
+def changed_movie_ids(since):
+    """Movies whose detail page may have changed after ``since``."""
+    return set(Movie.objects.filter(updated_at__gt=since).values_list('id', flat=True))
+
+
+def wishlist_changed(sender, instance, origin=None, **kwargs):
+    """Mark the movie changed, as its detail page shows the wishlist count."""
+    if isinstance(origin, Movie):
+        # The movie itself is being deleted
+        return
+    Movie.objects.filter(pk=instance.movie_id).update(updated_at=timezone.now())
@@ -0,0 +1,49 @@
+"""Server-sent events for live movie activity.
+
+These are plain async Django views rather than DRF views so that an idle
+connection is just a suspended coroutine; run under ASGI (see ``asgi.py``)
+to hold many open streams on one worker.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, StreamingHttpResponse
+
+from .events import get_broker, movie_channel
+from .models import Movie
+
+
+def _format_event(event):
+    data = json.dumps(event['data'], cls=DjangoJSONEncoder)
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+async def movie_events(request, movie_id):
+    """Stream ``review`` and ``comment`` events for one movie."""
+    if not await Movie.objects.filter(pk=movie_id).aexists():
+        raise Http404('Movie not found')
+
+    heartbeat = getattr(settings, 'MOVIE_EVENTS_HEARTBEAT', 15)
+
+    async def stream():
+        # Subscribed only once the body is iterated: a client gone before
+        # then never runs the finally below, and must not leave a subscription
+        subscription = get_broker().subscribe(movie_channel(movie_id))
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                event = await subscription.get(timeout=heartbeat)
+                if event is None:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ': keep-alive\n\n'
+                    continue
+                yield _format_event(event)
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,3 +1,1509 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import copy
+import datetime
+import gzip
+import hashlib
+import importlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connections, router, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from movie_review_project.database import database_from_url, serialized_writes
+from movie_review_project.db_routers import REPLICA_ALIAS, replica_reads
+from movie_review_project.middleware import CompressionMiddleware
+from movie_review_project.nplusone import NPlusOneError, NPlusOneMiddleware, assert_no_n_plus_one
+
+from . import batch, events, fuzzy_search, snapshots, trending, uploads, warmup, watch_providers
+from .streams import movie_events
+from .views import movie_queryset_for_fields
+from .recommendations import for_you_cache_key, get_for_you
+from .serializers import MovieSerializer
+from .models import Comment, ImageUpload, Movie, MovieSimilarity, RatingHistogram, Review, TrendingEpoch, Wishlist
+
+
+def make_movies(count, **fields):
+    return [
+        Movie.objects.create(
+            title=f'Movie {i}', description=f'Description {i}',
+            release_date=datetime.date(2000 + i % 20, 1, 1), **fields,
+        )
+        for i in range(count)
+    ]
+
+
+class ReplicaAliasMixin:
+    """Give the test database a second ``replica`` alias for the duration of the class.
+
+    The alias mirrors ``default`` (as ``DATABASE_REPLICA_URL`` does in
+    settings), so both connections see the same rows and the tests can tell
+    which one a request used. ``'__all__'`` resolves to both aliases once
+    the class is set up; naming ``replica`` here would fail the runner's
+    checks when ``DATABASE_REPLICA_URL`` isn't set.
+    """
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        if REPLICA_ALIAS not in connections.settings:
+            replica = copy.deepcopy(connections['default'].settings_dict)
+            replica['TEST']['MIRROR'] = 'default'
+            connections.settings[REPLICA_ALIAS] = replica
+            cls.addClassCleanup(cls._remove_replica_alias)
+        super().setUpClass()
+
+    @staticmethod
+    def _remove_replica_alias():
+        connections[REPLICA_ALIAS].close()
+        del connections[REPLICA_ALIAS]
+        del connections.settings[REPLICA_ALIAS]
+
+    def assertUsesAlias(self, alias, method, url, data=None):
+        """Run the request and check that only ``alias`` served its queries."""
+        other = 'default' if alias == REPLICA_ALIAS else REPLICA_ALIAS
+        with CaptureQueriesContext(connections[alias]) as used, \
+                CaptureQueriesContext(connections[other]) as unused:
+            response = getattr(self.client, method)(url, data, format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, getattr(response, 'data', None))
+        self.assertTrue(used.captured_queries, f'{method.upper()} {url} ran no queries on {alias}')
+        self.assertEqual(unused.captured_queries, [], f'{method.upper()} {url} queried {other}')
+        return response
+
+
+class ReplicaRoutingTests(ReplicaAliasMixin, TransactionTestCase):
+    # Shared in-memory SQLite connections can't read rows another connection
+    # hasn't committed, so this runs outside TestCase's wrapping transaction
+
+    def setUp(self):
+        cache.clear()
+        self.movies = make_movies(3)
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw-admin-123')
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw-alice-123')
+        Review.objects.create(user=self.user, movie=self.movies[0], rating=8, review_text='Great')
+        # The first trending read creates the epoch row, a write
+        trending.get_epoch()
+        self.client = APIClient()
+
+    def test_movie_reads_use_the_replica(self):
+        movie = self.movies[0]
+        for name, args in (
+            ('movie-list', []),
+            ('movie-detail', [movie.pk]),
+            ('movie-categories', []),
+            ('movie-similar', [movie.pk]),
+            ('movie-stats', [movie.pk]),
+            ('movie-watch-options', [movie.pk]),
+        ):
+            with self.subTest(name):
+                self.assertUsesAlias(REPLICA_ALIAS, 'get', reverse(name, args=args))
+
+    def test_streamed_exports_use_the_replica(self):
+        self.client.force_authenticate(self.admin)
+        for name in ('movie-export', 'review-export'):
+            for export_format in ('ndjson', 'csv'):
+                with self.subTest(name, export_format=export_format):
+                    self.assertUsesAlias(REPLICA_ALIAS, 'get', reverse(name), {'export_format': export_format})
+
+    def test_actions_not_listed_use_the_primary(self):
+        self.assertUsesAlias('default', 'get', reverse('review-list'))
+        self.assertUsesAlias('default', 'get', reverse('comment-list'))
+
+    def test_writes_and_their_reads_use_the_primary(self):
+        self.client.force_authenticate(self.admin)
+        self.assertUsesAlias('default', 'post', reverse('movie-list'), {
+            'title': 'New', 'description': 'New movie', 'release_date': '2024-01-01',
+        })
+        self.assertUsesAlias('default', 'patch', reverse('movie-detail', args=[self.movies[1].pk]),
+                             {'title': 'Renamed'})
+
+        self.client.force_authenticate(self.user)
+        self.assertUsesAlias('default', 'post', reverse('review-list'), {
+            'movie_id': self.movies[1].pk, 'rating': 7, 'review_text': 'Fine',
+        })
+
+    def test_router_falls_back_to_default_outside_replica_actions(self):
+        self.assertEqual(router.db_for_read(Movie), 'default')
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Movie), REPLICA_ALIAS)
+            self.assertEqual(router.db_for_write(Movie), 'default')
+        self.assertEqual(router.db_for_read(Movie), 'default')
+
+
+class SerializedWriteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.movies = make_movies(2)
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'pw-alice-123')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        patcher = mock.patch('movie_review.views.serialized_writes', side_effect=serialized_writes)
+        self.lock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertLockedOnce(self, method, url, data=None, status_code=None):
+        self.lock.reset_mock()
+        response = getattr(self.client, method)(url, data, format='json')
+        if status_code is not None:
+            self.assertEqual(response.status_code, status_code, getattr(response, 'data', None))
+        self.assertEqual(self.lock.call_count, 1, f'{method.upper()} {url}')
+        return response
+
+    def test_review_writes_take_the_lock_once(self):
+        movie = self.movies[0]
+        response = self.assertLockedOnce('post', reverse('review-list'), {
+            'movie_id': movie.pk, 'rating': 8, 'review_text': 'Great',
+        }, status_code=201)
+        url = reverse('review-detail', args=[response.data['id']])
+        self.assertLockedOnce('patch', url, {'rating': 4}, status_code=200)
+        movie.refresh_from_db()
+        self.assertEqual((movie.rating_count, movie.rating_sum), (1, 4))
+        self.assertLockedOnce('delete', url, status_code=204)
+        movie.refresh_from_db()
+        self.assertEqual(movie.rating_count, 0)
+
+    def test_comment_and_wishlist_writes_take_the_lock_once(self):
+        movie = self.movies[1]
+        self.assertLockedOnce('post', reverse('comment-list'), {
+            'movie': movie.pk, 'comment_text': 'Hello',
+        }, status_code=201)
+        self.assertTrue(Comment.objects.filter(user=self.user, movie=movie).exists())
+
+        self.assertLockedOnce('post', reverse('wishlist-list'), {'movie_id': movie.pk}, status_code=201)
+        self.assertLockedOnce('delete', reverse('wishlist-detail', args=[movie.pk]), status_code=204)
+        self.assertFalse(Wishlist.objects.filter(user=self.user).exists())
+
+    def test_process_lock_is_opt_in(self):
+        with mock.patch('movie_review_project.database._write_lock') as lock:
+            with serialized_writes():
+                lock.__enter__.assert_not_called()
+            with override_settings(SQLITE_SERIALIZE_WRITES=True), serialized_writes():
+                lock.__enter__.assert_called_once()
+
+
+class DatabaseURLTests(TestCase):
+    def test_every_backend_honours_conn_max_age(self):
+        sqlite = database_from_url('sqlite:///db.sqlite3', Path('/srv'), conn_max_age=60)
+        self.assertEqual((sqlite['NAME'], sqlite['CONN_MAX_AGE'], sqlite['CONN_HEALTH_CHECKS']),
+                         (Path('/srv/db.sqlite3'), 60, True))
+        postgres = database_from_url('postgres://app:secret@db:5432/movies', Path('/srv'), conn_max_age=60)
+        self.assertEqual((postgres['NAME'], postgres['HOST'], postgres['CONN_MAX_AGE']), ('movies', 'db', 60))
+        # psycopg's pool replaces persistent connections
+        pooled = database_from_url('postgres://db/movies', Path('/srv'), conn_max_age=60, pool=True)
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+
+
+class SimilarMoviesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.movies = make_movies(8)
+        users = [User.objects.create_user(f'user{i}', f'user{i}@example.com', 'pw') for i in range(3)]
+        for movie in cls.movies:
+            for user in users:
+                Wishlist.objects.create(user=user, movie=movie)
+        # Stored neighbours of the first movie, best first: movies 7, 6, ..., 1
+        MovieSimilarity.objects.bulk_create([
+            MovieSimilarity(movie=cls.movies[0], similar_movie=movie, score=1 - rank / 10, rank=rank)
+            for rank, movie in enumerate(reversed(cls.movies[1:]), start=1)
+        ])
+        cls.url = reverse('movie-similar', args=[cls.movies[0].pk])
+
+    def test_returns_neighbours_in_rank_order_with_constant_queries(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([movie['id'] for movie in response.data],
+                         [movie.pk for movie in reversed(self.movies[1:])])
+        self.assertEqual({movie['wishlist_count'] for movie in response.data}, {3})
+
+    def test_limit(self):
+        response = self.client.get(self.url, {'limit': 2})
+        self.assertEqual([movie['id'] for movie in response.data], [self.movies[7].pk, self.movies[6].pk])
+        self.assertEqual(len(self.client.get(self.url, {'limit': 500}).data), 7)
+
+        for bad in ('abc', '-3', '0', '1.5'):
+            with self.subTest(limit=bad):
+                response = self.client.get(self.url, {'limit': bad})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('limit', response.data)
+
+    def test_unknown_movie_is_404(self):
+        response = self.client.get(reverse('movie-similar', args=[10 ** 6]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ForYouInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.movies = make_movies(3)
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'pw-alice-123')
+        MovieSimilarity.objects.create(movie=cls.movies[0], similar_movie=cls.movies[1], score=0.9, rank=1)
+        MovieSimilarity.objects.create(movie=cls.movies[0], similar_movie=cls.movies[2], score=0.5, rank=2)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertInvalidated(self, method, url, data=None):
+        self.assertIsNotNone(cache.get(for_you_cache_key(self.user.pk)))
+        response = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 300, getattr(response, 'data', None))
+        self.assertIsNone(cache.get(for_you_cache_key(self.user.pk)), f'{method.upper()} {url}')
+        return response
+
+    def test_review_writes_invalidate(self):
+        get_for_you(self.user.pk)
+        response = self.assertInvalidated('post', reverse('review-list'), {
+            'movie_id': self.movies[0].pk, 'rating': 9, 'review_text': 'Loved it',
+        })
+        self.assertEqual(get_for_you(self.user.pk), [self.movies[1].pk, self.movies[2].pk])
+
+        url = reverse('review-detail', args=[response.data['id']])
+        self.assertInvalidated('patch', url, {'movie_id': self.movies[1].pk})
+        self.assertEqual(get_for_you(self.user.pk), [])
+        self.assertInvalidated('delete', url)
+
+    def test_wishlist_writes_invalidate(self):
+        get_for_you(self.user.pk)
+        self.assertInvalidated('post', reverse('wishlist-list'), {'movie_id': self.movies[0].pk})
+        get_for_you(self.user.pk)
+        self.assertInvalidated('delete', reverse('wishlist-detail', args=[self.movies[0].pk]))
+
+
+@override_settings(RATING_PRIOR_MEAN=6.5, RATING_PRIOR_WEIGHT=10, TOP_RATED_MIN_REVIEWS=3)
+class RatingMaintenanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw-admin-123')
+        cls.users = [User.objects.create_user(f'user{i}', f'user{i}@example.com', 'pw') for i in range(3)]
+        cls.movies = make_movies(2)
+
+    def review(self, user, movie, rating):
+        response = self.api.post(reverse('review-list'), {
+            'movie_id': movie.pk, 'rating': rating, 'review_text': 'Text',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Review.objects.get(pk=response.data['id'])
+
+    def setUp(self):
+        self.api = APIClient()
+
+    def assertAggregates(self, movie, ratings):
+        movie.refresh_from_db()
+        self.assertEqual((movie.rating_count, movie.rating_sum), (len(ratings), sum(ratings)))
+        self.assertAlmostEqual(movie.bayesian_rating, (6.5 * 10 + sum(ratings)) / (10 + len(ratings)))
+        histogram = RatingHistogram.objects.filter(movie=movie).first()
+        counts = histogram.counts if histogram else [0] * 10
+        self.assertEqual(counts, [ratings.count(rating) for rating in range(1, 11)])
+
+    def test_new_movies_start_at_the_prior(self):
+        self.assertEqual(self.movies[0].bayesian_rating, 6.5)
+        self.assertAggregates(self.movies[0], [])
+
+    def test_top_rated_needs_three_reviews(self):
+        for user, rating in zip(self.users[:2], (10, 10)):
+            self.api.force_authenticate(user)
+            self.review(user, self.movies[0], rating)
+        self.assertEqual(self.client.get(reverse('movie-list'), {'filter': 'top-rated'}).data, [])
+
+        self.api.force_authenticate(self.users[2])
+        self.review(self.users[2], self.movies[0], 9)
+        response = self.client.get(reverse('movie-list'), {'filter': 'top-rated'})
+        self.assertEqual([movie['id'] for movie in response.data], [self.movies[0].pk])
+
+    def test_admin_edits_and_deletes_keep_aggregates(self):
+        self.api.force_authenticate(self.users[0])
+        review = self.review(self.users[0], self.movies[0], 8)
+        self.client.force_login(self.admin)
+
+        response = self.client.post(reverse('admin:movie_review_review_change', args=[review.pk]), {
+            'movie': self.movies[1].pk, 'user': self.users[0].pk, 'review_text': 'Edited', 'rating': 3,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertAggregates(self.movies[0], [])
+        self.assertAggregates(self.movies[1], [3])
+
+        response = self.client.post(reverse('admin:movie_review_review_delete', args=[review.pk]), {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertAggregates(self.movies[1], [])
+
+    def test_cascading_deletes_keep_aggregates(self):
+        for user, rating in zip(self.users, (4, 7, 9)):
+            self.api.force_authenticate(user)
+            self.review(user, self.movies[0], rating)
+            self.review(user, self.movies[1], rating)
+
+        self.users[1].delete()
+        self.assertAggregates(self.movies[0], [4, 9])
+
+        Review.objects.filter(user=self.users[0]).delete()
+        self.assertAggregates(self.movies[0], [9])
+
+        # Deleting a movie takes its reviews and histogram with it
+        self.movies[1].delete()
+        self.assertFalse(RatingHistogram.objects.filter(movie_id=self.movies[1].pk).exists())
+        self.assertAggregates(self.movies[0], [9])
+
+    def stats(self, movie):
+        response = self.client.get(reverse('movie-stats', args=[movie.pk]))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_stats_endpoint(self):
+        stats = self.stats(self.movies[0])
+        self.assertEqual((stats['count'], stats['mean'], stats['median'], stats['percentiles']), (0, None, None, None))
+        self.assertEqual(stats['distribution'], {str(rating): 0 for rating in range(1, 11)})
+
+        reviews = []
+        for user, rating in zip(self.users, (3, 8, 9)):
+            self.api.force_authenticate(user)
+            reviews.append(self.review(user, self.movies[0], rating))
+        stats = self.stats(self.movies[0])
+        self.assertEqual((stats['count'], stats['mean'], stats['median']), (3, 6.67, 8.0))
+        self.assertIsInstance(stats['median'], float)
+        self.assertEqual(stats['percentiles'], {'10': 3, '25': 3, '75': 9, '90': 9})
+
+        # Changing a rating moves it between buckets, deleting one leaves an even count
+        self.api.force_authenticate(self.users[2])
+        self.api.patch(reverse('review-detail', args=[reviews[2].pk]), {'rating': 4}, format='json')
+        self.api.force_authenticate(self.users[0])
+        self.api.delete(reverse('review-detail', args=[reviews[0].pk]))
+        stats = self.stats(self.movies[0])
+        self.assertEqual((stats['count'], stats['mean'], stats['median']), (2, 6.0, 6.0))
+        self.assertEqual({k: v for k, v in stats['distribution'].items() if v}, {'4': 1, '8': 1})
+        self.assertIsNotNone(stats['recent_mean'])
+
+        self.api.force_authenticate(self.users[1])
+        self.api.patch(reverse('review-detail', args=[reviews[1].pk]), {'rating': 7}, format='json')
+        self.assertEqual(self.stats(self.movies[0])['median'], 5.5)
+
+    def test_rebuild_ratings_command(self):
+        for user, rating in zip(self.users, (4, 7, 9)):
+            self.api.force_authenticate(user)
+            self.review(user, self.movies[0], rating)
+        Movie.objects.update(rating_sum=0, rating_count=0, bayesian_rating=0)
+        RatingHistogram.objects.all().delete()
+
+        out = io.StringIO()
+        call_command('rebuild_ratings', stdout=out)
+        self.assertIn('rebuilt 1 histograms', out.getvalue())
+        self.assertAggregates(self.movies[0], [4, 7, 9])
+        self.assertAggregates(self.movies[1], [])
+        self.assertGreater(RatingHistogram.objects.get(movie=self.movies[0]).recent_weight, 0)
+
+
+@override_settings(TRENDING_HALF_LIFE_HOURS=72, TRENDING_WEIGHTS={'review': 3.0, 'comment': 1.0, 'wishlist': 2.0},
+                   TRENDING_MIN_SCORE=0.1)
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.movies = make_movies(3)
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'pw-alice-123')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_migration_backfills_scores_from_history(self):
+        Review.objects.create(user=self.user, movie=self.movies[0], rating=8, review_text='Great')
+        Comment.objects.create(user=self.user, movie=self.movies[1], comment_text='Hi')
+        Wishlist.objects.create(user=self.user, movie=self.movies[1])
+        old = Comment.objects.create(user=self.user, movie=self.movies[2], comment_text='Old')
+        Comment.objects.filter(pk=old.pk).update(created_at=timezone.now() - datetime.timedelta(days=365))
+        Movie.objects.update(trending_score=0)
+
+        migration = importlib.import_module('movie_review.migrations.0017_trending_score')
+        migration.backfill_trending(apps, None)
+
+        scores = dict(Movie.objects.values_list('pk', 'trending_score'))
+        self.assertAlmostEqual(scores[self.movies[0].pk], 3.0, places=3)
+        self.assertAlmostEqual(scores[self.movies[1].pk], 3.0, places=3)
+        self.assertEqual(scores[self.movies[2].pk], 0)
+        response = self.client.get(reverse('movie-list'), {'filter': 'trending'})
+        self.assertEqual({movie['id'] for movie in response.data}, {self.movies[0].pk, self.movies[1].pk})
+        self.assertEqual(self.client.get(reverse('movie-categories')).data['trending'], 2)
+
+    def test_events_read_the_epoch_under_the_row_lock(self):
+        trending.rebase()
+        with CaptureQueriesContext(connections['default']) as queries:
+            trending.record_event(self.movies[0].pk, 'review')
+        statements = [query['sql'] for query in queries.captured_queries]
+        epoch_read = next(i for i, sql in enumerate(statements) if 'movie_review_trendingepoch' in sql)
+        update = next(i for i, sql in enumerate(statements) if sql.startswith('UPDATE "movie_review_movie"'))
+        self.assertLess(epoch_read, update)
+        # Both inside one savepoint, so a rebase can't commit in between
+        self.assertTrue(statements[epoch_read - 1].startswith('SAVEPOINT'))
+        self.assertTrue(statements[update + 1].startswith('RELEASE SAVEPOINT'))
+
+    def test_rebase_keeps_the_ranking(self):
+        trending.record_event(self.movies[0].pk, 'review')
+        trending.record_event(self.movies[1].pk, 'comment')
+        before = list(Movie.objects.order_by('-trending_score').values_list('pk', flat=True))
+
+        later = timezone.now() + datetime.timedelta(hours=72)
+        trending.rebase(now=later)
+
+        self.assertEqual(TrendingEpoch.objects.get(pk=1).epoch, later)
+        self.assertEqual(list(Movie.objects.order_by('-trending_score').values_list('pk', flat=True)), before)
+        self.assertAlmostEqual(Movie.objects.get(pk=self.movies[0].pk).trending_score, 1.5, places=3)
+
+
+class CompiledSerializerTests(TestCase):
+    """The compiled list serializers must render exactly what the DRF ones do."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.movies = make_movies(4)
+        Movie.objects.filter(pk=cls.movies[0].pk).update(image='movies/poster.jpg', rating_sum=17, rating_count=2)
+        # movies[1] keeps a null image
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'pw-alice-123')
+        other = User.objects.create_user('bob', 'bob@example.com', 'pw-bob-1234')
+        Wishlist.objects.create(user=cls.user, movie=cls.movies[0])
+        Wishlist.objects.create(user=other, movie=cls.movies[0])
+        Review.objects.create(user=cls.user, movie=cls.movies[0], rating=8, review_text='Great')
+        Review.objects.create(user=other, movie=cls.movies[1], rating=5, review_text='Fine')
+
+    def setUp(self):
+        cache.clear()
+
+    def assertSameOutput(self, url, params):
+        with override_settings(FAST_LIST_SERIALIZATION=False):
+            expected = self.client.get(url, params)
+        with override_settings(FAST_LIST_SERIALIZATION=True):
+            compiled = self.client.get(url, params)
+        self.assertEqual(expected.status_code, 200)
+        self.assertEqual(compiled.json(), expected.json())
+        return compiled.json()
+
+    def test_movie_list(self):
+        for params in ({}, {'fields': 'id,title,image'}, {'omit': 'description,wishlist_count'},
+                       {'fields': 'id,wishlist_count,average_rating', 'omit': 'id'}, {'filter': 'latest'}):
+            with self.subTest(params=params):
+                self.assertSameOutput(reverse('movie-list'), params)
+
+        movies = {movie['id']: movie for movie in self.assertSameOutput(reverse('movie-list'), {})}
+        self.assertEqual(movies[self.movies[0].pk]['image'], 'http://testserver/media/movies/poster.jpg')
+        self.assertIsNone(movies[self.movies[1].pk]['image'])
+
+    @override_settings(MEDIA_URL='https://cdn.example.com/media/')
+    def test_absolute_media_urls_are_kept(self):
+        movies = self.assertSameOutput(reverse('movie-list'), {'fields': 'id,image'})
+        images = {movie['id']: movie['image'] for movie in movies}
+        self.assertEqual(images[self.movies[0].pk], 'https://cdn.example.com/media/movies/poster.jpg')
+
+    def test_review_list(self):
+        for params in ({}, {'fields': 'id,movie,username'}, {'omit': 'movie'},
+                       {'movie_id': self.movies[0].pk, 'omit': 'review_text,created_at'}):
+            with self.subTest(params=params):
+                self.assertSameOutput(reverse('review-list'), params)
+
+
+class FuzzySearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.movie = Movie.objects.create(title='Interstellar', description='', release_date=datetime.date(2014, 11, 7))
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(fuzzy_search, '_index', fuzzy_search.build_index())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def titles(self):
+        return dict(fuzzy_search._index.titles)
+
+    def test_index_follows_committed_saves_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            movie = Movie.objects.create(title='Inception', description='', release_date=datetime.date(2010, 7, 16))
+            self.assertNotIn(movie.pk, self.titles())
+        self.assertEqual(self.titles()[movie.pk], 'Inception')
+        self.assertEqual([movie_id for movie_id, _ in fuzzy_search.search('inceptoin')], [movie.pk])
+
+        movie_id = movie.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.delete()
+        self.assertNotIn(movie_id, self.titles())
+
+    def test_rolled_back_changes_never_reach_the_index(self):
+        generation = cache.get(fuzzy_search.GENERATION_KEY)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.movie.title = 'Interstellar 2'
+                    self.movie.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.titles()[self.movie.pk], 'Interstellar')
+        self.assertEqual(cache.get(fuzzy_search.GENERATION_KEY), generation)
+
+
+class StubProvider(watch_providers.WatchProvider):
+    """Answers after ``gate`` is set (immediately when it's None), or raises ``error``."""
+
+    def __init__(self, name, gate=None, error=None):
+        self.name = name
+        self.gate = gate
+        self.error = error
+        self.calls = []
+
+    def fetch(self, movies, region):
+        self.calls.append([movie['id'] for movie in movies])
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return {movie['id']: [{'platform': self.name, 'title': movie['title']}] for movie in movies}
+
+
+@override_settings(WATCH_PROVIDER_TIMEOUT=0.2, WATCH_PROVIDER_MAX_CALLS=1)
+class WatchProviderTests(TestCase):
+    movies = [{'id': 1, 'title': 'Heat'}, {'id': 2, 'title': 'Ronin'}]
+
+    def setUp(self):
+        cache.clear()
+        self.gate = threading.Event()
+        self.addCleanup(self.gate.set)
+        executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(executor.shutdown)
+        for name, value in (('_executor', executor), ('_pool_pid', os.getpid()), ('_inflight', {}), ('_running', {})):
+            patcher = mock.patch.object(watch_providers, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def use(self, *providers):
+        patcher = mock.patch.object(watch_providers, '_providers', list(providers))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def wait_idle(self, *names):
+        for _ in range(50):
+            if not any(watch_providers._running.get(name) for name in names):
+                break
+            time.sleep(0.01)
+
+    def test_partial_failure_keeps_other_providers(self):
+        fast = StubProvider('fast')
+        broken = StubProvider('broken', error=RuntimeError('down'))
+        self.use(fast, broken)
+
+        options, unavailable = watch_providers.get_watch_options(self.movies, 'US')
+        self.assertEqual(unavailable, ['broken'])
+        self.assertEqual([option['platform'] for option in options[1]], ['fast'])
+
+        # Failures aren't cached, successes are
+        watch_providers.get_watch_options(self.movies, 'US')
+        self.assertEqual(len(fast.calls), 1)
+        self.assertEqual(len(broken.calls), 2)
+
+    def test_timeout_reports_the_provider_and_bounds_its_calls(self):
+        fast = StubProvider('fast')
+        slow = StubProvider('slow', gate=self.gate)
+        self.use(fast, slow)
+
+        options, unavailable = watch_providers.get_watch_options(self.movies[:1], 'US')
+        self.assertEqual(unavailable, ['slow'])
+        self.assertEqual([option['platform'] for option in options[1]], ['fast'])
+
+        # The hung call holds the provider's only slot: no second call is queued behind it
+        options, unavailable = watch_providers.get_watch_options(self.movies[1:], 'US')
+        self.assertEqual(unavailable, ['slow'])
+        self.assertEqual(slow.calls, [[1]])
+
+        self.gate.set()
+        self.wait_idle('slow')
+        options, unavailable = watch_providers.get_watch_options(self.movies, 'US')
+        self.assertEqual(unavailable, [])
+        self.assertEqual(slow.calls, [[1], [2]])
+        self.assertEqual(watch_providers._inflight, {})
+
+    def test_queued_calls_are_cancelled_on_timeout(self):
+        slow = StubProvider('slow', gate=self.gate)
+        self.use(slow)
+        # Fill the pool so the provider call can't start
+        blockers = [watch_providers._executor.submit(self.gate.wait, 5) for _ in range(4)]
+
+        options, unavailable = watch_providers.get_watch_options(self.movies, 'US')
+        self.assertEqual(unavailable, ['slow'])
+        self.assertEqual(watch_providers._running['slow'], 0)
+        self.assertEqual(watch_providers._inflight, {})
+        self.gate.set()
+        for blocker in blockers:
+            blocker.result()
+        self.assertEqual(slow.calls, [])
+
+    @override_settings(WATCH_PROVIDER_TIMEOUT=0.3)
+    def test_provider_timeouts_overlap(self):
+        self.use(StubProvider('slow', gate=self.gate), StubProvider('slower', gate=self.gate))
+        started = time.monotonic()
+        options, unavailable = watch_providers.get_watch_options(self.movies, 'US')
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(unavailable, ['slow', 'slower'])
+        self.gate.set()
+        self.wait_idle('slow', 'slower')
+
+    def test_timeout_does_not_cancel_a_call_another_request_joined(self):
+        slow = StubProvider('slow')
+        self.use(slow)
+        blockers = [watch_providers._executor.submit(self.gate.wait, 5) for _ in range(4)]
+        results = []
+
+        first = threading.Thread(target=lambda: results.append(watch_providers.get_watch_options(self.movies, 'US')))
+        first.start()
+        for _ in range(50):
+            if watch_providers._inflight:
+                break
+            time.sleep(0.01)
+        # Joins the queued call, then both requests time out before it starts
+        results.append(watch_providers.get_watch_options(self.movies, 'US'))
+        first.join()
+        self.assertEqual([unavailable for _, unavailable in results], [['slow'], ['slow']])
+
+        self.gate.set()
+        for blocker in blockers:
+            blocker.result()
+        self.wait_idle('slow')
+        self.assertEqual(slow.calls, [[1, 2]])
+        self.assertEqual(watch_providers._inflight, {})
+        self.assertIsNotNone(cache.get(watch_providers._cache_key(slow, 'US', 2)))
+
+    @override_settings(WATCH_PROVIDER_TIMEOUT=5)
+    def test_concurrent_misses_share_one_call(self):
+        slow = StubProvider('slow', gate=self.gate)
+        self.use(slow)
+        results = []
+
+        def request():
+            results.append(watch_providers.get_watch_options(self.movies, 'US'))
+
+        threads = [threading.Thread(target=request) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for _ in range(50):
+            if len(watch_providers._inflight) == 2 and slow.calls:
+                break
+            time.sleep(0.01)
+        self.gate.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(slow.calls, [[1, 2]])
+        self.assertEqual(len(results), 3)
+        for options, unavailable in results:
+            self.assertEqual(unavailable, [])
+            self.assertEqual(options[2], [{'platform': 'slow', 'title': 'Ronin'}])
+
+    def test_answer_cached_after_the_first_read_is_not_fetched_again(self):
+        provider = StubProvider('fast')
+        self.use(provider)
+        real_get_many = cache.get_many
+        key = watch_providers._cache_key(provider, 'US', 1)
+        cache.set(key, [{'platform': 'cached'}])
+
+        # The first read misses, as if a call filled the cache and left _inflight just after it
+        reads = []
+        def get_many(keys):
+            reads.append(keys)
+            return {} if len(reads) == 1 else real_get_many(keys)
+
+        with mock.patch.object(watch_providers, 'cache') as patched:
+            patched.get_many.side_effect = get_many
+            options, _ = watch_providers.get_watch_options(self.movies[:1], 'US')
+
+        self.assertEqual(options[1], [{'platform': 'cached'}])
+        self.assertEqual(provider.calls, [])
+
+
+class SnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.movies = make_movies(3)
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'pw-alice-123')
+
+    def setUp(self):
+        cache.clear()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = Path(root.name)
+        self.enterContext(override_settings(SNAPSHOT_ROOT=self.root))
+
+    def build(self, movie_ids=None):
+        builder = snapshots.SnapshotBuilder()
+        builder.build_listings()
+        builder.build_categories()
+        builder.build_details(movie_ids)
+        return builder, builder.commit()
+
+    def test_edits_deletes_and_wishlists_mark_movies_changed(self):
+        api = APIClient()
+        api.force_authenticate(self.user)
+        response = api.post(reverse('review-list'), {
+            'movie_id': self.movies[0].pk, 'rating': 8, 'review_text': 'Great',
+        }, format='json')
+        review_url = reverse('review-detail', args=[response.data['id']])
+
+        since = timezone.now()
+        self.assertEqual(snapshots.changed_movie_ids(since), set())
+        api.patch(review_url, {'rating': 3}, format='json')
+        self.assertEqual(snapshots.changed_movie_ids(since), {self.movies[0].pk})
+
+        since = timezone.now()
+        api.delete(review_url)
+        self.assertEqual(snapshots.changed_movie_ids(since), {self.movies[0].pk})
+
+        since = timezone.now()
+        entry = Wishlist.objects.create(user=self.user, movie=self.movies[1])
+        self.assertEqual(snapshots.changed_movie_ids(since), {self.movies[1].pk})
+        since = timezone.now()
+        entry.delete()
+        self.assertEqual(snapshots.changed_movie_ids(since), {self.movies[1].pk})
+
+        since = timezone.now()
+        self.movies[2].title = 'Renamed'
+        self.movies[2].save()
+        self.assertEqual(snapshots.changed_movie_ids(since), {self.movies[2].pk})
+
+    def test_aliases_are_written_after_the_manifest(self):
+        self.build()
+        Movie.objects.filter(pk=self.movies[0].pk).update(title='Renamed')
+
+        writes = []
+        real_write = snapshots._atomic_write
+        def record(path, data):
+            writes.append(path.relative_to(self.root).as_posix())
+            real_write(path, data)
+
+        with mock.patch.object(snapshots, '_atomic_write', side_effect=record):
+            _, manifest = self.build([self.movies[0].pk])
+
+        alias = f'movies/detail/{self.movies[0].pk}.json'
+        self.assertLess(writes.index('manifest.json'), writes.index(alias))
+        entry = manifest['files'][f'movies/detail/{self.movies[0].pk}']
+        self.assertEqual((self.root / alias).read_bytes(), (self.root / entry['object']).read_bytes())
+        self.assertEqual(json.loads((self.root / alias).read_bytes())['title'], 'Renamed')
+        self.assertFalse((self.root / 'aliases-pending.json').exists())
+
+    def test_next_build_finishes_aliases_of_an_interrupted_one(self):
+        self.build()
+        Movie.objects.filter(pk=self.movies[0].pk).update(title='Renamed')
+        with mock.patch.object(snapshots.SnapshotBuilder, '_write_alias', side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.build([self.movies[0].pk])
+
+        builder, _ = self.build([])
+        self.assertEqual(builder.written, 0)
+        alias = self.root / f'movies/detail/{self.movies[0].pk}.json'
+        self.assertEqual(json.loads(alias.read_bytes())['title'], 'Renamed')
+
+    def test_stale_brotli_aliases_are_removed(self):
+        fake_brotli = mock.Mock(compress=lambda body, quality: b'br:' + body)
+        with mock.patch.object(snapshots, 'brotli', fake_brotli):
+            self.build()
+        alias = self.root / f'movies/detail/{self.movies[0].pk}.json'
+        self.assertTrue(alias.with_suffix('.json.br').exists())
+
+        Movie.objects.filter(pk=self.movies[0].pk).update(title='Renamed')
+        with mock.patch.object(snapshots, 'brotli', None):
+            self.build([self.movies[0].pk])
+        self.assertFalse(alias.with_suffix('.json.br').exists())
+        self.assertTrue(alias.with_suffix('.json.gz').exists())
+
+    def test_deleted_movies_lose_their_aliases(self):
+        self.build()
+        alias = self.root / f'movies/detail/{self.movies[2].pk}.json'
+        self.assertTrue(alias.exists())
+        self.movies[2].delete()
+        _, manifest = self.build([])
+        self.assertNotIn(f'movies/detail/{self.movies[2].pk}', manifest['files'])
+        self.assertFalse(alias.exists())
+        self.assertFalse(alias.with_suffix('.json.gz').exists())
+
+    def test_queries_do_not_grow_with_the_catalogue(self):
+        def count_queries():
+            with CaptureQueriesContext(connections['default']) as queries:
+                self.build()
+            return len(queries)
+
+        before = count_queries()
+        make_movies(12)
+        self.assertEqual(count_queries(), before)
+
+    @override_settings(SNAPSHOT_BASE_URL='http://testserver')
+    def test_snapshots_match_the_live_api(self):
+        Movie.objects.filter(pk=self.movies[0].pk).update(image='movies/poster.png')
+        Wishlist.objects.create(user=self.user, movie=self.movies[0])
+        self.build()
+
+        detail = json.loads((self.root / f'movies/detail/{self.movies[0].pk}.json').read_bytes())
+        live = self.client.get(reverse('movie-detail', args=[self.movies[0].pk])).json()
+        self.assertEqual(detail, live)
+        self.assertEqual(detail['image'], 'http://testserver/media/movies/poster.png')
+        listing = json.loads((self.root / 'movies/latest/page-1.json').read_bytes())
+        self.assertEqual(listing['results'], self.client.get(reverse('movie-list'), {'filter': 'latest'}).json())
+
+    @override_settings(SNAPSHOT_KEEP_MANIFESTS=2)
+    def test_old_manifests_and_unreferenced_objects_are_deleted(self):
+        _, manifest = self.build()
+        name = f'movies/detail/{self.movies[0].pk}'
+        first = self.root / manifest['files'][name]['object']
+        for title in ('Renamed', 'Renamed again'):
+            Movie.objects.filter(pk=self.movies[0].pk).update(title=title)
+            self.build([self.movies[0].pk])
+            # Still referenced by a kept manifest after one rebuild
+            self.assertEqual(first.exists(), title == 'Renamed')
+
+        self.assertEqual(len(list((self.root / 'manifests').glob('*.json'))), 2)
+        self.assertFalse(first.with_suffix('.json.gz').exists())
+        referenced = {
+            Path(entry['object']).name
+            for path in (self.root / 'manifests').glob('*.json')
+            for entry in json.loads(path.read_bytes())['files'].values()
+        }
+        for path in (self.root / 'objects').glob('*.json'):
+            self.assertIn(path.name, referenced)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionMiddlewareTests(TestCase):
+    body = b'{"results": [' + b', '.join(b'{"title": "Movie %d"}' % i for i in range(50)) + b']}'
+
+    def respond(self, cache_control=None, **headers):
+        def view(request):
+            response = HttpResponse(self.body, content_type='application/json')
+            if cache_control:
+                response['Cache-Control'] = cache_control
+            return response
+
+        request = RequestFactory().get('/api/movies/', HTTP_ACCEPT_ENCODING='gzip, br', **headers)
+        return CompressionMiddleware(view)(request)
+
+    def test_anonymous_responses_are_compressed(self):
+        response = self.respond()
+        self.assertIn(response['Content-Encoding'], ('gzip', 'br'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_no_transform_is_left_alone(self):
+        response = self.respond(cache_control='public, No-Transform')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, self.body)
+
+    def test_credentialed_responses_get_padded_gzip(self):
+        sizes = set()
+        for _ in range(10):
+            response = self.respond(HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(gzip.decompress(response.content), self.body)
+            sizes.add(len(response.content))
+        # The random filename makes the size differ between identical responses
+        self.assertGreater(len(sizes), 1)
+
+
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw-admin-123')
+        cls.movie = make_movies(1)[0]
+        image = io.BytesIO()
+        Image.new('RGB', (64, 64), 'red').save(image, 'PNG')
+        cls.png = image.getvalue()
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.enterContext(override_settings(
+            MEDIA_ROOT=Path(root.name) / 'media', IMAGE_UPLOAD_STAGING_DIR=Path(root.name) / 'staging',
+        ))
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def initiate(self):
+        response = self.api.post(reverse('upload-list'), {
+            'filename': 'poster.png', 'size': len(self.png), 'sha256': hashlib.sha256(self.png).hexdigest(),
+            'movie_id': self.movie.pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def put_chunk(self, upload_id, start, end):
+        return self.api.put(
+            reverse('upload-chunk', args=[upload_id]), self.png[start:end],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end - 1}/{len(self.png)}',
+        )
+
+    def test_chunked_upload_attaches_the_image(self):
+        upload_id = self.initiate()
+        middle = len(self.png) // 2
+        self.assertEqual(self.put_chunk(upload_id, 0, middle).data['received'], middle)
+
+        # A resent or misplaced chunk is refused
+        response = self.put_chunk(upload_id, 0, middle)
+        self.assertEqual((response.status_code, response.data['received']), (409, middle))
+
+        self.assertEqual(self.put_chunk(upload_id, middle, len(self.png)).data['received'], len(self.png))
+        response = self.api.post(reverse('upload-complete', args=[upload_id]), format='json')
+        self.assertEqual(response.data['status'], ImageUpload.COMPLETE)
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.image.read(), self.png)
+
+    def test_body_is_read_without_the_write_lock(self):
+        upload_id = self.initiate()
+        events = []
+        write_chunk = uploads.write_chunk
+
+        @contextlib.contextmanager
+        def tracked_writes():
+            events.append('lock')
+            with serialized_writes():
+                yield
+            events.append('unlock')
+
+        def tracked_write_chunk(*args):
+            events.append('read')
+            with CaptureQueriesContext(connections['default']) as queries:
+                write_chunk(*args)
+            self.assertEqual(queries.captured_queries, [])
+
+        with mock.patch('movie_review.views.serialized_writes', tracked_writes), \
+                mock.patch.object(uploads, 'write_chunk', tracked_write_chunk):
+            response = self.put_chunk(upload_id, 0, len(self.png))
+        self.assertEqual(response.data['received'], len(self.png))
+        self.assertEqual(events, ['read', 'lock', 'unlock'])
+
+    def test_completion_stores_the_file_without_the_write_lock(self):
+        upload_id = self.initiate()
+        self.put_chunk(upload_id, 0, len(self.png))
+        events = []
+        store_staged = uploads.store_staged
+        # TestCase's own transactions
+        depth = len(connections['default'].atomic_blocks)
+
+        @contextlib.contextmanager
+        def tracked_writes():
+            events.append('lock')
+            with serialized_writes():
+                yield
+            events.append('unlock')
+
+        def tracked_store_staged(*args):
+            events.append('store')
+            self.assertEqual(len(connections['default'].atomic_blocks), depth)
+            with CaptureQueriesContext(connections['default']) as queries:
+                result = store_staged(*args)
+            self.assertEqual(queries.captured_queries, [])
+            return result
+
+        with mock.patch('movie_review.views.serialized_writes', tracked_writes), \
+                mock.patch.object(uploads, 'store_staged', tracked_store_staged):
+            response = self.api.post(reverse('upload-complete', args=[upload_id]), format='json')
+        self.assertEqual(response.data['status'], ImageUpload.COMPLETE)
+        self.assertEqual(events, ['store', 'lock', 'unlock'])
+
+    def test_attaching_a_poster_marks_the_movie_changed(self):
+        before = Movie.objects.get(pk=self.movie.pk).updated_at
+        upload_id = self.initiate()
+        self.put_chunk(upload_id, 0, len(self.png))
+        self.api.post(reverse('upload-complete', args=[upload_id]), format='json')
+        self.movie.refresh_from_db()
+        self.assertGreater(self.movie.updated_at, before)
+        self.assertIn(self.movie.pk, snapshots.changed_movie_ids(before))
+
+    def test_bad_checksum_fails_the_upload(self):
+        upload_id = self.initiate()
+        self.put_chunk(upload_id, 0, len(self.png))
+        ImageUpload.objects.filter(pk=upload_id).update(sha256='0' * 64)
+        response = self.api.post(reverse('upload-complete', args=[upload_id]), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ImageUpload.objects.get(pk=upload_id).status, ImageUpload.FAILED)
+
+
+class AdminChangelistTests(TestCase):
+    """Changelists run a fixed number of queries however many rows they show.
+
+    Session, user, the sqlite_stat1 probe of the estimated count, COUNT(*),
+    the page, and for date_hierarchy the date range and the day list.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw-admin-123')
+        movies = make_movies(30)
+        for i, movie in enumerate(movies):
+            user = User.objects.create_user(f'user{i}')
+            Review.objects.create(user=user, movie=movie, rating=i % 10 + 1, review_text='Review')
+            Comment.objects.create(user=user, movie=movie, comment_text='Comment')
+            Wishlist.objects.create(user=user, movie=movie)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def assertChangelistQueries(self, model, count):
+        url = reverse(f'admin:movie_review_{model}_changelist')
+        with self.assertNumQueries(count):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 30)
+
+    def test_movie_changelist(self):
+        self.assertChangelistQueries('movie', 7)
+
+    def test_review_changelist(self):
+        self.assertChangelistQueries('review', 7)
+
+    def test_comment_changelist(self):
+        self.assertChangelistQueries('comment', 7)
+
+    def test_wishlist_changelist(self):
+        self.assertChangelistQueries('wishlist', 5)
+
+    def test_search_by_pk(self):
+        url = reverse('admin:movie_review_movie_changelist')
+        movie = Movie.objects.order_by('pk').first()
+        response = self.client.get(url, {'q': str(movie.pk)})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(movie, response.context['cl'].result_list)
+        for term in (str(2 ** 63), '9' * 30, '-1'):
+            response = self.client.get(url, {'q': term})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context['cl'].result_list), 0)
+
+
+@override_settings(WARMUP_ON_STARTUP=True, WARMUP_TIMEOUT=5)
+class WarmupStartupTests(TestCase):
+    def setUp(self):
+        for name, value in (('_startup_thread', None), ('_startup_done', threading.Event())):
+            patcher = mock.patch.object(warmup, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(warmup, 'run', return_value={})
+        self.run_warmup = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_app_loading_does_not_warm_up(self):
+        apps.get_app_config('movie_review').ready()
+        self.assertIsNone(warmup._startup_thread)
+        self.run_warmup.assert_not_called()
+
+    def test_server_start_and_forked_workers_warm_up(self):
+        warmup.start_on_startup()
+        warmup.wait_for_startup()
+        self.assertEqual(self.run_warmup.call_count, 1)
+
+        # A worker forked from a --preload master: the hook returns while the warm-up runs
+        release = threading.Event()
+        self.run_warmup.side_effect = lambda: release.wait(5) and {}
+        warmup.post_fork(None, None)
+        self.assertFalse(warmup._startup_done.is_set())
+        release.set()
+        warmup.wait_for_startup()
+        self.assertEqual(self.run_warmup.call_count, 2)
+        self.assertTrue(warmup._startup_done.is_set())
+
+    def test_post_fork_without_preload_leaves_the_warm_up_to_wsgi(self):
+        warmup.post_fork(None, None)
+        self.assertIsNone(warmup._startup_thread)
+        self.run_warmup.assert_not_called()
+
+    def test_forked_worker_gets_its_own_provider_pool(self):
+        with mock.patch.object(watch_providers, '_pool_pid', os.getpid() + 1), \
+                mock.patch.object(watch_providers, '_inflight', {'stale': object()}):
+            watch_providers.get_providers()
+            self.assertEqual(watch_providers._pool_pid, os.getpid())
+            self.assertEqual(watch_providers._inflight, {})
+
+
+@override_settings(NPLUSONE_THRESHOLD=5)
+class NPlusOneTests(TestCase):
+    """Every GET endpoint over more rows than NPLUSONE_THRESHOLD, so a per-row query shows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw-admin-123')
+        cls.users = [User.objects.create_user(f'user{i}', f'user{i}@example.com', 'pw-user-123') for i in range(8)]
+        cls.movies = make_movies(12)
+        api = APIClient()
+        for user in [cls.admin, *cls.users]:
+            api.force_authenticate(user)
+            for rating, movie in enumerate(cls.movies[:8], start=1):
+                api.post(reverse('review-list'), {
+                    'movie_id': movie.pk, 'rating': rating, 'review_text': f'Review by {user.username}',
+                }, format='json')
+                api.post(reverse('comment-list'), {'movie': movie.pk, 'comment_text': 'Comment'}, format='json')
+                api.post(reverse('wishlist-list'), {'movie_id': movie.pk}, format='json')
+        MovieSimilarity.objects.bulk_create([
+            MovieSimilarity(movie=movie, similar_movie=other, score=0.5, rank=rank)
+            for movie in cls.movies
+            for rank, other in enumerate((m for m in cls.movies if m != movie), start=1)
+        ])
+        for i in range(8):
+            ImageUpload.objects.create(user=cls.admin, filename=f'poster{i}.png', size=10, sha256='0' * 64)
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def get(self, url, params=None):
+        with assert_no_n_plus_one():
+            response = self.api.get(url, params)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def test_movie_endpoints(self):
+        movie = self.movies[0].pk
+        ids = ','.join(str(m.pk) for m in self.movies)
+        for params in ({}, {'filter': 'trending'}, {'filter': 'top-rated'}, {'filter': 'latest'},
+                       {'filter': 'for-you'}, {'search': 'Movie'}, {'ids': ids}):
+            with self.subTest(params=params):
+                self.get(reverse('movie-list'), params)
+        self.get(reverse('movie-detail', args=[movie]))
+        for name in ('stats', 'similar', 'watch-options'):
+            with self.subTest(action=name):
+                self.get(reverse(f'movie-{name}', args=[movie]))
+        self.get(reverse('movie-watch-options-batch'), {'ids': ids})
+        self.get(reverse('movie-categories'))
+        self.get(reverse('movie-export'))
+        self.get(reverse('movie-export'), {'export_format': 'csv'})
+
+    def test_review_endpoints(self):
+        self.assertGreater(len(self.get(reverse('review-list')).data), 5)
+        self.get(reverse('review-list'), {'movie_id': self.movies[0].pk})
+        self.get(reverse('review-detail', args=[Review.objects.first().pk]))
+        self.get(reverse('review-movie-reviews', args=[self.movies[0].pk]))
+        self.get(reverse('review-export'))
+
+    def test_comment_endpoints(self):
+        self.assertGreater(len(self.get(reverse('comment-list')).data['results']), 5)
+        self.get(reverse('comment-list'), {'movie_id': self.movies[0].pk, 'page_size': 100})
+        self.get(reverse('comment-detail', args=[Comment.objects.first().pk]))
+
+    def test_wishlist_and_upload_endpoints(self):
+        self.assertGreater(len(self.get(reverse('wishlist-list')).data), 5)
+        self.get(reverse('wishlist-list'), {'fields': 'id,movie'})
+        self.get(reverse('upload-detail', args=[ImageUpload.objects.first().pk]))
+
+    @override_settings(NPLUSONE_MODE='raise')
+    def test_middleware_records_streamed_bodies(self):
+        def view(request):
+            # One query per row, run while the body is iterated
+            rows = (f'{movie.title}: {movie.wishlist_set.count()}\n' for movie in Movie.objects.all())
+            return StreamingHttpResponse(rows)
+
+        response = NPlusOneMiddleware(view)(RequestFactory().get('/api/movies/export/'))
+        with self.assertRaisesMessage(NPlusOneError, 'Repeated queries in GET /api/movies/export/'):
+            b''.join(response.streaming_content)
+
+
+
+class MovieMultiGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.movies = make_movies(4)
+
+    def get(self, ids):
+        return self.client.get(reverse('movie-list'), {'ids': ids})
+
+    def test_results_follow_the_requested_order(self):
+        ids = [self.movies[2].pk, self.movies[0].pk, self.movies[3].pk]
+        response = self.get(','.join(map(str, ids)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([movie['id'] for movie in response.data['results']], ids)
+        self.assertEqual(response.data['missing'], [])
+
+    def test_missing_ids_are_reported(self):
+        missing = Movie.objects.order_by('-pk').first().pk + 1
+        response = self.get(f'{missing},{self.movies[1].pk},{missing}')
+        self.assertEqual([movie['id'] for movie in response.data['results']], [self.movies[1].pk])
+        self.assertEqual(response.data['missing'], [missing])
+
+    @override_settings(MOVIE_BATCH_MAX_IDS=3, MOVIE_BATCH_MAX_AGE=120)
+    def test_id_count_is_capped_and_responses_are_cacheable(self):
+        ids = [movie.pk for movie in self.movies]
+        self.assertEqual(self.get(','.join(map(str, ids))).status_code, 400)
+        response = self.get(','.join(map(str, ids[:3])))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=120')
+
+    def test_out_of_range_ids_are_rejected(self):
+        for ids in ('99999999999999999999', '0', '-3', f'{self.movies[0].pk},x'):
+            with self.subTest(ids=ids):
+                self.assertEqual(self.get(ids).status_code, 400)
+        response = self.client.get(reverse('movie-watch-options-batch'), {'ids': '99999999999999999999'})
+        self.assertEqual(response.status_code, 400)
+
+class BatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f'user{i}', f'user{i}@example.com', 'pw-user-123') for i in range(6)]
+        cls.movies = make_movies(4)
+        api = APIClient()
+        for user in cls.users:
+            api.force_authenticate(user)
+            for rating, movie in enumerate(cls.movies, start=1):
+                api.post(reverse('review-list'), {
+                    'movie_id': movie.pk, 'rating': rating, 'review_text': f'Review by {user.username}',
+                }, format='json')
+                api.post(reverse('comment-list'), {'movie': movie.pk, 'comment_text': 'Comment'}, format='json')
+                api.post(reverse('wishlist-list'), {'movie_id': movie.pk}, format='json')
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.users[0])
+
+    def batch(self, *requests):
+        response = self.api.post(reverse('batch'), {'requests': list(requests)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data['responses']
+
+    def test_movie_page_query_count(self):
+        movie = self.movies[0].pk
+        requests = [
+            {'id': 'movie', 'op': 'movie', 'args': {'id': movie}},
+            {'id': 'reviews', 'op': 'reviews', 'args': {'movie_id': movie}},
+            {'id': 'comments', 'op': 'comments', 'args': {'movie_id': movie}},
+            {'id': 'watch', 'op': 'watch_options', 'args': {'movie_id': movie}},
+            {'id': 'wishlist', 'op': 'wishlist'},
+        ]
+        # Movies, reviews, comments and wishlist in the first round; the
+        # wishlist's other movies in the second
+        with self.assertNumQueries(5):
+            responses = self.batch(*requests)
+        self.assertEqual({response['status'] for response in responses.values()}, {200})
+        self.assertEqual(len(responses['reviews']['data']), 6)
+        self.assertEqual(len(responses['wishlist']['data']), 4)
+
+    def test_out_of_range_ids_fail_only_their_sub_request(self):
+        responses = self.batch(
+            {'id': 'huge', 'op': 'movie', 'args': {'id': 10 ** 30}},
+            {'id': 'zero', 'op': 'reviews', 'args': {'movie_id': 0}},
+            {'id': 'ok', 'op': 'movie', 'args': {'id': self.movies[0].pk}},
+        )
+        self.assertEqual(responses['huge']['status'], 400)
+        self.assertEqual(responses['zero']['status'], 400)
+        self.assertEqual(responses['ok']['status'], 200)
+
+    def test_unknown_movie_is_404_for_every_op(self):
+        missing = Movie.objects.order_by('-pk').first().pk + 1
+        responses = self.batch(
+            {'id': 'movie', 'op': 'movie', 'args': {'id': missing}},
+            {'id': 'reviews', 'op': 'reviews', 'args': {'movie_id': missing}},
+            {'id': 'comments', 'op': 'comments', 'args': {'movie_id': missing}},
+            {'id': 'watch', 'op': 'watch_options', 'args': {'movie_id': missing}},
+        )
+        self.assertEqual({request_id: response['status'] for request_id, response in responses.items()},
+                         {'movie': 404, 'reviews': 404, 'comments': 404, 'watch': 404})
+
+    def test_unexpected_errors_fail_only_their_sub_request(self):
+        movie = self.movies[0].pk
+        with mock.patch.object(batch.CommentsByMovieLoader, 'fetch', side_effect=RuntimeError('boom')), \
+                mock.patch.object(batch, 'WishlistSerializer', side_effect=ValueError('boom')), \
+                self.assertLogs('movie_review.batch', 'ERROR'):
+            responses = self.batch(
+                {'id': 'comments', 'op': 'comments', 'args': {'movie_id': movie}},
+                {'id': 'wishlist', 'op': 'wishlist'},
+                {'id': 'reviews', 'op': 'reviews', 'args': {'movie_id': movie}},
+            )
+        # A failed loader query and an error inside the operation itself
+        self.assertEqual(responses['comments']['status'], 500)
+        self.assertEqual(responses['wishlist']['status'], 500)
+        self.assertEqual(responses['reviews']['status'], 200)
+
+    def test_reviews_are_limited(self):
+        movie = self.movies[0].pk
+        newest = list(Review.objects.filter(movie_id=movie).order_by('-created_at', '-id').values_list('id', flat=True))
+        responses = self.batch({'id': 'reviews', 'op': 'reviews', 'args': {'movie_id': movie, 'limit': 2}})
+        self.assertEqual([review['id'] for review in responses['reviews']['data']], newest[:2])
+        with override_settings(BATCH_REVIEWS_LIMIT=3):
+            responses = self.batch({'id': 'reviews', 'op': 'reviews', 'args': {'movie_id': movie}})
+        self.assertEqual(len(responses['reviews']['data']), 3)
+
+
+class MovieEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.movie = make_movies(1)[0]
+
+    def setUp(self):
+        self.broker = events.InProcessBroker()
+        patcher = mock.patch.object(events, '_broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.channel = events.movie_channel(self.movie.pk)
+
+    async def open_stream(self):
+        request = AsyncRequestFactory().get(f'/api/movies/{self.movie.pk}/events/')
+        response = await movie_events(request, self.movie.pk)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response.streaming_content
+
+    async def test_published_events_reach_the_stream(self):
+        stream = await self.open_stream()
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+        events.publish_movie_event(self.movie.pk, 'review', {'rating': 8})
+        self.assertEqual(await anext(stream), b'event: review\ndata: {"rating": 8}\n\n')
+
+    @override_settings(MOVIE_EVENTS_HEARTBEAT=0.01)
+    async def test_idle_stream_sends_keep_alive_comments(self):
+        stream = await self.open_stream()
+        await anext(stream)
+        self.assertEqual(await anext(stream), b': keep-alive\n\n')
+
+    async def test_disconnect_unsubscribes(self):
+        # Gone before the body was read: nothing to clean up
+        await self.open_stream()
+        self.assertEqual(self.broker.subscriber_count(self.channel), 0)
+
+        # Gone while waiting for events: the server cancels the response task
+        stream = await self.open_stream()
+        await anext(stream)
+        self.assertEqual(self.broker.subscriber_count(self.channel), 1)
+        reader = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        reader.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await reader
+        self.assertEqual(self.broker.subscriber_count(self.channel), 0)
+
+
+class CommentFeedPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.movie = make_movies(1)[0]
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'pw-alice-123')
+        cls.start = timezone.now() - datetime.timedelta(hours=1)
+        cls.comments = []
+        for i in range(5):
+            comment = Comment.objects.create(user=cls.user, movie=cls.movie, comment_text=f'Comment {i}')
+            Comment.objects.filter(pk=comment.pk).update(created_at=cls.start + datetime.timedelta(minutes=i))
+            cls.comments.append(comment.pk)
+
+    def get(self, url=None, **params):
+        response = self.client.get(url or reverse('comment-list'), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_pages_stay_stable_when_comments_are_added(self):
+        page = self.get(page_size=2)
+        seen = [comment['id'] for comment in page['results']]
+        self.assertEqual(seen, self.comments[:2:-1])
+
+        # A comment posted between page fetches doesn't shift later pages
+        Comment.objects.create(user=self.user, movie=self.movie, comment_text='New')
+        while page['next']:
+            page = self.get(page['next'])
+            seen += [comment['id'] for comment in page['results']]
+        self.assertEqual(seen, self.comments[::-1])
+
+    def test_cursors_round_trip(self):
+        first = self.get(page_size=2)
+        second = self.get(first['next'])
+        self.assertEqual(self.get(second['previous'])['results'], first['results'])
+        self.assertEqual(self.get(first['next'])['results'], second['results'])
+
+    def test_since_returns_only_newer_comments(self):
+        since = (self.start + datetime.timedelta(minutes=2)).isoformat()
+        page = self.get(since=since)
+        self.assertEqual([comment['id'] for comment in page['results']], self.comments[:2:-1])
+
+    def test_malformed_parameters_are_400(self):
+        for params in ({'cursor': 'not-a-cursor'}, {'since': 'yesterday'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(reverse('comment-list'), params).status_code, 400)
+
+
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'pw-alice-123')
+        cls.movies = make_movies(5)
+        for movie in cls.movies:
+            Wishlist.objects.create(user=cls.user, movie=movie)
+
+    def test_only_requested_fields_are_returned(self):
+        response = self.client.get(reverse('movie-list'), {'fields': 'id,title'})
+        self.assertEqual(set(response.json()[0]), {'id', 'title'})
+        response = self.client.get(reverse('movie-detail', args=[self.movies[0].pk]), {'omit': 'description,image'})
+        self.assertEqual(set(response.json()), set(MovieSerializer.Meta.fields) - {'description', 'image'})
+        response = self.client.get(reverse('comment-list'), {'fields': 'id'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_fields_are_400(self):
+        for params in ({'fields': 'id,nope'}, {'omit': 'nope'}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('movie-list'), params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('nope', str(response.json()))
+
+    @override_settings(FAST_LIST_SERIALIZATION=False)
+    def test_excluding_wishlist_count_drops_its_join(self):
+        for params, joined in (({}, True), ({'fields': 'id,title'}, False)):
+            with self.subTest(params=params), CaptureQueriesContext(connections['default']) as queries:
+                response = self.client.get(reverse('movie-list'), params)
+            self.assertEqual(len(response.json()), 5)
+            sql = [query['sql'] for query in queries if 'movie_review_movie' in query['sql']]
+            self.assertEqual(len(sql), 1)
+            self.assertEqual('movie_review_wishlist' in sql[0], joined)
+            self.assertEqual('description' in sql[0], joined)
+
+        # Without movie_queryset_for_fields every movie counts its wishlist separately
+        with self.assertNumQueries(6):
+            MovieSerializer(Movie.objects.all(), many=True).data
+        with self.assertNumQueries(1):
+            MovieSerializer(movie_queryset_for_fields(Movie.objects.all(), MovieSerializer.Meta.fields), many=True).data
+
+
+class StartupBudgetTests(TestCase):
+    """django.setup() plus the URLconf, timed in fresh interpreters, against STARTUP_BUDGET_MS/RSS_BUDGET_MB."""
+
+    def test_startup_stays_within_budget(self):
+        out = io.StringIO()
+        call_command('benchmark_startup', runs=2, stdout=out)
+        self.assertIn('Within startup budget', out.getvalue())
+
+    @override_settings(STARTUP_BUDGET_MS=1, STARTUP_LAZY_MODULES=('django',))
+    def test_exceeding_the_budget_fails(self):
+        with self.assertRaisesMessage(CommandError, 'django is imported at startup'):
+            call_command('benchmark_startup', runs=1, stdout=io.StringIO())
+
+
+class ExportDataCommandTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.movies = make_movies(3)
+
+    def test_writes_to_the_command_stdout(self):
+        out = io.StringIO()
+        call_command('export_data', 'movies', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(sorted(row['id'] for row in rows), [movie.pk for movie in self.movies])
+
+        out = io.StringIO()
+        call_command('export_data', 'movies', '--export-format', 'csv', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
@@ -0,0 +1,125 @@
+"""Exponentially time-decayed trending scores.
+
+Each event adds ``weight * exp((t - epoch) / tau)`` to the movie's stored
+``trending_score``, where ``tau = half_life / ln 2``. Since every movie is
+scaled to the same epoch, sorting by the stored column is the same as
+sorting by the decayed score "now", and each event is one O(1) UPDATE.
+
+Stored values grow by 2x per half-life, so ``rebase_trending`` should run
+periodically (e.g. daily) to move the epoch forward and scale every score
+down in one statement. The recent-average sums on ``RatingHistogram`` use
+the same epoch (with their own half-life) and are rescaled alongside.
+"""
+
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Comment, Movie, RatingHistogram, Review, TrendingEpoch, Wishlist
+
+
+def _tau():
+    return getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 72) * 3600 / math.log(2)
+
+
+def _recent_tau():
+    return getattr(settings, 'RATING_RECENT_HALF_LIFE_DAYS', 30) * 86400 / math.log(2)
+
+
+def _weight(kind):
+    return getattr(settings, 'TRENDING_WEIGHTS', {}).get(kind, 1.0)
+
+
+def get_epoch():
+    epoch = TrendingEpoch.objects.filter(pk=1).values_list('epoch', flat=True).first()
+    if epoch is None:
+        epoch = TrendingEpoch.objects.get_or_create(pk=1, defaults={'epoch': timezone.now()})[0].epoch
+    return epoch
+
+
+def locked_epoch():
+    """The epoch, row-locked until the surrounding transaction ends.
+
+    A score read against the epoch has to be written before ``rebase`` can
+    move it, or the increment ends up scaled to the wrong epoch. Call inside
+    ``transaction.atomic()``; on SQLite the IMMEDIATE write transaction
+    already excludes a concurrent rebase.
+    """
+    epoch = TrendingEpoch.objects.select_for_update().filter(pk=1).values_list('epoch', flat=True).first()
+    if epoch is None:
+        epoch = TrendingEpoch.objects.get_or_create(pk=1, defaults={'epoch': timezone.now()})[0].epoch
+    return epoch
+
+
+def _scale(when, epoch):
+    return math.exp((when - epoch).total_seconds() / _tau())
+
+
+def recent_scale(when, epoch):
+    """Weight of a rating made at ``when`` in the histogram's recent average."""
+    return math.exp((when - epoch).total_seconds() / _recent_tau())
+
+
+def record_event(movie_id, kind, when=None):
+    """Bump a movie's score for a 'review', 'comment' or 'wishlist' event."""
+    with transaction.atomic():
+        increment = _weight(kind) * _scale(when or timezone.now(), locked_epoch())
+        Movie.objects.filter(pk=movie_id).update(trending_score=F('trending_score') + increment)
+
+
+def trending_queryset(queryset):
+    """Movies whose decayed score is still above TRENDING_MIN_SCORE, hottest first.
+
+    The threshold is converted to the stored scale so the filter and the
+    ordering both use the ``trending_score`` index.
+    """
+    threshold = getattr(settings, 'TRENDING_MIN_SCORE', 0.1) * _scale(timezone.now(), get_epoch())
+    return queryset.filter(trending_score__gte=threshold).order_by('-trending_score')
+
+
+def rebase(now=None):
+    """Move the epoch to ``now`` and rescale all scores to match."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        clock = TrendingEpoch.objects.select_for_update().get_or_create(pk=1, defaults={'epoch': now})[0]
+        factor = 1 / _scale(now, clock.epoch)
+        Movie.objects.filter(trending_score__gt=0).update(trending_score=F('trending_score') * factor)
+        recent_factor = 1 / recent_scale(now, clock.epoch)
+        RatingHistogram.objects.update(
+            recent_sum=F('recent_sum') * recent_factor,
+            recent_weight=F('recent_weight') * recent_factor,
+        )
+        clock.epoch = now
+        clock.save(update_fields=['epoch'])
+    return factor
+
+
+def rebuild(now=None, chunk_size=5000):
+    """Recompute every score from review and comment history.
+
+    Wishlist entries have no timestamp, so they count as of ``now``.
+    """
+    now = now or timezone.now()
+    horizon = now - timedelta(hours=getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 72) * 20)
+    scores = {}
+
+    for model, kind in ((Review, 'review'), (Comment, 'comment')):
+        weight = _weight(kind)
+        rows = model.objects.filter(created_at__gte=horizon).values_list('movie_id', 'created_at')
+        for movie_id, created_at in rows.iterator(chunk_size=chunk_size):
+            scores[movie_id] = scores.get(movie_id, 0.0) + weight * _scale(created_at, now)
+
+    weight = _weight('wishlist')
+    for movie_id in Wishlist.objects.values_list('movie_id', flat=True).iterator(chunk_size=chunk_size):
+        scores[movie_id] = scores.get(movie_id, 0.0) + weight
+
+    with transaction.atomic():
+        TrendingEpoch.objects.update_or_create(pk=1, defaults={'epoch': now})
+        Movie.objects.update(trending_score=0)
+        movies = [Movie(pk=movie_id, trending_score=score) for movie_id, score in scores.items()]
+        Movie.objects.bulk_update(movies, ['trending_score'], batch_size=1000)
+    return len(scores)
@@ -0,0 +1,247 @@
+"""Resumable, chunked movie poster uploads.
+
+A client initiates an upload with the file's name, size and SHA-256, then
+PUTs consecutive byte ranges (``Content-Range: bytes start-end/size``).
+Each chunk is copied from the request stream into a staging file in small
+blocks, so memory use doesn't depend on chunk or file size, and no lock is
+held while the body arrives. After a dropped connection the client asks for
+``received`` and resumes from there.
+
+On completion the staged file is hashed and checked against the declared
+SHA-256 and verified as an image. It is then saved to the ``Movie.image``
+storage under a name derived from its hash, so identical posters are stored
+once, and optionally attached to a movie. As with chunks, the slow part
+(``store_staged``) runs without the row lock or a transaction, and only the
+status change (``complete``) takes them.
+"""
+
+import hashlib
+import os
+import re
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from .models import ImageUpload, Movie
+
+BLOCK_SIZE = 64 * 1024
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+ALLOWED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+
+class OffsetMismatch(Exception):
+    """A chunk didn't start where the upload left off."""
+
+    def __init__(self, expected):
+        super().__init__(f'Expected a chunk starting at byte {expected}')
+        self.expected = expected
+
+
+def max_upload_size():
+    return getattr(settings, 'IMAGE_UPLOAD_MAX_SIZE', 20 * 1024 * 1024)
+
+
+def max_chunk_size():
+    return getattr(settings, 'IMAGE_UPLOAD_MAX_CHUNK_SIZE', 5 * 1024 * 1024)
+
+
+def staging_path(upload):
+    root = Path(getattr(settings, 'IMAGE_UPLOAD_STAGING_DIR', settings.BASE_DIR / 'upload_staging'))
+    return root / f'{upload.pk}.part'
+
+
+def _storage():
+    return Movie._meta.get_field('image').storage
+
+
+def content_name(sha256, filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.jpeg':
+        extension = '.jpg'
+    return f'movies/{sha256[:2]}/{sha256}{extension}'
+
+
+def parse_content_range(header, size):
+    """Return ``(start, end)`` (end exclusive) from a Content-Range header."""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise ValidationError({'Content-Range': 'Expected "bytes <start>-<end>/<size>".'})
+    start, last, total = (int(group) for group in match.groups())
+    if total != size or last < start or last >= size:
+        raise ValidationError({'Content-Range': f'Range must lie within the declared size of {size} bytes.'})
+    if last - start + 1 > max_chunk_size():
+        raise ValidationError({'Content-Range': f'Chunks may be at most {max_chunk_size()} bytes.'})
+    return start, last + 1
+
+
+def initiate(user, filename, size, sha256, movie=None):
+    if os.path.splitext(filename)[1].lower() not in ALLOWED_EXTENSIONS:
+        raise ValidationError({'filename': f"Allowed extensions: {', '.join(ALLOWED_EXTENSIONS)}"})
+    if size > max_upload_size():
+        raise ValidationError({'size': f'Images may be at most {max_upload_size()} bytes.'})
+
+    upload = ImageUpload.objects.create(
+        user=user, movie=movie, filename=filename, size=size, sha256=sha256.lower(),
+    )
+    path = staging_path(upload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    return upload
+
+
+def write_chunk(upload, start, end, stream):
+    """Copy bytes ``start``..``end`` of the file from ``stream`` into staging.
+
+    Runs without the row lock or a transaction, since reading the body takes
+    as long as the client does; ``commit_chunk`` then accounts for it. The
+    offset is checked up front so a misplaced chunk is refused before its
+    body is read. Chunks only ever cover bytes up to ``received`` plus their
+    own range, so a late duplicate of an accepted chunk rewrites bytes that
+    are already there, and a client that sends different bytes for the same
+    range fails the checksum on completion.
+    """
+    if upload.status != ImageUpload.UPLOADING:
+        raise ValidationError({'status': f'Upload is {upload.status}.'})
+    if start != upload.received:
+        raise OffsetMismatch(upload.received)
+
+    remaining = end - start
+    try:
+        f = open(staging_path(upload), 'r+b')
+    except FileNotFoundError:
+        raise ValidationError({'status': 'Upload was aborted.'})
+    with f:
+        f.seek(start)
+        while remaining:
+            block = stream.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            f.write(block)
+            remaining -= len(block)
+
+    # A short chunk (client disconnected) leaves ``received`` unchanged, so
+    # the client simply resends it
+    if remaining:
+        raise ValidationError({'chunk': f'Body ended {remaining} bytes short of the Content-Range.'})
+
+
+def commit_chunk(upload_id, start, end):
+    """Mark a chunk written by ``write_chunk`` as received.
+
+    The row lock serializes concurrent PUTs for one upload; only the first
+    of two chunks for the same offset moves ``received`` on.
+    """
+    with transaction.atomic():
+        upload = ImageUpload.objects.select_for_update().filter(pk=upload_id).first()
+        if upload is None:
+            raise ValidationError({'status': 'Upload was aborted.'})
+        if upload.status != ImageUpload.UPLOADING:
+            raise ValidationError({'status': f'Upload is {upload.status}.'})
+        if start != upload.received:
+            raise OffsetMismatch(upload.received)
+        upload.received = end
+        upload.save(update_fields=['received', 'updated_at'])
+    return upload
+
+
+def _verify(path, sha256):
+    """Return why the staged file is unacceptable, or None if it is fine."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    if digest.hexdigest() != sha256:
+        return 'SHA-256 of the received bytes does not match.'
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except Exception:
+        return 'File is not a valid image.'
+    return None
+
+
+def store_staged(upload):
+    """Verify the fully received staged file and store it once per content hash.
+
+    Returns ``(name, error)``: the stored name, or why the file was refused.
+    Hashing and copying take a while for a large file, so this runs without
+    the row lock or a transaction; ``complete`` then records the outcome.
+    Returns ``(None, None)`` if the upload was already completed.
+    """
+    if upload.status == ImageUpload.COMPLETE:
+        return None, None
+    if upload.status != ImageUpload.UPLOADING:
+        raise ValidationError({'status': f'Upload is {upload.status}.'})
+    if upload.received != upload.size:
+        raise ValidationError({'received': f'Only {upload.received} of {upload.size} bytes received.'})
+
+    path = staging_path(upload)
+    try:
+        error = _verify(path, upload.sha256)
+        if error is not None:
+            return None, error
+        storage = _storage()
+        name = content_name(upload.sha256, upload.filename)
+        if not storage.exists(name):
+            with open(path, 'rb') as f:
+                name = storage.save(name, File(f, name=name))
+    except FileNotFoundError:
+        # A concurrent completion or abort got there first; ``complete`` tells which
+        return None, None
+    return name, None
+
+
+def complete(upload_id, name, error, movie=None):
+    """Record the outcome of ``store_staged`` and attach the image to the movie."""
+    with transaction.atomic():
+        upload = ImageUpload.objects.select_for_update().filter(pk=upload_id).first()
+        if upload is None:
+            raise ValidationError({'status': 'Upload was aborted.'})
+        if upload.status == ImageUpload.COMPLETE:
+            return upload
+        if upload.status != ImageUpload.UPLOADING:
+            raise ValidationError({'status': f'Upload is {upload.status}.'})
+        if name is None and error is None:
+            raise ValidationError({'status': 'Upload was aborted.'})
+
+        if error is None:
+            upload.image = name
+            upload.status = ImageUpload.COMPLETE
+            upload.movie = movie or upload.movie
+        else:
+            upload.status = ImageUpload.FAILED
+        upload.save(update_fields=['image', 'status', 'movie', 'updated_at'])
+        staging_path(upload).unlink(missing_ok=True)
+
+        if error is None and upload.movie is not None:
+            # update() skips auto_now; snapshots pick changed movies by updated_at
+            Movie.objects.filter(pk=upload.movie_id).update(image=upload.image, updated_at=timezone.now())
+
+    if error is not None:
+        raise ValidationError({'file': error})
+    return upload
+
+
+def abort(upload):
+    staging_path(upload).unlink(missing_ok=True)
+    upload.delete()
+
+
+def purge_stale(max_age=None):
+    """Delete unfinished uploads idle for longer than ``max_age``."""
+    if max_age is None:
+        max_age = timedelta(hours=getattr(settings, 'IMAGE_UPLOAD_EXPIRY_HOURS', 24))
+    stale = ImageUpload.objects.exclude(status=ImageUpload.COMPLETE).filter(
+        updated_at__lt=timezone.now() - max_age
+    )
+    count = 0
+    for upload in stale.iterator():
+        abort(upload)
+        count += 1
+    return count
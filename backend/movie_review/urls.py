@@ -1,11 +1,17 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import MovieViewSet, WishlistViewSet, CommentViewSet, ReviewViewSet
+from .views import MovieViewSet, WishlistViewSet, CommentViewSet, ReviewViewSet, ImageUploadViewSet
+from .batch import BatchView
+from .streams import movie_events
 
 router = DefaultRouter()
 router.register(r'movies', MovieViewSet,basename='movie')
 router.register(r'wishlist', WishlistViewSet,basename='wishlist')
 router.register(r'comments', CommentViewSet,basename='comment')
 router.register(r'reviews', ReviewViewSet,basename='review')
+router.register(r'uploads', ImageUploadViewSet,basename='upload')
 
-urlpatterns = router.urls
-
+urlpatterns = [
+    path('movies/<int:movie_id>/events/', movie_events, name='movie-events'),
+    path('batch/', BatchView.as_view(), name='batch'),
+] + router.urls
@@ -6,20 +6,33 @@ and 10 is very positive.
 """
 
 import os
-import google.generativeai as genai
-from django.conf import settings
-from dotenv import load_dotenv
+import re
+import threading
 
-# Load environment variables from .env file
-load_dotenv()
 
-# Configure Gemini API
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+# google.generativeai drags in grpc and protobuf, which are slow to import
+# and heavy in memory. Load it the first time a score is actually requested
+# rather than in every worker and management command.
+_model = None
+_model_lock = threading.Lock()
 
-# Initialize the model
-model = genai.GenerativeModel('gemini-pro')
+
+def get_model():
+    """Return the shared Gemini model, importing and configuring it on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import google.generativeai as genai
+                from dotenv import load_dotenv
+
+                # Load environment variables from .env file
+                load_dotenv()
+                api_key = os.getenv('GEMINI_API_KEY')
+                if api_key:
+                    genai.configure(api_key=api_key)
+                _model = genai.GenerativeModel('gemini-pro')
+    return _model
 
 
 def analyze_sentiment(text):
@@ -57,13 +70,12 @@ Respond with ONLY the number (1-10), nothing else.
 """
         
         # Generate response
-        response = model.generate_content(prompt)
+        response = get_model().generate_content(prompt)
         
         # Extract the score from response
         score_text = response.text.strip()
         
         # Try to extract just the number
-        import re
         numbers = re.findall(r'\d+', score_text)
         if numbers:
             score = int(numbers[0])
@@ -1,19 +1,191 @@
-from rest_framework import viewsets, permissions, status
+from rest_framework import mixins, viewsets, permissions, status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny, IsAuthenticatedOrReadOnly
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Avg, Count, Q
-from datetime import datetime, timedelta
-import requests
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Count, Prefetch
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-from .models import Movie, Wishlist, Comment, Review
-from .serializers import MovieSerializer, WishlistSerializer, CommentSerializer, ReviewSerializer
+from movie_review_project.database import MAX_ID, serialized_writes
+from movie_review_project.db_routers import start_replica_reads, stop_replica_reads
+from . import ratings, trending, uploads
+from .events import publish_movie_event
+from .exports import EXPORT_FORMATS, MOVIE_EXPORT_FIELDS, REVIEW_EXPORT_FIELDS, streaming_export
+from .fast_serializers import CompiledMovieSerializer, CompiledReviewSerializer
+from .models import ImageUpload, Movie, MovieSimilarity, RatingHistogram, Wishlist, Comment, Review
+from .pagination import CommentFeedPagination
+from .queries import category_counts, filter_movies, filter_reviews
+from .recommendations import invalidate_for_you
+from .serializers import (
+    ImageUploadSerializer, MovieSerializer, WishlistSerializer, CommentSerializer, ReviewSerializer, sparse_fieldset,
+)
+from .watch_providers import get_watch_options
 
 
-class MovieViewSet(viewsets.ModelViewSet):
+class ReplicaReadMixin:
+    """Serve the listed read-only actions from the replica database, if configured."""
+    replica_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        self._replica_token = None
+        if self.action in self.replica_actions and request.method in permissions.SAFE_METHODS:
+            self._replica_token = start_replica_reads()
+        super().initial(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if getattr(self, '_replica_token', None) is not None:
+            stop_replica_reads(self._replica_token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class SerializedWriteMixin:
+    """Run create/update/destroy inside ``serialized_writes()``.
+
+    Views put the write itself in ``create_object``/``update_object``/
+    ``destroy_object`` and anything that needn't hold the lock (checks,
+    cache invalidation, events) in ``perform_*`` around ``super()``.
+    """
+
+    def perform_create(self, serializer):
+        with serialized_writes():
+            return self.create_object(serializer)
+
+    def perform_update(self, serializer):
+        with serialized_writes():
+            return self.update_object(serializer)
+
+    def perform_destroy(self, instance):
+        with serialized_writes():
+            self.destroy_object(instance)
+
+    def create_object(self, serializer):
+        return serializer.save()
+
+    def update_object(self, serializer):
+        return serializer.save()
+
+    def destroy_object(self, instance):
+        instance.delete()
+
+
+class CompiledListMixin:
+    """Serve selected actions through a compiled serializer from ``fast_serializers``.
+
+    ``compiled_serializers`` maps action names to compiled serializer
+    classes; the view provides ``get_compiled_queryset()``. Turned off with
+    ``FAST_LIST_SERIALIZATION = False``.
+    """
+    compiled_serializers = {}
+
+    def get_compiled_serializer(self):
+        if not getattr(settings, 'FAST_LIST_SERIALIZATION', True) or self.paginator is not None:
+            return None
+        serializer_class = self.compiled_serializers.get(self.action)
+        return serializer_class(self.request) if serializer_class else None
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_compiled_serializer()
+        if serializer is None:
+            return super().list(request, *args, **kwargs)
+        return Response(serializer.serialize(self.get_compiled_queryset()))
+
+
+# Only the username is rendered from joined users
+USER_DEFERRED_FIELDS = (
+    'user__password', 'user__last_login', 'user__first_name', 'user__last_name', 'user__email',
+    'user__date_joined',
+)
+
+# Model fields that can be left out of the SELECT when not rendered
+MOVIE_DEFERRABLE_FIELDS = ('title', 'description', 'release_date', 'image', 'created_at')
+
+
+def movie_queryset_for_fields(queryset, fields):
+    """Only load what the selected ``MovieSerializer`` fields need."""
+    deferred = [name for name in MOVIE_DEFERRABLE_FIELDS if name not in fields]
+    if deferred:
+        queryset = queryset.defer(*deferred)
+    if 'wishlist_count' in fields:
+        queryset = queryset.annotate(wishlist_total=Count('wishlist'))
+    return queryset
+
+
+def nested_movie_prefetch():
+    """Prefetch for serializers that nest a full ``MovieSerializer`` under ``movie``."""
+    return Prefetch('movie', queryset=movie_queryset_for_fields(Movie.objects.all(), MovieSerializer.Meta.fields))
+
+
+def _export_response(request, queryset, fields, filename):
+    # `format` is taken by DRF's renderer override, hence `export_format`
+    export_format = request.query_params.get('export_format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        raise ValidationError({'export_format': f"Expected one of {', '.join(EXPORT_FORMATS)}"})
+    # The body is streamed after finalize_response has left replica_reads(),
+    # so pin the alias the router picks now
+    queryset = queryset.using(router.db_for_read(queryset.model))
+    return streaming_export(queryset, fields, export_format, filename)
+
+
+WATCH_OPTIONS_NOTE = 'Availability may vary by region. Click links to check current availability.'
+
+
+def parse_id(value, name):
+    """Parse a primary key, refusing values the database can't hold."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValidationError({name: 'Expected an integer.'})
+    if not 1 <= value <= MAX_ID:
+        raise ValidationError({name: f'Expected an integer between 1 and {MAX_ID}.'})
+    return value
+
+
+def parse_id_list(value, max_count):
+    """Parse a comma-separated ``?ids=`` value into unique ids, keeping their order."""
+    if not value:
+        raise ValidationError({'ids': 'Provide a comma-separated list of movie ids.'})
+    ids = list(dict.fromkeys(parse_id(part, 'ids') for part in value.split(',') if part.strip()))
+    if len(ids) > max_count:
+        raise ValidationError({'ids': f'At most {max_count} ids per request.'})
+    return ids
+
+
+def parse_limit(value, default, maximum, name='limit'):
+    """Parse a ``?limit=``-style value; larger values than ``maximum`` are capped."""
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        limit = 0
+    if limit < 1:
+        raise ValidationError({name: 'Expected a positive integer.'})
+    return min(limit, maximum)
+
+
+def normalize_region(region):
+    region = region or getattr(settings, 'WATCH_OPTIONS_DEFAULT_REGION', 'US')
+    if not isinstance(region, str) or len(region) != 2 or not region.isalpha():
+        raise ValidationError({'region': 'Expected a two-letter country code.'})
+    return region.upper()
+
+
+def watch_region(request):
+    return normalize_region(request.query_params.get('region'))
+
+
+class MovieViewSet(CompiledListMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Movie.objects.all()
     serializer_class = MovieSerializer
     permission_classes = [AllowAny]
+    replica_actions = ('list', 'retrieve', 'categories', 'export', 'similar', 'stats', 'watch_options')
+    compiled_serializers = {'list': CompiledMovieSerializer}
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -21,145 +193,130 @@ class MovieViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
     def get_queryset(self):
-        queryset = Movie.objects.all()
-        filter_type = self.request.query_params.get('filter', None)
-        search = self.request.query_params.get('search', None)
-
-        # Apply search filter
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | Q(description__icontains=search)
-            )
+        queryset = filter_movies(Movie.objects.all(), self.request.query_params, self.request.user)
+        if self.action in ('list', 'retrieve'):
+            fields = sparse_fieldset(self.request, MovieSerializer.Meta.fields)
+            queryset = movie_queryset_for_fields(queryset, fields)
+        return queryset
 
-        # Apply category filters
-        if filter_type == 'trending':
-            # Trending: Movies with most reviews and wishlists in the last 30 days
-            thirty_days_ago = datetime.now() - timedelta(days=30)
-            queryset = queryset.annotate(
-                recent_reviews=Count('reviews', filter=Q(reviews__created_at__gte=thirty_days_ago)),
-                total_wishlists=Count('wishlist')
-            ).filter(
-                Q(recent_reviews__gt=0) | Q(total_wishlists__gt=0)
-            ).order_by('-recent_reviews', '-total_wishlists')
-            
-        elif filter_type == 'top-rated':
-            # Top-rated: Movies with highest average rating (minimum 3 reviews)
-            queryset = queryset.annotate(
-                avg_rating=Avg('reviews__rating'),
-                review_count=Count('reviews')
-            ).filter(
-                review_count__gte=3
-            ).order_by('-avg_rating', '-review_count')
-            
-        elif filter_type == 'latest':
-            # Latest: Most recently added movies
-            queryset = queryset.order_by('-created_at')
-        else:
-            # Default: Order by release date (newest first)
-            queryset = queryset.order_by('-release_date')
+    def get_compiled_queryset(self):
+        return filter_movies(Movie.objects.all(), self.request.query_params, self.request.user)
 
-        return queryset
+    def list(self, request, *args, **kwargs):
+        if 'ids' in request.query_params:
+            return self.multi_get(request)
+        return super().list(request, *args, **kwargs)
+
+    def multi_get(self, request):
+        """``?ids=3,1,2``: those movies in the requested order, plus any ids that don't exist"""
+        ids = parse_id_list(request.query_params.get('ids'), getattr(settings, 'MOVIE_BATCH_MAX_IDS', 100))
+        fields = sparse_fieldset(request, MovieSerializer.Meta.fields)
+        movies = movie_queryset_for_fields(Movie.objects.all(), fields).in_bulk(ids)
+
+        serializer = self.get_serializer([movies[pk] for pk in ids if pk in movies], many=True)
+        response = Response({
+            'results': serializer.data,
+            'missing': [pk for pk in ids if pk not in movies],
+        })
+        # The URL is the ID set, so shared caches can serve repeats of it
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'MOVIE_BATCH_MAX_AGE', 60))
+        return response
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """Stream the filtered movie list as NDJSON or CSV (staff only)"""
+        return _export_response(request, self.get_queryset(), MOVIE_EXPORT_FIELDS, 'movies')
 
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def categories(self, request):
         """Get movie counts for each category"""
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        
-        trending_count = Movie.objects.annotate(
-            recent_reviews=Count('reviews', filter=Q(reviews__created_at__gte=thirty_days_ago)),
-            total_wishlists=Count('wishlist')
-        ).filter(
-            Q(recent_reviews__gt=0) | Q(total_wishlists__gt=0)
-        ).count()
-        
-        top_rated_count = Movie.objects.annotate(
-            review_count=Count('reviews')
-        ).filter(review_count__gte=3).count()
-        
-        latest_count = Movie.objects.count()
-        
-        return Response({
-            'trending': trending_count,
-            'top-rated': top_rated_count,
-            'latest': latest_count,
-            'all': latest_count
-        })
+        return Response(category_counts())
+
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def stats(self, request, pk=None):
+        """Rating distribution, mean, median and percentiles from the maintained histogram"""
+        movie = self.get_object()
+        histogram = RatingHistogram.objects.filter(movie=movie).first()
+        return Response({'movie_id': movie.id, **ratings.rating_stats(histogram)})
+
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def similar(self, request, pk=None):
+        """Movies most often liked by the same users (built by build_similarities)"""
+        limit = parse_limit(request.query_params.get('limit'), 10, 50)
+        movie = get_object_or_404(Movie.objects.only('id'), pk=pk)
+        neighbour_ids = list(
+            MovieSimilarity.objects.filter(movie=movie)
+            .order_by('rank')
+            .values_list('similar_movie_id', flat=True)[:limit]
+        )
+        fields = sparse_fieldset(request, MovieSerializer.Meta.fields)
+        movies = movie_queryset_for_fields(Movie.objects.all(), fields).in_bulk(neighbour_ids)
+        serializer = self.get_serializer(
+            [movies[movie_id] for movie_id in neighbour_ids if movie_id in movies], many=True,
+        )
+        return Response(serializer.data)
 
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
     def watch_options(self, request, pk=None):
         """Get streaming/watch options for a movie"""
         movie = self.get_object()
-        
-        # Mock data for common streaming platforms
-        # In production, you'd integrate with APIs like Watchmode, JustWatch, or Streaming Availability API
-        watch_options = [
-            {
-                'platform': 'Netflix',
-                'type': 'subscription',
-                'url': f'https://www.netflix.com/search?q={movie.title}',
-                'logo': 'https://upload.wikimedia.org/wikipedia/commons/0/08/Netflix_2015_logo.svg',
-                'price': None
-            },
-            {
-                'platform': 'Amazon Prime',
-                'type': 'subscription',
-                'url': f'https://www.amazon.com/s?k={movie.title}',
-                'logo': 'https://upload.wikimedia.org/wikipedia/commons/1/11/Amazon_Prime_Video_logo.svg',
-                'price': None
-            },
-            {
-                'platform': 'Disney+',
-                'type': 'subscription',
-                'url': f'https://www.disneyplus.com/search?q={movie.title}',
-                'logo': 'https://upload.wikimedia.org/wikipedia/commons/3/3e/Disney%2B_logo.svg',
-                'price': None
-            },
-            {
-                'platform': 'HBO Max',
-                'type': 'subscription',
-                'url': f'https://play.max.com/search?q={movie.title}',
-                'logo': 'https://upload.wikimedia.org/wikipedia/commons/1/17/HBO_Max_Logo.svg',
-                'price': None
-            },
-            {
-                'platform': 'Apple TV',
-                'type': 'rent/buy',
-                'url': f'https://tv.apple.com/search?term={movie.title}',
-                'logo': 'https://upload.wikimedia.org/wikipedia/commons/2/28/Apple_TV_Plus_Logo.svg',
-                'price': '$3.99+'
-            },
-            {
-                'platform': 'YouTube',
-                'type': 'rent/buy',
-                'url': f'https://www.youtube.com/results?search_query={movie.title}+full+movie',
-                'logo': 'https://upload.wikimedia.org/wikipedia/commons/0/09/YouTube_full-color_icon_%282017%29.svg',
-                'price': '$2.99+'
-            }
-        ]
-        
+        region = watch_region(request)
+        options, unavailable = get_watch_options([{'id': movie.id, 'title': movie.title}], region)
+
         return Response({
             'movie_id': movie.id,
             'movie_title': movie.title,
-            'watch_options': watch_options,
-            'note': 'Availability may vary by region. Click links to check current availability.'
+            'region': region,
+            'watch_options': options[movie.id],
+            'unavailable_providers': unavailable,
+            'note': WATCH_OPTIONS_NOTE,
         })
 
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny],
+            url_path='watch_options', url_name='watch-options-batch')
+    def watch_options_batch(self, request):
+        """Watch options for several movies at once: ?ids=1,2,3&region=US"""
+        ids = parse_id_list(request.query_params.get('ids'), getattr(settings, 'WATCH_OPTIONS_MAX_BATCH', 50))
+        region = watch_region(request)
+        movies = list(Movie.objects.filter(pk__in=ids).values('id', 'title'))
+        options, unavailable = get_watch_options(movies, region)
+
+        titles = {movie['id']: movie['title'] for movie in movies}
+        return Response({
+            'region': region,
+            'results': [
+                {'movie_id': pk, 'movie_title': titles[pk], 'watch_options': options[pk]}
+                for pk in ids if pk in titles
+            ],
+            'missing': [pk for pk in ids if pk not in titles],
+            'unavailable_providers': unavailable,
+            'note': WATCH_OPTIONS_NOTE,
+        })
 
-class WishlistViewSet(viewsets.ModelViewSet):
+
+class WishlistViewSet(SerializedWriteMixin, viewsets.ModelViewSet):
     serializer_class = WishlistSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Wishlist.objects.filter(user=self.request.user)
+        queryset = Wishlist.objects.filter(user=self.request.user)
+        if 'movie' in sparse_fieldset(self.request, WishlistSerializer.Meta.fields):
+            queryset = queryset.prefetch_related(nested_movie_prefetch())
+        return queryset
 
     def perform_create(self, serializer):
         # Check if the movie is already in the user's wishlist
         movie = serializer.validated_data['movie']
         if Wishlist.objects.filter(user=self.request.user, movie=movie).exists():
-            from rest_framework.exceptions import ValidationError
             raise ValidationError({'error': 'Movie is already in your wishlist'})
         
-        serializer.save(user=self.request.user)
+        super().perform_create(serializer)
+        invalidate_for_you(self.request.user.id)
+
+    def create_object(self, serializer):
+        entry = serializer.save(user=self.request.user)
+        trending.record_event(entry.movie_id, 'wishlist')
+        return entry
 
     def destroy(self, request, *args, **kwargs):
         # Override destroy to handle deletion by movie ID
@@ -167,7 +324,8 @@ class WishlistViewSet(viewsets.ModelViewSet):
         try:
             # Try to find wishlist item by movie ID
             wishlist_item = Wishlist.objects.get(user=request.user, movie_id=movie_id)
-            wishlist_item.delete()
+            self.perform_destroy(wishlist_item)
+            invalidate_for_you(request.user.id)
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Wishlist.DoesNotExist:
             return Response(
@@ -181,38 +339,162 @@ class WishlistViewSet(viewsets.ModelViewSet):
             )
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(SerializedWriteMixin, viewsets.ModelViewSet):
 
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
+    pagination_class = CommentFeedPagination
+
     def get_queryset(self):
+        queryset = Comment.objects.all()
+        fields = sparse_fieldset(self.request, CommentSerializer.Meta.fields)
+        if 'username' in fields:
+            queryset = queryset.select_related('user').defer(*USER_DEFERRED_FIELDS)
+        if 'comment_text' not in fields:
+            queryset = queryset.defer('comment_text')
         movie_id = self.request.query_params.get("movie_id")
         if movie_id:
-            return Comment.objects.filter(movie_id=movie_id)
-        return Comment.objects.all()
+            queryset = queryset.filter(movie_id=movie_id)
+
+        # Incremental fetch: only comments newer than the given timestamp
+        since = self.request.query_params.get("since")
+        if since:
+            since_dt = parse_datetime(since)
+            if since_dt is None:
+                raise ValidationError({'since': 'Expected an ISO 8601 datetime'})
+            if timezone.is_naive(since_dt):
+                since_dt = timezone.make_aware(since_dt)
+            queryset = queryset.filter(created_at__gt=since_dt)
+
+        return queryset
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        comment = super().perform_create(serializer)
+        data = serializer.data
+        transaction.on_commit(lambda: publish_movie_event(comment.movie_id, 'comment', data))
+
+    def create_object(self, serializer):
+        comment = serializer.save(user=self.request.user)
+        trending.record_event(comment.movie_id, 'comment')
+        return comment
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(SerializedWriteMixin, CompiledListMixin, ReplicaReadMixin, viewsets.ModelViewSet):
 
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    replica_actions = ('export',)
+    compiled_serializers = {'list': CompiledReviewSerializer}
 
     def get_queryset(self):
-        movie_id = self.request.query_params.get("movie_id")
-        if movie_id:
-            return Review.objects.filter(movie_id=movie_id)
-        return Review.objects.all()
+        queryset = filter_reviews(Review.objects.all(), self.request.query_params)
+        if self.action == 'export':
+            return queryset
+        return self.optimize_for_fields(queryset)
+
+    def get_compiled_queryset(self):
+        return filter_reviews(Review.objects.all(), self.request.query_params)
+
+    def optimize_for_fields(self, queryset):
+        fields = sparse_fieldset(self.request, ReviewSerializer.Meta.fields)
+        if 'username' in fields:
+            queryset = queryset.select_related('user').defer(*USER_DEFERRED_FIELDS)
+        if 'movie' in fields:
+            queryset = queryset.prefetch_related(nested_movie_prefetch())
+        if 'review_text' not in fields:
+            queryset = queryset.defer('review_text')
+        return queryset
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        review = super().perform_create(serializer)
+        review.movie.refresh_from_db(fields=['rating_sum', 'rating_count', 'bayesian_rating'])
+        invalidate_for_you(self.request.user.id)
+        data = serializer.data
+        transaction.on_commit(lambda: publish_movie_event(review.movie_id, 'review', data))
+
+    def perform_update(self, serializer):
+        review = super().perform_update(serializer)
+        review.movie.refresh_from_db(fields=['rating_sum', 'rating_count', 'bayesian_rating'])
+        invalidate_for_you(review.user_id)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        invalidate_for_you(instance.user_id)
+
+    def create_object(self, serializer):
+        with transaction.atomic():
+            review = serializer.save(user=self.request.user)
+            ratings.review_saved(review)
+            trending.record_event(review.movie_id, 'review')
+        return review
+
+    def update_object(self, serializer):
+        old_movie_id, old_rating = serializer.instance.movie_id, serializer.instance.rating
+        with transaction.atomic():
+            review = serializer.save()
+            ratings.review_saved(review, old_movie_id=old_movie_id, old_rating=old_rating)
+        return review
+
+    @action(detail=False, methods=["get"], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """Stream the filtered review list as NDJSON or CSV (staff only)"""
+        return _export_response(request, self.get_queryset().order_by('id'), REVIEW_EXPORT_FIELDS, 'reviews')
 
     @action(detail=True, methods=["get"], permission_classes=[AllowAny])
     def movie_reviews(self, request, pk=None):
         """Custom action: get all reviews for a given movie"""
-        reviews = Review.objects.filter(movie_id=pk)
+        reviews = self.optimize_for_fields(Review.objects.filter(movie_id=pk))
         serializer = self.get_serializer(reviews, many=True)
         return Response(serializer.data)
+
+
+class ImageUploadViewSet(SerializedWriteMixin, mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                         mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """Resumable poster uploads: POST to start, PUT chunks, POST complete/.
+
+    GET shows how many bytes have been received, so an interrupted upload
+    resumes from there. DELETE abandons it.
+    """
+    serializer_class = ImageUploadSerializer
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        return ImageUpload.objects.filter(user=self.request.user)
+
+    def create_object(self, serializer):
+        data = serializer.validated_data
+        serializer.instance = uploads.initiate(
+            self.request.user, data['filename'], data['size'], data['sha256'], data.get('movie'),
+        )
+        return serializer.instance
+
+    def destroy_object(self, instance):
+        uploads.abort(instance)
+
+    @action(detail=True, methods=['put'])
+    def chunk(self, request, pk=None):
+        """Append ``Content-Range: bytes start-end/size`` from the raw request body"""
+        upload = self.get_object()
+        start, end = uploads.parse_content_range(request.headers.get('Content-Range'), upload.size)
+        try:
+            # Read the body before taking the write lock; only the offset bump needs it
+            uploads.write_chunk(upload, start, end, request.stream)
+            with serialized_writes():
+                upload = uploads.commit_chunk(upload.pk, start, end)
+        except uploads.OffsetMismatch as exc:
+            return Response({'detail': str(exc), 'received': exc.expected}, status=status.HTTP_409_CONFLICT)
+        return Response({'received': upload.received, 'size': upload.size})
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Verify the checksum, store the image and attach it to the movie"""
+        upload = self.get_object()
+        movie = None
+        if request.data.get('movie_id') is not None:
+            movie = get_object_or_404(Movie, pk=request.data['movie_id'])
+        # Hash, verify and store before taking the write lock; only the status change needs it
+        name, error = uploads.store_staged(upload)
+        with serialized_writes():
+            upload = uploads.complete(upload.pk, name, error, movie)
+        return Response(self.get_serializer(upload).data)
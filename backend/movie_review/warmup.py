@@ -0,0 +1,159 @@
+"""Warm caches and in-process indexes before serving traffic.
+
+``run()`` executes the warm-up components in parallel and returns how long
+each took. Shared state (the category counts in the cache, the database's
+buffer cache) is warmed by ``manage.py warmup`` once per deploy;
+per-process state (the fuzzy search index, watch provider pool) has to be
+warmed in every worker, which is what ``WARMUP_ON_STARTUP`` does. Database
+connections aren't warmed: they belong to the thread that opened them, so
+one opened here would never serve a request; ``CONN_MAX_AGE`` keeps each
+request thread's own connection open instead.
+
+Importing ``wsgi.py`` / ``asgi.py`` is what makes a process a server, so
+they call ``start_on_startup()`` and wait for it before handing the
+application to the server; a worker only takes requests when it is warm.
+Tests, management commands and task workers never import them and don't
+pay for a warm-up. When the server imports the application once and forks
+its workers from it (gunicorn ``--preload``), threads don't survive the
+fork, so the ``post_fork`` hook in ``gunicorn.conf.py`` restarts the
+warm-up in each worker. Other forks (multiprocessing, subprocesses) are
+left alone.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+def warm_categories():
+    from .queries import category_counts
+
+    category_counts(refresh=True)
+
+
+def warm_listings():
+    """Read the first page of each listing so its index and rows are in memory."""
+    from .fast_serializers import CompiledMovieSerializer
+    from .models import Movie
+    from .queries import filter_movies
+
+    size = getattr(settings, 'WARMUP_LISTING_SIZE', 100)
+    serializer = CompiledMovieSerializer()
+    for filter_type in ('trending', 'top-rated', 'latest', 'all'):
+        serializer.serialize(filter_movies(Movie.objects.all(), {'filter': filter_type})[:size])
+
+
+def warm_search():
+    from . import fuzzy_search
+
+    if fuzzy_search.uses_database():
+        fuzzy_search.search('warmup')
+    else:
+        fuzzy_search.get_index()
+
+
+def warm_watch_providers():
+    from .watch_providers import get_providers
+
+    get_providers()
+
+
+def warm_snapshots():
+    from .snapshots import SnapshotBuilder
+
+    builder = SnapshotBuilder()
+    builder.build_listings()
+    builder.build_categories()
+    builder.commit()
+
+
+COMPONENTS = {
+    'categories': warm_categories,
+    'listings': warm_listings,
+    'search': warm_search,
+    'watch_providers': warm_watch_providers,
+    'snapshots': warm_snapshots,
+}
+# Per-worker components; snapshots are written once per deploy by the command
+STARTUP_COMPONENTS = ('categories', 'listings', 'search', 'watch_providers')
+
+
+def _timed(name):
+    started = time.perf_counter()
+    try:
+        COMPONENTS[name]()
+        error = None
+    except Exception as exc:
+        error = exc
+    finally:
+        # Worker threads opened their own connections
+        if threading.current_thread() is not threading.main_thread():
+            connections.close_all()
+    return name, time.perf_counter() - started, error
+
+
+def run(components=STARTUP_COMPONENTS, parallel=True):
+    """Warm ``components``; returns ``{name: (seconds, exception or None)}``."""
+    if parallel and len(components) > 1:
+        with ThreadPoolExecutor(max_workers=len(components), thread_name_prefix='warmup') as pool:
+            results = list(pool.map(_timed, components))
+    else:
+        results = [_timed(name) for name in components]
+    return {name: (seconds, error) for name, seconds, error in results}
+
+
+_startup_done = threading.Event()
+_startup_thread = None
+
+
+def _startup():
+    try:
+        # Queries during app loading are discouraged, so wait for it to finish
+        apps.ready_event.wait()
+        started = time.perf_counter()
+        results = run()
+        for name, (seconds, error) in results.items():
+            if error is not None:
+                logger.warning('Warm-up of %s failed after %.2fs: %s', name, seconds, error)
+        logger.info('Warm-up finished in %.2fs: %s', time.perf_counter() - started,
+                    ', '.join(f'{name} {seconds:.2f}s' for name, (seconds, _) in results.items()))
+    finally:
+        _startup_done.set()
+
+
+def start_on_startup():
+    """Called from ``wsgi.py`` / ``asgi.py``, in the process that will serve."""
+    global _startup_thread
+    if _startup_thread is not None or not getattr(settings, 'WARMUP_ON_STARTUP', False):
+        return
+    _startup_thread = threading.Thread(target=_startup, name='warmup', daemon=True)
+    _startup_thread.start()
+
+
+def post_fork(server, worker):
+    """gunicorn ``post_fork`` hook: restart the warm-up in a forked worker.
+
+    Only does anything when the master already started one, i.e. it loaded
+    the application with ``--preload``; otherwise the worker imports
+    ``wsgi.py`` itself. Doesn't wait for the warm-up, so the hook returns
+    straight away.
+    """
+    global _startup_done, _startup_thread
+    if _startup_thread is None:
+        return
+    _startup_done = threading.Event()
+    _startup_thread = None
+    start_on_startup()
+
+
+def wait_for_startup():
+    """Block until the startup warm-up is done (or WARMUP_TIMEOUT passes)."""
+    if _startup_thread is not None:
+        _startup_done.wait(getattr(settings, 'WARMUP_TIMEOUT', 60))
@@ -0,0 +1,239 @@
+"""Where-to-watch availability from pluggable providers.
+
+A provider implements ``WatchProvider.fetch`` for a batch of movies in one
+region. ``get_watch_options`` fans out to every provider in
+``WATCH_PROVIDERS`` concurrently, gives each its own deadline (counted from
+when it was started, so a slow request waits for the longest timeout, not
+their sum), caches the
+answers per (provider, region, movie) and coalesces concurrent cache misses
+for the same key into a single provider call.
+
+A thread can't be stopped once ``fetch`` is running, so calls still queued
+when the request that started them times out are cancelled (unless another
+request is waiting on the same call), and each provider may only have
+``WATCH_PROVIDER_MAX_CALLS`` calls running at once: a provider that hangs
+ties up that many pool threads and is reported unavailable, instead of
+taking the whole pool from the others. ``fetch`` should still set its own
+network timeouts.
+
+The only bundled provider, ``SearchLinkProvider``, links to each platform's
+search page and makes no network calls. Real APIs (JustWatch, Watchmode)
+plug in as further providers.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+
+class WatchProvider:
+    """Base class for availability providers."""
+
+    #: Short identifier, used in cache keys
+    name = None
+    #: Seconds to wait for this provider; None uses WATCH_PROVIDER_TIMEOUT
+    timeout = None
+
+    def fetch(self, movies, region):
+        """Return ``{movie_id: [option, ...]}`` for ``movies``.
+
+        ``movies`` is a list of ``{'id': ..., 'title': ...}`` dicts. Movies
+        the provider knows nothing about may be left out.
+        """
+        raise NotImplementedError
+
+
+class SearchLinkProvider(WatchProvider):
+    name = 'search-links'
+
+    PLATFORMS = [
+        ('Netflix', 'subscription', 'https://www.netflix.com/search?q={title}',
+         'https://upload.wikimedia.org/wikipedia/commons/0/08/Netflix_2015_logo.svg', None),
+        ('Amazon Prime', 'subscription', 'https://www.amazon.com/s?k={title}',
+         'https://upload.wikimedia.org/wikipedia/commons/1/11/Amazon_Prime_Video_logo.svg', None),
+        ('Disney+', 'subscription', 'https://www.disneyplus.com/search?q={title}',
+         'https://upload.wikimedia.org/wikipedia/commons/3/3e/Disney%2B_logo.svg', None),
+        ('HBO Max', 'subscription', 'https://play.max.com/search?q={title}',
+         'https://upload.wikimedia.org/wikipedia/commons/1/17/HBO_Max_Logo.svg', None),
+        ('Apple TV', 'rent/buy', 'https://tv.apple.com/search?term={title}',
+         'https://upload.wikimedia.org/wikipedia/commons/2/28/Apple_TV_Plus_Logo.svg', '$3.99+'),
+        ('YouTube', 'rent/buy', 'https://www.youtube.com/results?search_query={title}+full+movie',
+         'https://upload.wikimedia.org/wikipedia/commons/0/09/YouTube_full-color_icon_%282017%29.svg', '$2.99+'),
+    ]
+
+    def fetch(self, movies, region):
+        return {
+            movie['id']: [
+                {
+                    'platform': platform,
+                    'type': kind,
+                    'url': url.format(title=movie['title']),
+                    'logo': logo,
+                    'price': price,
+                }
+                for platform, kind, url, logo, price in self.PLATFORMS
+            ]
+            for movie in movies
+        }
+
+
+_providers = None
+_executor = None
+# Pool threads don't survive a fork (gunicorn --preload), so a forked worker starts its own
+_pool_pid = None
+_setup_lock = threading.Lock()
+
+# cache key -> Future of the provider call that will fill it
+_inflight = {}
+# provider name -> calls submitted and not finished yet
+_running = {}
+# Calls that a request other than the one that started them is waiting on
+_shared = set()
+# Reentrant: cancelling a call runs its done-callback, which takes the lock, right away
+_inflight_lock = threading.RLock()
+
+
+def get_providers():
+    global _providers, _executor, _pool_pid
+    if _providers is None or _pool_pid != os.getpid():
+        with _setup_lock:
+            if _providers is None or _pool_pid != os.getpid():
+                # Calls in flight in the parent will never finish here
+                _inflight.clear()
+                _running.clear()
+                _shared.clear()
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'WATCH_PROVIDER_WORKERS', 8),
+                    thread_name_prefix='watch-provider',
+                )
+                _providers = [
+                    import_string(path)()
+                    for path in getattr(settings, 'WATCH_PROVIDERS', ['movie_review.watch_providers.SearchLinkProvider'])
+                ]
+                _pool_pid = os.getpid()
+    return _providers
+
+
+def _cache_key(provider, region, movie_id):
+    return f'watch:{provider.name}:{region}:{movie_id}'
+
+
+def _call_provider(provider, movies, region, keys):
+    results = provider.fetch(movies, region)
+    # Cache misses too, so unknown titles don't hit the provider every time
+    cache.set_many(
+        {keys[movie['id']]: results.get(movie['id'], []) for movie in movies},
+        getattr(settings, 'WATCH_OPTIONS_CACHE_TTL', 6 * 3600),
+    )
+    return results
+
+
+def _call_finished(provider, keys):
+    # Also runs for calls cancelled before they started
+    def finished(future):
+        with _inflight_lock:
+            _running[provider.name] -= 1
+            _shared.discard(future)
+            for key in keys.values():
+                if _inflight.get(key) is future:
+                    del _inflight[key]
+    return finished
+
+
+def _start_provider(provider, movies, region):
+    """Read the cache and start (or join) provider calls for the misses.
+
+    Returns the cached options, the futures that will supply the rest,
+    whether some misses weren't fetched because the provider is saturated,
+    and the call this request started, if any.
+    """
+    keys = {movie['id']: _cache_key(provider, region, movie['id']) for movie in movies}
+    cached = cache.get_many(list(keys.values()))
+    options = {movie_id: cached[key] for movie_id, key in keys.items() if key in cached}
+
+    futures = set()
+    saturated = False
+    submitted = None
+    with _inflight_lock:
+        missing = {}
+        for movie in movies:
+            key = keys[movie['id']]
+            if movie['id'] in options:
+                continue
+            if key in _inflight:
+                futures.add(_inflight[key])
+                _shared.add(_inflight[key])
+            else:
+                missing[key] = movie
+
+        if missing:
+            # A call may have filled these and left _inflight since the read above
+            for key, value in cache.get_many(list(missing)).items():
+                options[missing.pop(key)['id']] = value
+
+        if missing and _running.get(provider.name, 0) >= getattr(settings, 'WATCH_PROVIDER_MAX_CALLS', 4):
+            saturated = True
+        elif missing:
+            to_fetch = list(missing.values())
+            fetch_keys = {movie['id']: keys[movie['id']] for movie in to_fetch}
+            submitted = _executor.submit(_call_provider, provider, to_fetch, region, fetch_keys)
+            _running[provider.name] = _running.get(provider.name, 0) + 1
+            for key in fetch_keys.values():
+                _inflight[key] = submitted
+            futures.add(submitted)
+
+    if submitted is not None:
+        # Outside the lock: the callback takes it, and runs right here if the call is already done
+        submitted.add_done_callback(_call_finished(provider, fetch_keys))
+    return options, futures, saturated, submitted
+
+
+def _cancel_unshared(future):
+    # Only possible while still queued; running calls finish in the background
+    with _inflight_lock:
+        if future not in _shared:
+            future.cancel()
+
+
+def get_watch_options(movies, region):
+    """Watch options for ``movies`` from all providers.
+
+    Returns ``(options, unavailable)``: options keyed by movie id, and the
+    names of providers that failed or timed out (their options are missing).
+    """
+    providers = get_providers()
+    default_timeout = getattr(settings, 'WATCH_PROVIDER_TIMEOUT', 2.0)
+
+    # Start every provider before waiting on any, so they run concurrently
+    started = []
+    for provider in providers:
+        deadline = time.monotonic() + (provider.timeout or default_timeout)
+        started.append((provider, deadline, *_start_provider(provider, movies, region)))
+
+    options = {movie['id']: [] for movie in movies}
+    unavailable = []
+    for provider, deadline, cached, futures, saturated, submitted in started:
+        found = dict(cached)
+        done, pending = wait(futures, timeout=max(0, deadline - time.monotonic()))
+        failed = saturated or bool(pending)
+        if submitted in pending:
+            _cancel_unshared(submitted)
+        for future in done:
+            if future.cancelled() or future.exception() is not None:
+                failed = True
+                continue
+            for movie_id, movie_options in future.result().items():
+                if movie_id in options and movie_id not in found:
+                    found[movie_id] = movie_options
+        if failed:
+            unavailable.append(provider.name)
+
+        for movie_id, movie_options in found.items():
+            options[movie_id].extend(movie_options)
+
+    return options, unavailable
@@ -0,0 +1,64 @@
+"""ModelAdmin building blocks for tables too large for the admin defaults.
+
+Out of the box a changelist runs an exact ``COUNT(*)`` (twice, with
+``show_full_result_count``), renders related objects with a query per row,
+loads every related row into ``<select>`` widgets and searches with
+``icontains``, which can't use an index.
+"""
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .database import MAX_ID, estimated_row_count
+
+
+class EstimatedCountPaginator(Paginator):
+    """Use the planner's row estimate for unfiltered changelists of large tables.
+
+    Filtered or searched lists, and tables below
+    ``ADMIN_ESTIMATED_COUNT_THRESHOLD`` rows, are still counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model._meta.db_table, queryset.db)
+            if estimate is not None and estimate >= getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 10000):
+                return estimate
+        return super().count
+
+
+class LargeTableAdminMixin:
+    """Estimated counts and exact, index-backed search.
+
+    ``exact_search_fields`` are matched case-sensitively with ``=``, which
+    their indexes can serve. A term that is a valid primary key (an
+    integer in 1..``MAX_ID``) also matches by pk.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    exact_search_fields = ()
+
+    def get_search_fields(self, request):
+        return self.exact_search_fields
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+
+        condition = Q()
+        try:
+            pk = queryset.model._meta.pk.to_python(term)
+        except ValidationError:
+            pk = None
+        # Larger ints overflow the database's integer type instead of matching nothing
+        if pk is not None and 1 <= pk <= MAX_ID:
+            condition |= Q(pk=pk)
+        for field in self.exact_search_fields:
+            condition |= Q(**{field: term})
+        return queryset.filter(condition), False
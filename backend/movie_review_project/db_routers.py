@@ -0,0 +1,51 @@
+"""Route reads for read-only API actions to the replica.
+
+Views opt in by wrapping their work in ``replica_reads()`` (see
+``ReplicaReadMixin`` in ``movie_review.views``). Everything else, including
+all writes and reads inside write requests, goes to ``default`` so users
+always see their own changes.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA_ALIAS = 'replica'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+@contextmanager
+def replica_reads():
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def start_replica_reads():
+    """Non-contextmanager form, for code paths that can't wrap a ``with``."""
+    return _use_replica.set(True)
+
+
+def stop_replica_reads(token):
+    _use_replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and REPLICA_ALIAS in settings.DATABASES:
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
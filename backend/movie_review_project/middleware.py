@@ -0,0 +1,104 @@
+import gzip
+import re
+
+from django.conf import settings
+from django.utils.cache import cc_delim_re, patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+_accept_encoding_re = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'text/',
+    'application/javascript',
+)
+
+
+def _accepted_encodings(header):
+    """Map each encoding in an Accept-Encoding header to its q-value."""
+    accepted = {}
+    for match in _accept_encoding_re.finditer(header):
+        try:
+            accepted[match.group(1).lower()] = float(match.group(2) or 1)
+        except ValueError:
+            continue
+    return accepted
+
+
+class CompressionMiddleware:
+    """Compress responses with brotli or gzip, negotiated from Accept-Encoding.
+
+    Bodies smaller than COMPRESSION_MIN_SIZE bytes, streaming responses,
+    responses marked ``Cache-Control: no-transform`` and non-text content
+    types (images are already compressed) pass through untouched. Brotli is
+    used when the client accepts it and the ``brotli`` package is installed.
+
+    Compressing a secret next to attacker-influenced text leaks the secret
+    through the compressed size (BREACH). The URL names in
+    COMPRESSION_EXEMPT_URL_NAMES (the JWT endpoints) are never compressed,
+    and requests carrying credentials only get gzip with a random-length
+    filename header, as Django's GZipMiddleware does, so the size of a
+    response to them isn't stable enough to measure.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.gzip_level = getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6)
+        self.brotli_quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+        self.exempt_url_names = set(getattr(settings, 'COMPRESSION_EXEMPT_URL_NAMES', ()))
+        self.max_random_bytes = getattr(settings, 'COMPRESSION_MAX_RANDOM_BYTES', 100)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < self.min_size
+            or not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES)
+            or 'no-transform' in cc_delim_re.split(response.get('Cache-Control', '').lower())
+        ):
+            return response
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is not None and resolver_match.url_name in self.exempt_url_names:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        # A bearer token or session cookie means the body may hold private data
+        credentialed = 'HTTP_AUTHORIZATION' in request.META or settings.SESSION_COOKIE_NAME in request.COOKIES
+
+        if credentialed:
+            if accepted.get('gzip', 0) <= 0:
+                return response
+            encoding = 'gzip'
+            compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+        elif brotli is not None and accepted.get('br', 0) > 0:
+            encoding = 'br'
+            compressed = brotli.compress(response.content, quality=self.brotli_quality)
+        elif accepted.get('gzip', 0) > 0:
+            encoding = 'gzip'
+            compressed = gzip.compress(response.content, compresslevel=self.gzip_level, mtime=0)
+        else:
+            return response
+
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+
+        # The compressed body is a different representation of the resource
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
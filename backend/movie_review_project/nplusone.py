@@ -0,0 +1,166 @@
+"""Detect N+1 queries: the same statement repeated once per row.
+
+``QueryRecorder`` hooks every database connection with an execute wrapper
+and groups statements by fingerprint (the SQL with placeholders and
+``IN (...)`` lists collapsed), so ``SELECT ... WHERE id = %s`` run fifty
+times for fifty rows shows up as one fingerprint with count 50. Each
+fingerprint remembers where it was first issued: the serializer field
+being rendered, if any, and the innermost frame in project code.
+
+``NPlusOneMiddleware`` applies this per request (``NPLUSONE_MODE`` is
+``'off'``, ``'log'`` or ``'raise'``), and ``assert_no_n_plus_one`` /
+``check_n_plus_one`` do it in tests and for a whole API.
+"""
+
+import logging
+import re
+import sys
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST_RE = re.compile(r'\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)', re.IGNORECASE)
+_NUMBER_RE = re.compile(r'\b\d+\b')
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_THIS_FILE = str(Path(__file__).resolve())
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def fingerprint(sql):
+    sql = _STRING_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _NUMBER_RE.sub('?', sql)
+
+
+def _project_root():
+    return str(Path(settings.BASE_DIR).resolve())
+
+
+def _attribute(frame, project_root):
+    """Serializer field being rendered and innermost project code location."""
+    serializer_field = location = None
+    while frame is not None and (serializer_field is None or location is None):
+        code = frame.f_code
+        if serializer_field is None and code.co_name == 'to_representation':
+            current = frame.f_locals.get('field')
+            owner = frame.f_locals.get('self')
+            if current is not None and owner is not None and hasattr(current, 'field_name'):
+                serializer_field = f'{type(owner).__name__}.{current.field_name}'
+        filename = code.co_filename
+        if (location is None and filename.startswith(project_root) and filename != _THIS_FILE
+                and 'site-packages' not in filename):
+            location = f'{Path(filename).relative_to(project_root)}:{frame.f_lineno} in {code.co_name}'
+        frame = frame.f_back
+    return serializer_field, location
+
+
+@dataclass
+class QueryGroup:
+    sql: str
+    count: int = 0
+    serializer_field: str = None
+    location: str = None
+
+    def describe(self):
+        source = ' / '.join(part for part in (self.serializer_field, self.location) if part) or 'unknown'
+        return f'{self.count}x from {source}: {self.sql[:300]}'
+
+
+@dataclass
+class QueryRecorder:
+    """Context manager collecting query fingerprints on every connection."""
+    groups: dict = field(default_factory=dict)
+    total: int = 0
+
+    def __post_init__(self):
+        self._project_root = _project_root()
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        key = fingerprint(sql)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = QueryGroup(sql)
+            group.serializer_field, group.location = _attribute(sys._getframe(1), self._project_root)
+        group.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def repeated(self, threshold=None):
+        """Groups run at least ``threshold`` times (NPLUSONE_THRESHOLD by default), worst first."""
+        if threshold is None:
+            threshold = getattr(settings, 'NPLUSONE_THRESHOLD', 5)
+        return sorted((g for g in self.groups.values() if g.count >= threshold), key=lambda g: -g.count)
+
+    def report(self, threshold=None):
+        return '\n'.join(group.describe() for group in self.repeated(threshold))
+
+
+@contextmanager
+def assert_no_n_plus_one(threshold=None):
+    """Fail with an ``AssertionError`` listing the repeated queries, for use in tests."""
+    with QueryRecorder() as recorder:
+        yield recorder
+    report = recorder.report(threshold)
+    if report:
+        raise AssertionError(f'Repeated queries detected:\n{report}')
+
+
+class NPlusOneMiddleware:
+    """Log or raise on repeated queries per request, per ``NPLUSONE_MODE``.
+
+    A streaming response runs most of its queries while the server iterates
+    the body, after this middleware has returned, so its
+    ``streaming_content`` is wrapped to keep recording until the last chunk
+    and report then. By that point the status line has been sent, so in
+    ``'raise'`` mode the error cuts the body short instead of turning into
+    a 500. Async streams (the server-sent events) are left alone: their
+    queries run in ``sync_to_async`` threads the recorder doesn't see.
+    """
+
+    def __init__(self, get_response):
+        self.mode = getattr(settings, 'NPLUSONE_MODE', 'off')
+        if self.mode not in ('log', 'raise'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with recorder:
+            response = self.get_response(request)
+        if response.streaming and not response.is_async:
+            response.streaming_content = self._record_stream(request, recorder, response.streaming_content)
+        else:
+            self._report(request, recorder)
+        return response
+
+    def _record_stream(self, request, recorder, content):
+        with recorder:
+            yield from content
+        self._report(request, recorder)
+
+    def _report(self, request, recorder):
+        report = recorder.report()
+        if report:
+            message = f'Repeated queries in {request.method} {request.path}:\n{report}'
+            if self.mode == 'raise':
+                raise NPlusOneError(message)
+            logger.warning(message)
@@ -0,0 +1,27 @@
+"""Faster JSON rendering for DRF.
+
+``FastJSONRenderer`` uses orjson when it is installed and falls back to
+DRF's stdlib-based ``JSONRenderer`` otherwise (and whenever the client asks
+for indented output, which orjson only supports with a fixed indent).
+"""
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # DRF's encoder covers dates, Decimals, lazy strings, querysets etc.
+        return orjson.dumps(data, default=JSONEncoder().default, option=orjson.OPT_NON_STR_KEYS)
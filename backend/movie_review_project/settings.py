@@ -19,6 +19,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -55,12 +57,15 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'movie_review_project.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Innermost, so it sees only the view's queries; off unless NPLUSONE_MODE is set
+    'movie_review_project.nplusone.NPlusOneMiddleware',
 ]
 
 ROOT_URLCONF = 'movie_review_project.urls'
@@ -88,6 +93,10 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'movie_review_project.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
@@ -97,12 +106,70 @@ REST_FRAMEWORK = {
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Configured from the environment:
+#   DATABASE_URL          primary database (default: SQLite in BASE_DIR)
+#   DATABASE_REPLICA_URL  optional read replica for read-only API actions
+#   DB_CONN_MAX_AGE       seconds to keep connections open (default 60)
+#   DB_POOL               'true' to use psycopg's connection pool on Postgres
+#   SQLITE_PERFORMANCE    'false' to disable WAL and the tuned pragmas on SQLite
+#   SQLITE_SERIALIZE_WRITES  'true' to also queue this process's writes on a lock
+
+from movie_review_project.database import SQLITE_PRAGMAS, database_from_url
+
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '60'))
+DB_POOL = os.getenv('DB_POOL', 'false').lower() in ('1', 'true', 'yes')
+SQLITE_PERFORMANCE = os.getenv('SQLITE_PERFORMANCE', 'true').lower() in ('1', 'true', 'yes')
+SQLITE_SERIALIZE_WRITES = os.getenv('SQLITE_SERIALIZE_WRITES', 'false').lower() in ('1', 'true', 'yes')
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_from_url(
+        os.getenv('DATABASE_URL', 'sqlite:///db.sqlite3'),
+        BASE_DIR,
+        conn_max_age=DB_CONN_MAX_AGE,
+        pool=DB_POOL,
+        sqlite_pragmas=SQLITE_PRAGMAS if SQLITE_PERFORMANCE else None,
+    ),
+}
+
+if os.getenv('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = database_from_url(
+        os.getenv('DATABASE_REPLICA_URL'),
+        BASE_DIR,
+        conn_max_age=DB_CONN_MAX_AGE,
+        pool=DB_POOL,
+        sqlite_pragmas=SQLITE_PRAGMAS if SQLITE_PERFORMANCE else None,
+    )
+    # The test runner points the replica at the test copy of default
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['movie_review_project.db_routers.PrimaryReplicaRouter']
+
+
+# Password hashing
+# PASSWORD_HASHER_PROFILE picks the preferred algorithm; the cost parameters
+# below are tuned for login throughput. Changing either causes existing hashes
+# to be upgraded on the user's next login. The argon2 profile needs the
+# `argon2-cffi` package. Use `python manage.py benchmark_hashers` to size them.
+PASSWORD_HASHER_PROFILE = os.getenv('PASSWORD_HASHER_PROFILE', 'scrypt')
+PASSWORD_HASHER_PARAMS = {
+    'argon2': {'time_cost': 2, 'memory_cost': 65536, 'parallelism': 1},
+    'scrypt': {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 1},
+    'pbkdf2': {'iterations': 600000},
+}
+
+PASSWORD_HASHER_PROFILES = {
+    'argon2': 'users.hashers.TunedArgon2PasswordHasher',
+    'scrypt': 'users.hashers.TunedScryptPasswordHasher',
+    'pbkdf2': 'users.hashers.TunedPBKDF2PasswordHasher',
 }
+if PASSWORD_HASHER_PROFILE not in PASSWORD_HASHER_PROFILES:
+    raise ImproperlyConfigured(
+        f"PASSWORD_HASHER_PROFILE={PASSWORD_HASHER_PROFILE!r} is not one of {', '.join(PASSWORD_HASHER_PROFILES)}"
+    )
+# The preferred hasher goes first; the rest stay so legacy hashes still verify
+PASSWORD_HASHERS = [PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]] + [
+    path for name, path in PASSWORD_HASHER_PROFILES.items() if name != PASSWORD_HASHER_PROFILE
+]
 
 
 # Password validation
@@ -202,5 +269,139 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # EMAIL_HOST_PASSWORD = 'your-app-password'
 DEFAULT_FROM_EMAIL = 'noreply@moviezone.com'
 
+# Live movie activity (server-sent events at /api/movies/movies/<id>/events/)
+# Swap the broker for a cross-process one when running several workers.
+MOVIE_EVENTS_BROKER = 'movie_review.events.InProcessBroker'
+MOVIE_EVENTS_HEARTBEAT = 15  # seconds between keep-alive comments
+
+# Cache: in-process by default, shared Redis when REDIS_URL is set (needed for
+# fuzzy search to see title changes made by other processes, and for
+# caches warmed by management commands to be visible to the web workers)
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# "For you" feed: candidates per user and how long they stay cached
+FOR_YOU_LIMIT = 100
+FOR_YOU_CACHE_TTL = 3600
+
+# Top-rated ranking: Bayesian average pulled towards RATING_PRIOR_MEAN with the
+# weight of RATING_PRIOR_WEIGHT reviews. Changing either needs rebuild_ratings.
+RATING_PRIOR_MEAN = 6.5
+RATING_PRIOR_WEIGHT = 10
+TOP_RATED_MIN_REVIEWS = 3
+# Half-life of the "recent" average reported by /movies/{id}/stats/
+RATING_RECENT_HALF_LIFE_DAYS = 30
+
+# Trending: activity decays with this half-life; run `rebase_trending` daily
+TRENDING_HALF_LIFE_HOURS = 72
+TRENDING_WEIGHTS = {'review': 3.0, 'comment': 1.0, 'wishlist': 2.0}
+TRENDING_MIN_SCORE = 0.1
+
+# Weight of a wishlist entry in build_similarities (a review counts rating / 10)
+SIMILARITY_WISHLIST_WEIGHT = 1.0
+
+# /movies/categories/ counts are cached this many seconds
+CATEGORY_COUNTS_CACHE_TTL = 60
+
+# Warm caches and the search index in each worker before it
+# serves (movie_review.warmup); `manage.py warmup` does the shared parts once
+WARMUP_ON_STARTUP = os.getenv('WARMUP_ON_STARTUP', 'false').lower() in ('1', 'true', 'yes')
+WARMUP_TIMEOUT = 60
+WARMUP_LISTING_SIZE = 100
+
+# ?search_mode=fuzzy: trigram similarity cut-off and result count. Off
+# PostgreSQL each worker keeps an in-memory index and rebuilds it at most this
+# often after other workers change titles.
+FUZZY_SEARCH_THRESHOLD = 0.3
+FUZZY_SEARCH_LIMIT = 20
+FUZZY_SEARCH_REFRESH_SECONDS = 60
+
+# GET /movies/?ids=...: most ids per request and the Cache-Control max-age
+MOVIE_BATCH_MAX_IDS = 100
+MOVIE_BATCH_MAX_AGE = 60
+
+# POST /batch/: most sub-requests per composite call
+BATCH_MAX_REQUESTS = 20
+# Reviews per movie returned by a batch 'reviews' sub-request (?limit= up to the max)
+BATCH_REVIEWS_LIMIT = 20
+BATCH_REVIEWS_MAX_LIMIT = 100
+
+# Where-to-watch providers (movie_review.watch_providers), queried concurrently.
+# Each answer is cached per provider, region and movie.
+WATCH_PROVIDERS = ['movie_review.watch_providers.SearchLinkProvider']
+WATCH_PROVIDER_TIMEOUT = 2.0
+WATCH_PROVIDER_WORKERS = 8
+# Calls one provider may have running at once, so a hung one can't take the pool
+WATCH_PROVIDER_MAX_CALLS = 4
+WATCH_OPTIONS_CACHE_TTL = 6 * 3600
+WATCH_OPTIONS_DEFAULT_REGION = 'US'
+WATCH_OPTIONS_MAX_BATCH = 50
+
+# Chunked poster uploads (movie_review.uploads). Partial files are staged
+# outside MEDIA_ROOT; run `purge_uploads` to drop abandoned ones.
+IMAGE_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+IMAGE_UPLOAD_MAX_CHUNK_SIZE = 5 * 1024 * 1024
+IMAGE_UPLOAD_STAGING_DIR = BASE_DIR / 'upload_staging'
+IMAGE_UPLOAD_EXPIRY_HOURS = 24
+
+# Admin changelists on tables at least this large show the planner's row
+# estimate instead of an exact COUNT(*) (movie_review_project.admin_tools).
+# `benchmark_admin` fails if a changelist runs more queries than the budget.
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+ADMIN_CHANGELIST_MAX_QUERIES = 10
+
+# N+1 query detection per request: 'off', 'log' (staging) or 'raise' (dev).
+# A statement repeated NPLUSONE_THRESHOLD times in one request is reported.
+NPLUSONE_MODE = os.getenv('NPLUSONE_MODE', 'off')
+NPLUSONE_THRESHOLD = 5
+
+# `benchmark_startup` budget for django.setup() plus URL loading, and modules
+# that must only be imported on first use (not by any worker at boot)
+STARTUP_BUDGET_MS = 1500
+STARTUP_RSS_BUDGET_MB = 150
+STARTUP_LAZY_MODULES = ('google.generativeai', 'numpy', 'scipy')
+
+# Serve movie/review list actions through the compiled serializers in
+# movie_review.fast_serializers instead of DRF's ModelSerializer
+FAST_LIST_SERIALIZATION = True
+
+# Response compression (brotli needs the `brotli` package, gzip always works)
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+# Responses that carry tokens are never compressed (BREACH); responses to
+# requests with credentials get gzip padded with up to this many random bytes
+COMPRESSION_EXEMPT_URL_NAMES = ('token_obtain_pair', 'token_refresh')
+COMPRESSION_MAX_RANDOM_BYTES = 100
+
+# Static catalogue snapshots written by `build_snapshots`, for a static
+# server or CDN to answer anonymous catalogue reads without Django
+SNAPSHOT_ROOT = BASE_DIR / 'snapshots'
+SNAPSHOT_PAGE_SIZE = 50
+SNAPSHOT_MAX_PAGES = 20
+# Where the API is served, for absolute image URLs like the live responses have
+SNAPSHOT_BASE_URL = os.getenv('SNAPSHOT_BASE_URL', 'http://localhost:8000')
+# Older manifests, and objects only they reference, are deleted after a build
+SNAPSHOT_KEEP_MANIFESTS = 5
+
+# Outbound mail queue (drained by `python manage.py send_queued_mail`)
+MAIL_QUEUE_BATCH_SIZE = 100
+MAIL_QUEUE_MAX_ATTEMPTS = 5
+MAIL_QUEUE_RETRY_BACKOFF = 30  # seconds, doubled on each retry
+MAIL_QUEUE_MAX_BACKOFF = 3600
+MAIL_QUEUE_LEASE_SECONDS = 300
+FRONTEND_URL = 'http://localhost:3000'
+
 # Password Reset Token Expiry (in seconds) - 1 hour
 PASSWORD_RESET_TIMEOUT = 3600
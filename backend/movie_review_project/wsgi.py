@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'movie_review_project.settings')
 
 application = get_wsgi_application()
+
+# Don't take requests until the WARMUP_ON_STARTUP warm-up is done. Only
+# server processes import this module, so this is where the warm-up starts
+from movie_review.warmup import start_on_startup, wait_for_startup  # noqa: E402
+
+start_on_startup()
+wait_for_startup()
@@ -1,3 +1,26 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
 
-# Register your models here.
+from movie_review_project.admin_tools import EstimatedCountPaginator, LargeTableAdminMixin
+
+from .models import OutboundEmail
+
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class LargeUserAdmin(LargeTableAdminMixin, UserAdmin):
+    # username is the only indexed text column on auth_user
+    exact_search_fields = ('username',)
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'to_email', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('to_email',)
+    readonly_fields = ('created_at', 'sent_at', 'locked_at', 'last_error')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
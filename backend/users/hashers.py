@@ -0,0 +1,57 @@
+"""Password hashers whose cost parameters come from settings.
+
+The algorithm names match Django's built-in hashers, so existing hashes keep
+verifying. When ``PASSWORD_HASHER_PROFILE`` or its parameters change, Django
+rehashes the password on the next successful login because ``must_update``
+compares the stored parameters against the ones configured here.
+"""
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+
+def _param(profile, key, default):
+    return getattr(settings, 'PASSWORD_HASHER_PARAMS', {}).get(profile, {}).get(key, default)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return _param('argon2', 'time_cost', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return _param('argon2', 'memory_cost', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return _param('argon2', 'parallelism', Argon2PasswordHasher.parallelism)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return _param('scrypt', 'work_factor', ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return _param('scrypt', 'block_size', ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self):
+        return _param('scrypt', 'parallelism', ScryptPasswordHasher.parallelism)
+
+    @property
+    def maxmem(self):
+        return _param('scrypt', 'maxmem', ScryptPasswordHasher.maxmem)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return _param('pbkdf2', 'iterations', PBKDF2PasswordHasher.iterations)
+
@@ -0,0 +1,194 @@
+"""Durable outbound mail queue.
+
+Views call ``enqueue_*`` which is a single INSERT, so the request never waits
+on SMTP. The ``send_queued_mail`` management command drains the table in
+batches over one reused connection, retrying failures with exponential
+backoff.
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .models import OutboundEmail
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_mail(subject, body, to_email, from_email=''):
+    """Queue a plain-text message for delivery."""
+    return OutboundEmail.objects.create(
+        kind=OutboundEmail.KIND_RAW,
+        subject=subject,
+        body=body,
+        to_email=to_email,
+        from_email=from_email,
+    )
+
+
+def enqueue_password_reset(email):
+    """Queue a password reset mail.
+
+    The account lookup and token generation happen in the worker, so the
+    request does the same work whether or not the address is registered.
+    """
+    return OutboundEmail.objects.create(
+        kind=OutboundEmail.KIND_PASSWORD_RESET,
+        to_email=email,
+    )
+
+
+def _render_password_reset(item):
+    user = User.objects.filter(email=item.to_email).first()
+    if user is None:
+        return None
+
+    token = default_token_generator.make_token(user)
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    reset_link = f"{_setting('FRONTEND_URL', 'http://localhost:3000')}/reset-password/{uid}/{token}"
+
+    subject = 'Password Reset Request - MovieZone'
+    message = f"""
+Hello {user.username},
+
+You requested to reset your password for MovieZone.
+
+Click the link below to reset your password:
+{reset_link}
+
+This link will expire in 1 hour.
+
+If you didn't request this, please ignore this email.
+
+Thanks,
+MovieZone Team
+    """
+    return subject, message
+
+
+def build_message(item, connection=None):
+    """Turn a queue row into an ``EmailMessage``, or None if it should be dropped."""
+    if item.kind == OutboundEmail.KIND_PASSWORD_RESET:
+        rendered = _render_password_reset(item)
+        if rendered is None:
+            return None
+        subject, body = rendered
+    else:
+        subject, body = item.subject, item.body
+
+    return EmailMessage(
+        subject,
+        body,
+        item.from_email or settings.DEFAULT_FROM_EMAIL,
+        [item.to_email],
+        connection=connection,
+    )
+
+
+def claim_batch(batch_size):
+    """Lock up to ``batch_size`` due rows for this worker and return them.
+
+    Rows stuck in ``sending`` longer than ``MAIL_QUEUE_LEASE_SECONDS`` (a
+    crashed worker) are picked up again.
+    """
+    now = timezone.now()
+    lease_expired = now - timedelta(seconds=_setting('MAIL_QUEUE_LEASE_SECONDS', 300))
+
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now)
+                | Q(status=OutboundEmail.STATUS_SENDING, locked_at__lt=lease_expired)
+            )
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if ids:
+            OutboundEmail.objects.filter(id__in=ids).update(
+                status=OutboundEmail.STATUS_SENDING, locked_at=now
+            )
+
+    return list(OutboundEmail.objects.filter(id__in=ids).order_by('id'))
+
+
+def _schedule_retry(item, error):
+    max_attempts = _setting('MAIL_QUEUE_MAX_ATTEMPTS', 5)
+    backoff = _setting('MAIL_QUEUE_RETRY_BACKOFF', 30)
+    max_backoff = _setting('MAIL_QUEUE_MAX_BACKOFF', 3600)
+
+    item.attempts += 1
+    item.last_error = str(error)[:2000]
+    item.locked_at = None
+    if item.attempts >= max_attempts:
+        item.status = OutboundEmail.STATUS_FAILED
+    else:
+        item.status = OutboundEmail.STATUS_PENDING
+        delay = min(backoff * (2 ** (item.attempts - 1)), max_backoff)
+        item.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    item.save(update_fields=['attempts', 'last_error', 'locked_at', 'status', 'next_attempt_at'])
+    return item.status
+
+
+def process_batch(batch_size=None, connection=None):
+    """Send one batch over a single connection and return delivery metrics."""
+    batch_size = batch_size or _setting('MAIL_QUEUE_BATCH_SIZE', 100)
+    stats = {'claimed': 0, 'sent': 0, 'retried': 0, 'failed': 0, 'dropped': 0, 'seconds': 0.0}
+
+    items = claim_batch(batch_size)
+    stats['claimed'] = len(items)
+    if not items:
+        return stats
+
+    started = time.perf_counter()
+    connection = connection or get_connection(fail_silently=False)
+    remaining = list(items)
+    try:
+        connection.open()
+        while remaining:
+            item = remaining.pop(0)
+            try:
+                message = build_message(item, connection=connection)
+                if message is None:
+                    item.status = OutboundEmail.STATUS_DROPPED
+                    item.locked_at = None
+                    item.save(update_fields=['status', 'locked_at'])
+                    stats['dropped'] += 1
+                    continue
+                message.send()
+            except Exception as e:
+                status = _schedule_retry(item, e)
+                stats['failed' if status == OutboundEmail.STATUS_FAILED else 'retried'] += 1
+                # The connection may be left in a broken state; start a fresh one
+                connection.close()
+                connection.open()
+                continue
+
+            item.status = OutboundEmail.STATUS_SENT
+            item.attempts += 1
+            item.sent_at = timezone.now()
+            item.locked_at = None
+            item.save(update_fields=['status', 'attempts', 'sent_at', 'locked_at'])
+            stats['sent'] += 1
+    except Exception as e:
+        # No connection to the mail server: back off the rest of the batch
+        # instead of leaving it in 'sending' until the lease runs out
+        for item in remaining:
+            status = _schedule_retry(item, e)
+            stats['failed' if status == OutboundEmail.STATUS_FAILED else 'retried'] += 1
+    finally:
+        connection.close()
+
+    stats['seconds'] = time.perf_counter() - started
+    return stats
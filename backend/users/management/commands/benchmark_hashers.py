@@ -0,0 +1,62 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+
+def _hash_for(path, seconds):
+    """Hash passwords with ``path`` for ``seconds`` and return the count."""
+    hasher = import_string(path)()
+    salt = hasher.salt()
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        hasher.encode('correct horse battery staple', salt)
+        count += 1
+    return count
+
+
+class Command(BaseCommand):
+    help = 'Report password hashes per second per core for each hasher profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='*', default=None,
+                            help='Profiles to benchmark (default: all)')
+        parser.add_argument('--seconds', type=float, default=3.0,
+                            help='Duration of each measurement')
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes for the all-core measurement')
+
+    def handle(self, *args, **options):
+        seconds = options['seconds']
+        processes = options['processes']
+
+        profiles = settings.PASSWORD_HASHER_PROFILES
+
+        for profile in options['profiles'] or list(profiles):
+            path = profiles.get(profile)
+            if path is None:
+                self.stderr.write(f"{profile}: unknown profile, skipped")
+                continue
+
+            try:
+                # Warm up and make sure the backing library is importable
+                import_string(path)().encode('warmup', 'warmupsalt')
+            except ValueError as e:
+                self.stderr.write(f"{profile}: unavailable ({e})")
+                continue
+
+            single = _hash_for(path, seconds) / seconds
+
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                counts = list(pool.map(_hash_for, [path] * processes, [seconds] * processes))
+            total = sum(counts) / seconds
+
+            self.stdout.write(
+                f"{profile:<8} {single:10.1f} hashes/s on one core   "
+                f"{total:10.1f} hashes/s on {processes} processes "
+                f"({total / processes:.1f} per core)"
+            )
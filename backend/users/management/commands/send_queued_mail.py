@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.mail_queue import process_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound emails in batches over a reused connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Messages per batch (default: MAIL_QUEUE_BATCH_SIZE)')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the queue instead of exiting when it is empty')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep between polls when the queue is empty')
+
+    def handle(self, *args, **options):
+        totals = {'sent': 0, 'retried': 0, 'failed': 0, 'dropped': 0, 'seconds': 0.0}
+        started = time.perf_counter()
+
+        try:
+            while True:
+                stats = process_batch(batch_size=options['batch_size'])
+                for key in totals:
+                    totals[key] += stats[key]
+
+                if stats['claimed']:
+                    rate = stats['sent'] / stats['seconds'] if stats['seconds'] else 0.0
+                    self.stdout.write(
+                        f"batch: {stats['sent']} sent, {stats['retried']} retried, "
+                        f"{stats['failed']} failed, {stats['dropped']} dropped "
+                        f"in {stats['seconds']:.2f}s ({rate:.1f} msg/s)"
+                    )
+                    continue
+
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        elapsed = time.perf_counter() - started
+        rate = totals['sent'] / totals['seconds'] if totals['seconds'] else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {totals['sent']} sent, {totals['retried']} retried, "
+            f"{totals['failed']} failed, {totals['dropped']} dropped "
+            f"in {elapsed:.2f}s (send throughput {rate:.1f} msg/s)"
+        ))
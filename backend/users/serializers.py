@@ -77,13 +77,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 class PasswordResetRequestSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
-    def validate_email(self, value):
-        try:
-            user = User.objects.get(email=value)
-            return value
-        except User.DoesNotExist:
-            # Don't reveal that the email doesn't exist for security
-            return value
+    # No account lookup here: it would make response time depend on whether
+    # the email is registered. The mail worker resolves the user instead.
 
 
 class PasswordResetConfirmSerializer(serializers.Serializer):
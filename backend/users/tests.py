@@ -1,3 +1,297 @@
-from django.test import TestCase
+import os
+import runpy
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from movie_review_project import settings as settings_module
+from movie_review_project.nplusone import assert_no_n_plus_one
+
+from .mail_queue import claim_batch, enqueue_mail, enqueue_password_reset, process_batch
+from .models import OutboundEmail
+
+
+class FlakyBackend(EmailBackend):
+    """locmem backend that fails for addresses listed in ``failing``."""
+
+    def __init__(self, failing=(), fail_open=False, **kwargs):
+        super().__init__(**kwargs)
+        self.failing = set(failing)
+        self.fail_open = fail_open
+
+    def open(self):
+        if self.fail_open:
+            raise ConnectionRefusedError('mail server down')
+        return super().open()
+
+    def send_messages(self, messages):
+        for message in messages:
+            if self.failing.intersection(message.to):
+                raise ConnectionResetError('lost connection')
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    MAIL_QUEUE_MAX_ATTEMPTS=3,
+    MAIL_QUEUE_RETRY_BACKOFF=30,
+    MAIL_QUEUE_MAX_BACKOFF=3600,
+    MAIL_QUEUE_LEASE_SECONDS=300,
+)
+class MailQueueTests(TestCase):
+    def test_password_reset_request_only_enqueues(self):
+        response = APIClient().post(reverse('password_reset_request'), {'email': 'nobody@example.com'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        item = OutboundEmail.objects.get()
+        self.assertEqual(item.kind, OutboundEmail.KIND_PASSWORD_RESET)
+        self.assertEqual(item.status, OutboundEmail.STATUS_PENDING)
+
+    def test_claim_batch_takes_due_rows_and_expired_leases(self):
+        now = timezone.now()
+        due = enqueue_mail('due', 'body', 'due@example.com')
+        later = enqueue_mail('later', 'body', 'later@example.com')
+        OutboundEmail.objects.filter(pk=later.pk).update(next_attempt_at=now + timedelta(minutes=5))
+        stuck = enqueue_mail('stuck', 'body', 'stuck@example.com')
+        OutboundEmail.objects.filter(pk=stuck.pk).update(
+            status=OutboundEmail.STATUS_SENDING, locked_at=now - timedelta(seconds=600))
+        leased = enqueue_mail('leased', 'body', 'leased@example.com')
+        OutboundEmail.objects.filter(pk=leased.pk).update(
+            status=OutboundEmail.STATUS_SENDING, locked_at=now - timedelta(seconds=10))
+
+        claimed = claim_batch(10)
+
+        self.assertEqual({item.pk for item in claimed}, {due.pk, stuck.pk})
+        self.assertTrue(all(item.status == OutboundEmail.STATUS_SENDING for item in claimed))
+        self.assertEqual(claim_batch(10), [])
+
+    def test_claim_batch_respects_batch_size(self):
+        for i in range(5):
+            enqueue_mail('hello', 'body', f'user{i}@example.com')
+
+        self.assertEqual(len(claim_batch(2)), 2)
+        self.assertEqual(len(claim_batch(10)), 3)
+
+    def test_sends_raw_and_password_reset_mail(self):
+        user = User.objects.create_user('alice', 'alice@example.com', 'pw-alice-123')
+        enqueue_mail('Welcome', 'Hi there', 'bob@example.com')
+        enqueue_password_reset(user.email)
+
+        stats = process_batch()
+
+        self.assertEqual((stats['claimed'], stats['sent']), (2, 2))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['alice@example.com', 'bob@example.com'])
+        reset = next(message for message in mail.outbox if message.to == ['alice@example.com'])
+        self.assertIn('/reset-password/', reset.body)
+        self.assertIn('alice', reset.body)
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.STATUS_SENT).exists())
+        self.assertEqual(set(OutboundEmail.objects.values_list('attempts', flat=True)), {1})
+
+    def test_unknown_address_is_dropped(self):
+        item = enqueue_password_reset('nobody@example.com')
+
+        stats = process_batch()
+
+        self.assertEqual(stats['dropped'], 1)
+        self.assertEqual(len(mail.outbox), 0)
+        item.refresh_from_db()
+        self.assertEqual(item.status, OutboundEmail.STATUS_DROPPED)
+        self.assertIsNone(item.locked_at)
+
+    def test_failed_send_backs_off_exponentially(self):
+        item = enqueue_mail('Hello', 'body', 'flaky@example.com')
+        other = enqueue_mail('Hello', 'body', 'fine@example.com')
+        backend = FlakyBackend(failing={'flaky@example.com'})
+
+        before = timezone.now()
+        stats = process_batch(connection=backend)
+
+        self.assertEqual((stats['sent'], stats['retried']), (1, 1))
+        self.assertEqual([message.to for message in mail.outbox], [['fine@example.com']])
+        item.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(other.status, OutboundEmail.STATUS_SENT)
+        self.assertEqual((item.status, item.attempts), (OutboundEmail.STATUS_PENDING, 1))
+        self.assertIn('lost connection', item.last_error)
+        self.assertGreaterEqual(item.next_attempt_at, before + timedelta(seconds=30))
+
+        # Not due yet, so nothing is claimed; the second failure doubles the delay
+        self.assertEqual(process_batch(connection=backend)['claimed'], 0)
+        OutboundEmail.objects.filter(pk=item.pk).update(next_attempt_at=timezone.now())
+        before = timezone.now()
+        process_batch(connection=backend)
+        item.refresh_from_db()
+        self.assertEqual(item.attempts, 2)
+        self.assertGreaterEqual(item.next_attempt_at, before + timedelta(seconds=60))
+
+    def test_gives_up_after_max_attempts(self):
+        item = enqueue_mail('Hello', 'body', 'flaky@example.com')
+        backend = FlakyBackend(failing={'flaky@example.com'})
+
+        for _ in range(3):
+            OutboundEmail.objects.filter(pk=item.pk).update(next_attempt_at=timezone.now())
+            stats = process_batch(connection=backend)
+
+        self.assertEqual(stats['failed'], 1)
+        item.refresh_from_db()
+        self.assertEqual((item.status, item.attempts), (OutboundEmail.STATUS_FAILED, 3))
+        OutboundEmail.objects.filter(pk=item.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(process_batch(connection=backend)['claimed'], 0)
+
+    def test_unreachable_server_reschedules_the_whole_batch(self):
+        for i in range(3):
+            enqueue_mail('Hello', 'body', f'user{i}@example.com')
+
+        stats = process_batch(connection=FlakyBackend(fail_open=True))
+
+        self.assertEqual((stats['claimed'], stats['retried'], stats['sent']), (3, 3, 0))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.STATUS_PENDING).exists())
+        self.assertFalse(OutboundEmail.objects.filter(locked_at__isnull=False).exists())
+
+    def test_reconnect_failure_reschedules_the_rest_of_the_batch(self):
+        class DropsAfterFailure(FlakyBackend):
+            def close(self):
+                super().close()
+                self.fail_open = True
+
+        enqueue_mail('Hello', 'body', 'flaky@example.com')
+        enqueue_mail('Hello', 'body', 'next@example.com')
+        enqueue_mail('Hello', 'body', 'last@example.com')
+
+        stats = process_batch(connection=DropsAfterFailure(failing={'flaky@example.com'}))
+
+        self.assertEqual((stats['sent'], stats['retried']), (0, 3))
+        self.assertEqual(set(OutboundEmail.objects.values_list('status', flat=True)), {OutboundEmail.STATUS_PENDING})
+        self.assertEqual(set(OutboundEmail.objects.values_list('attempts', flat=True)), {1})
+
+
+@override_settings(COMPRESSION_MIN_SIZE=0)
+class TokenCompressionTests(TestCase):
+    def test_token_responses_are_not_compressed(self):
+        User.objects.create_user('alice', 'alice@example.com', 'pw-alice-123')
+        response = self.client.post(reverse('token_obtain_pair'), {
+            'username': 'alice', 'password': 'pw-alice-123',
+        }, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('access', response.json())
+
+        response = self.client.post(reverse('token_refresh'), {'refresh': response.json()['refresh']},
+                                    HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+@override_settings(
+    PASSWORD_HASHERS=['users.hashers.TunedScryptPasswordHasher', 'users.hashers.TunedPBKDF2PasswordHasher'],
+    PASSWORD_HASHER_PARAMS={'scrypt': {'work_factor': 2 ** 10}, 'pbkdf2': {'iterations': 1000}},
+)
+class PasswordHasherTests(TestCase):
+    def load_settings(self, profile):
+        with mock.patch.dict(os.environ, {'PASSWORD_HASHER_PROFILE': profile}):
+            return runpy.run_path(settings_module.__file__)
+
+    def test_profile_picks_the_preferred_hasher(self):
+        hashers = self.load_settings('pbkdf2')['PASSWORD_HASHERS']
+        self.assertEqual(hashers[0], 'users.hashers.TunedPBKDF2PasswordHasher')
+        self.assertEqual(len(hashers), 3)
+
+    def test_unknown_profile_is_improperly_configured(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'argon2, scrypt, pbkdf2'):
+            self.load_settings('bcrypt')
+
+    def login(self, password):
+        return self.client.post(reverse('token_obtain_pair'), {'username': 'alice', 'password': password})
+
+    def test_login_upgrades_a_legacy_hash(self):
+        user = User.objects.create(username='alice', password=make_password('pw-alice-123', hasher='pbkdf2_sha256'))
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+        self.assertEqual(self.login('wrong').status_code, 401)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+
+        self.assertEqual(self.login('pw-alice-123').status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$'))
+        self.assertIn('$1024$', user.password)
+        self.assertEqual(self.login('pw-alice-123').status_code, 200)
+
+    def test_login_upgrades_a_hash_with_old_parameters(self):
+        user = User.objects.create_user('alice', password='pw-alice-123')
+        self.assertIn('$1024$', user.password)
+        with override_settings(PASSWORD_HASHER_PARAMS={'scrypt': {'work_factor': 2 ** 11}}):
+            self.assertEqual(self.login('pw-alice-123').status_code, 200)
+        user.refresh_from_db()
+        self.assertIn('$2048$', user.password)
+
+
+class UserAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw-admin-123')
+        User.objects.bulk_create([User(username=f'user{i}', email=f'user{i}@example.com') for i in range(30)])
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.client.force_login(self.admin)
+        # Session, user, the groups list_filter, the sqlite_stat1 probe, COUNT(*) and the page
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('admin:auth_user_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 31)
+
+
+@override_settings(NPLUSONE_THRESHOLD=5)
+class UserEndpointNPlusOneTests(TestCase):
+    """The users API over more rows than NPLUSONE_THRESHOLD, so a per-row query shows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        groups = [Group.objects.create(name=f'group{i}') for i in range(8)]
+        permissions = list(Permission.objects.all()[:8])
+        cls.users = []
+        for i in range(8):
+            user = User.objects.create_user(f'user{i}', f'user{i}@example.com', 'pw-user-123')
+            user.groups.set(groups)
+            user.user_permissions.set(permissions)
+            cls.users.append(user)
+
+    def setUp(self):
+        self.api = APIClient()
+
+    def test_profile(self):
+        self.api.force_authenticate(self.users[0])
+        with assert_no_n_plus_one():
+            response = self.api.get(reverse('user_profile'))
+        self.assertEqual(response.data['username'], 'user0')
+
+    def test_login_refresh_and_register(self):
+        with assert_no_n_plus_one():
+            response = self.api.post(reverse('token_obtain_pair'), {
+                'username': 'user0', 'password': 'pw-user-123',
+            }, format='json')
+            self.assertEqual(response.status_code, 200)
+            response = self.api.post(reverse('token_refresh'), {'refresh': response.data['refresh']}, format='json')
+            self.assertEqual(response.status_code, 200)
+            response = self.api.post(reverse('register'), {
+                'username': 'newcomer', 'email': 'newcomer@example.com',
+                'password': 'pw-new-12345', 'password2': 'pw-new-12345',
+            }, format='json')
+            self.assertEqual(response.status_code, 201)
+
+    def test_password_reset_request(self):
+        with assert_no_n_plus_one():
+            response = self.api.post(reverse('password_reset_request'), {'email': 'user0@example.com'}, format='json')
+        self.assertEqual(response.status_code, 200)
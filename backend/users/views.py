@@ -4,11 +4,6 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth.models import User
-from django.contrib.auth.tokens import default_token_generator
-from django.utils.http import urlsafe_base64_encode
-from django.utils.encoding import force_bytes
-from django.core.mail import send_mail
-from django.conf import settings
 from .serializers import (
     RegisterSerializer, 
     UserSerializer, 
@@ -16,6 +11,7 @@ from .serializers import (
     PasswordResetRequestSerializer,
     PasswordResetConfirmSerializer
 )
+from .mail_queue import enqueue_password_reset
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -44,51 +40,15 @@ def user_profile(request):
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def password_reset_request(request):
-    """Request password reset - sends email with reset link"""
+    """Request password reset - queues an email with reset link"""
     serializer = PasswordResetRequestSerializer(data=request.data)
     if serializer.is_valid():
         email = serializer.validated_data['email']
-        
-        try:
-            user = User.objects.get(email=email)
-            
-            # Generate token and uid
-            token = default_token_generator.make_token(user)
-            uid = urlsafe_base64_encode(force_bytes(user.pk))
-            
-            # Create reset link (frontend URL)
-            reset_link = f"http://localhost:3000/reset-password/{uid}/{token}"
-            
-            # Send email
-            subject = 'Password Reset Request - MovieZone'
-            message = f"""
-Hello {user.username},
 
-You requested to reset your password for MovieZone.
+        # Queue the email; the account lookup happens in the mail worker so
+        # the response time doesn't reveal whether the address is registered
+        enqueue_password_reset(email)
 
-Click the link below to reset your password:
-{reset_link}
-
-This link will expire in 1 hour.
-
-If you didn't request this, please ignore this email.
-
-Thanks,
-MovieZone Team
-            """
-            
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [email],
-                fail_silently=False,
-            )
-            
-        except User.DoesNotExist:
-            # Don't reveal that the email doesn't exist
-            pass
-        
         return Response({
             'message': 'If an account exists with this email, you will receive password reset instructions.'
         }, status=status.HTTP_200_OK)
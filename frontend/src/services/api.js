@@ -48,11 +48,15 @@ export const authAPI = {
 export const moviesAPI = {
   getMovies: (params = {}) => api.get('movies/movies/', { params }),
   getMovie: (id) => api.get(`movies/movies/${id}/`),
+  getMoviesByIds: (ids) => api.get('movies/movies/', { params: { ids: ids.join(',') } }),
   createMovie: (movieData) => api.post('movies/movies/', movieData),
   updateMovie: (id, movieData) => api.patch(`movies/movies/${id}/`, movieData),
   deleteMovie: (id) => api.delete(`movies/movies/${id}/`),
   getCategories: () => api.get('movies/movies/categories/'),
   getWatchOptions: (id) => api.get(`movies/movies/${id}/watch_options/`),
+  getWatchOptionsBatch: (ids, region) => api.get('movies/movies/watch_options/', { params: { ids: ids.join(','), region } }),
+  // Several reads in one round trip: [{ id, op, args }] -> { responses: { id: { status, data | errors } } }
+  batch: (requests) => api.post('movies/batch/', { requests }),
 };
 
 // Reviews API calls